@@ -4,39 +4,210 @@ Integra percepción, razonamiento y búsqueda en un agente inteligente unificado
 """
 
 import json
+import time
+import numpy as np
+import instrumentacion
 from percepcion import SistemaPercepcion
-from razonamiento import SistemaRazonamiento
+from razonamiento import LETRAS_DIMENSION, SistemaRazonamiento
 import os
+import sys
+
+# Cantidad de tipos más probables que se devuelven en cada resultado
+TOP_K = 3
+# Qué hacer en analizar_lote con filas que tienen respuestas faltantes (NaN)
+FALTANTES = ("error", "reportar")
 
 class AgentePersonalidad:
-    def __init__(self, ruta_modelo=None):
+    def __init__(self, ruta_modelo=None, motor="keras", carga_diferida=False, tamano_cache=0):
+        """
+        motor: "keras", "numpy" o "int8" (ver SistemaPercepcion.cargar_modelo).
+        tamano_cache: capacidad de la caché LRU de predicciones (0 = sin caché).
+        carga_diferida: si es True, el modelo (y TensorFlow, con motor "keras")
+        no se carga hasta la primera predicción.
+        """
         base_dir = os.path.dirname(os.path.abspath(__file__))
         if ruta_modelo is None:
             ruta_modelo = os.path.join(base_dir, "../models/modelo_personalidad.h5")
-        self.percepcion = SistemaPercepcion(ruta_modelo)
+        self.percepcion = SistemaPercepcion(ruta_modelo, motor=motor, tamano_cache=tamano_cache)
+        if carga_diferida:
+            return
         self.percepcion.cargar_modelo()
-        print(f"🤖 Modelo cargado desde: {ruta_modelo}")
+        print(f"🤖 Modelo cargado desde: {self.percepcion.ruta_fuente()}", file=sys.stderr)
 
  #Análisis completo
     def analizar_completo(self, respuestas, tipo_objetivo=None):
+        if instrumentacion.SUMIDERO is not None:
+            return self._analizar_instrumentado(respuestas, tipo_objetivo)
+
         # 1. PERCEPCIÓN (Machine Learning)
-        tipo_predicho, confianza = self.percepcion.predecir(respuestas)
+        tipo_predicho, confianza, probabilidades, clases = self.percepcion.predecir_distribucion(respuestas)
+        distribucion = self._resumir_distribuciones(probabilidades[None, :], clases, [tipo_objetivo])[0]
+
+        return self._componer_resultado(tipo_predicho, confianza, tipo_objetivo, distribucion)
+
+    def _analizar_instrumentado(self, respuestas, tipo_objetivo=None):
+        """analizar_completo midiendo el tiempo de cada etapa; solo se usa con la instrumentación activa."""
+        t0 = time.perf_counter()
+        tipo_predicho, confianza, probabilidades, clases = self.percepcion.predecir_distribucion(respuestas)
+        t1 = time.perf_counter()
+        distribucion = self._resumir_distribuciones(probabilidades[None, :], clases, [tipo_objetivo])[0]
+        resultado = self._componer_resultado(tipo_predicho, confianza, tipo_objetivo, distribucion)
+        t2 = time.perf_counter()
+        instrumentacion.observar("etapa_segundos", t1 - t0, etapa="percepcion")
+        instrumentacion.observar("analisis_segundos", t2 - t0)
+        instrumentacion.contar("analisis_total")
+        return resultado
+
+ #Análisis por lotes
+    def analizar_lote(self, respuestas_lote, tipo_objetivo=None, tamano_lote=1024, faltantes="error"):
+        """
+        Analiza N cuestionarios con una sola pasada del modelo.
+        respuestas_lote: array (N, 60) o iterable de listas de 60 respuestas.
+        faltantes: qué hacer con las filas que tienen respuestas faltantes (NaN), que el modelo no
+        puede puntuar como un cuestionario completo: "error" lanza ValueError; "reportar" no las
+        puntúa y devuelve en su lugar {"error": ..., "preguntas_faltantes": [...]}. Solo el test
+        adaptativo imputa las faltantes (ver percepcion.probabilidades).
+        Devuelve una lista de N resultados con el mismo formato que analizar_completo.
+        """
+        if faltantes not in FALTANTES:
+            raise ValueError(f"faltantes debe ser uno de {FALTANTES}")
+        X = np.asarray(respuestas_lote if isinstance(respuestas_lote, np.ndarray) else list(respuestas_lote),
+                       dtype=np.float32)
+        incompletas = np.isnan(X).any(axis=1) if X.ndim == 2 else np.zeros(0, dtype=bool)
+        if not incompletas.any():
+            clases, probabilidades = self.percepcion.probabilidades(X, tamano_lote=tamano_lote)
+            return self.analizar_probabilidades(probabilidades, tipo_objetivo, clases)
+        filas = np.flatnonzero(incompletas)
+        if faltantes == "error":
+            raise ValueError(f"{len(filas)} filas tienen respuestas faltantes (la primera es la fila {filas[0]} del lote); "
+                             "usar faltantes='reportar' para puntuar el resto")
+
+        clases, probabilidades = self.percepcion.probabilidades(X[~incompletas], tamano_lote=tamano_lote)
+        completas = iter(self.analizar_probabilidades(probabilidades, tipo_objetivo, clases))
+        return [
+            {"error": "respuestas faltantes", "preguntas_faltantes": np.flatnonzero(np.isnan(fila)).tolist()}
+            if incompleta else next(completas)
+            for fila, incompleta in zip(X, incompletas)
+        ]
+
+    def analizar_probabilidades(self, probabilidades, tipos_objetivo=None, clases=None):
+        """
+        Resultados con el formato de analizar_completo a partir de vectores softmax ya calculados,
+        array (N, 16) (p. ej. los del test adaptativo o de un microlote).
+        tipos_objetivo: un tipo para todas las filas o una lista con uno por fila.
+        clases: orden de las columnas, el que devolvió percepcion.probabilidades junto con ellas;
+        None usa percepcion.clases, que una recarga del modelo puede haber cambiado desde entonces.
+        Devuelve una lista de N resultados.
+        """
+        probabilidades = np.atleast_2d(np.asarray(probabilidades))
+        if tipos_objetivo is None or isinstance(tipos_objetivo, str):
+            tipos_objetivo = [tipos_objetivo] * len(probabilidades)
+        if clases is None:
+            clases = self.percepcion.clases
+        return self._componer_lote(clases, probabilidades, tipos_objetivo)
+
+    def distribucion_cohorte(self, respuestas_lote, tipo_objetivo=None, tamano_lote=1024):
+        """
+        Resumen de una cohorte con una sola pasada del modelo: distribución esperada de tipos (promedio
+        de los softmax), proporción de cada tipo predicho, marginales medias por dimensión y, con
+        tipo_objetivo, el costo de plan esperado medio. No aplica razonamiento por usuario.
+        """
+        clases, probabilidades = self.percepcion.probabilidades(respuestas_lote, tamano_lote=tamano_lote)
+        n = len(probabilidades)
+        if n == 0:
+            raise ValueError("La cohorte no tiene cuestionarios")
+        predichos = np.bincount(np.argmax(probabilidades, axis=1), minlength=len(clases)) / n
+        marginales = SistemaRazonamiento.marginales_dimensiones(probabilidades, clases).mean(axis=0)
+        resumen = {
+            "usuarios": n,
+            "tipos_esperados": {str(c): round(float(p), 4) for c, p in zip(clases, probabilidades.mean(axis=0))},
+            "tipos_predichos": {str(c): round(float(p), 4) for c, p in zip(clases, predichos)},
+            "dimensiones": self._formatear_dimensiones(marginales),
+        }
+        if tipo_objetivo and SistemaRazonamiento.validar_tipo_mbti(tipo_objetivo):
+            costos = SistemaRazonamiento.costo_esperado(probabilidades, clases, tipo_objetivo)
+            resumen["costo_esperado_medio"] = round(float(costos.mean()), 4)
+        return resumen
+
+    @staticmethod
+    def _formatear_dimensiones(marginales):
+        """{"E/I": {"E": p, "I": 1 - p}, ...} a partir de las probabilidades de la primera letra."""
+        return {
+            f"{primera}/{segunda}": {primera: round(float(p), 4), segunda: round(1.0 - float(p), 4)}
+            for (primera, segunda), p in zip(LETRAS_DIMENSION, marginales)
+        }
+
+    @staticmethod
+    def _resumir_distribuciones(probabilidades, clases, tipos_objetivo):
+        """
+        Para N vectores softmax (N, 16) calcula de una vez los k tipos más probables, las marginales
+        por dimensión y el costo de plan esperado hasta el objetivo de cada fila (si es válido).
+        Devuelve una lista de N dicts para _componer_resultado.
+        """
+        top_tipos, top_probabilidades = SistemaRazonamiento.top_k(probabilidades, clases, TOP_K)
+        marginales = SistemaRazonamiento.marginales_dimensiones(probabilidades, clases)
+        validos = [bool(t) and SistemaRazonamiento.validar_tipo_mbti(t) for t in tipos_objetivo]
+        if any(validos):
+            # (N, 16): costo esperado hasta cada uno de los 16 tipos; se toma la columna del objetivo de cada fila
+            costos = SistemaRazonamiento.costo_esperado(probabilidades, clases, np.arange(16))
+
+        resumenes = []
+        for i, (tipos, probs) in enumerate(zip(top_tipos.tolist(), top_probabilidades.tolist())):
+            resumen = {
+                "top_tipos": [{"tipo": t, "probabilidad": round(p, 4)} for t, p in zip(tipos, probs)],
+                "dimensiones": AgentePersonalidad._formatear_dimensiones(marginales[i]),
+            }
+            if validos[i]:
+                resumen["costo_esperado"] = round(float(costos[i, SistemaRazonamiento.codificar_tipo(tipos_objetivo[i])]), 4)
+            resumenes.append(resumen)
+        return resumenes
+
+    @staticmethod
+    def _componer_lote(clases, probabilidades, tipos_objetivo):
+        """Resultados de N filas a partir de sus vectores softmax, con un tipo objetivo por fila."""
+        indices = np.argmax(probabilidades, axis=1)
+        confianzas = probabilidades[np.arange(len(indices)), indices] * 100
+        distribuciones = AgentePersonalidad._resumir_distribuciones(probabilidades, clases, tipos_objetivo)
+        return [
+            AgentePersonalidad._componer_resultado(str(clases[i]), confianza, objetivo, distribucion)
+            for i, confianza, objetivo, distribucion in zip(indices.tolist(), confianzas.tolist(), tipos_objetivo, distribuciones)
+        ]
+
+    @staticmethod
+    def _componer_resultado(tipo_predicho, confianza, tipo_objetivo=None, distribucion=None):
+        """
+        distribucion: resumen del softmax completo (ver _resumir_distribuciones); agrega 'top_tipos',
+        'dimensiones' y, con objetivo, 'costo_esperado' a la planificación.
+        """
+        medir = instrumentacion.SUMIDERO is not None
+        if medir:
+            t0 = time.perf_counter()
 
         # 2. RAZONAMIENTO (Lógica)
         info_logica = SistemaRazonamiento.razonar_sobre_tipo(tipo_predicho)
+        if medir:
+            instrumentacion.observar("etapa_segundos", time.perf_counter() - t0, etapa="razonamiento")
 
         # 3. Resultado integrado
         resultado = {
             "tipo_predicho": tipo_predicho,
             "confianza": f"{confianza:.1f}%",
             "descripcion": info_logica["descripcion"],
-            "razonamiento": info_logica["razonamiento"]
+            "razonamiento": info_logica["razonamiento"],
+            "hechos": info_logica["hechos"]
         }
+        if distribucion is not None:
+            resultado["top_tipos"] = distribucion["top_tipos"]
+            resultado["dimensiones"] = distribucion["dimensiones"]
 
         # 4. BÚSQUEDA (A* - Planificación)
         if tipo_objetivo:
             if SistemaRazonamiento.validar_tipo_mbti(tipo_objetivo):
-                busqueda = SistemaRazonamiento.busqueda_a_estrella(tipo_predicho, tipo_objetivo)
+                if medir:
+                    t1 = time.perf_counter()
+                busqueda = SistemaRazonamiento.planificar(tipo_predicho, tipo_objetivo)
+                if medir:
+                    instrumentacion.observar("etapa_segundos", time.perf_counter() - t1, etapa="planificacion")
                 if busqueda:
                     resultado["planificacion"] = {
                         "objetivo": tipo_objetivo,
@@ -45,6 +216,9 @@ class AgentePersonalidad:
                         "nodos_explorados": len(busqueda["nodos_explorados"]),
                         "eficiencia": f"{busqueda['eficiencia']:.1%}"
                     }
+                    if distribucion is not None and "costo_esperado" in distribucion:
+                        # Promedio del costo sobre los 16 tipos de inicio, pesado por sus probabilidades
+                        resultado["planificacion"]["costo_esperado"] = distribucion["costo_esperado"]
             else:
                 resultado["error_objetivo"] = f"Tipo objetivo inválido: {tipo_objetivo}"
 
@@ -65,3 +239,6 @@ if __name__ == "__main__":
 
     print(json.dumps(resultado, indent=2, ensure_ascii=False))
 
+    cohorte = np.random.randint(-3, 4, size=(1000, 60))
+    print(json.dumps(agente.distribucion_cohorte(cohorte, tipo_objetivo="ENFP"), indent=2, ensure_ascii=False))
+
@@ -0,0 +1,334 @@
+"""
+MÓDULO DE ANALÍTICA DE COHORTES
+Agregados sobre poblaciones puntuadas en una sola pasada y con memoria acotada: distribución de tipos,
+márgenes por dimensión, confianza media por tipo, confusión entre tipos adyacentes y costo de plan
+medio hasta cada tipo objetivo.
+
+El estado de un AcumuladorCohorte son contadores de tamaño fijo indexados por el código de 4 bits de
+cada tipo (ver razonamiento.codificar_tipo), así que no crece con la cantidad de filas. Dos
+acumuladores se combinan sumando sus contadores: cada proceso (o máquina) acumula su parte del
+archivo y al final se unen los parciales, sin volver a leer los datos.
+
+Uso:
+    python analitica.py --archivo respuestas.csv --objetivo ENFP INTJ --procesos 4 --salida cohorte.json
+    python analitica.py --jsonl resultados.jsonl --guardar parcial_1.npz
+    python analitica.py --combinar parcial_1.npz parcial_2.npz
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from razonamiento import LETRAS_DIMENSION, PESOS, TIPOS_MBTI, SistemaRazonamiento
+
+# Intervalos de 10 puntos de confianza (0-10 %, ..., 90-100 %) por tipo predicho
+INTERVALOS_CONFIANZA = 10
+
+
+class AcumuladorCohorte:
+    """
+    Contadores de una cohorte. Todos los arreglos se indexan por código de tipo (0-15):
+      conteo_tipos[k]               filas cuyo tipo predicho es k
+      suma_probabilidades[k]        suma de P(k) sobre las filas con distribución completa
+      suma_confianza[k]             suma de la confianza (0-1) de las filas predichas como k
+      histograma_confianza[k, b]    filas predichas como k con confianza en el intervalo b
+      suma_marginales[i]            suma de P(primera letra de la dimensión i) (E, N, T, J)
+      segundo_tipo[k, j]            filas con tipo predicho k y segundo tipo más probable j
+    'filas_distribucion' cuenta las filas que aportaron el softmax completo (las de un JSONL solo
+    traen los 3 tipos más probables y no suman a suma_probabilidades).
+    """
+
+    def __init__(self):
+        self.filas = 0
+        self.filas_distribucion = 0
+        self.conteo_tipos = np.zeros(16, dtype=np.int64)
+        self.suma_probabilidades = np.zeros(16, dtype=np.float64)
+        self.suma_confianza = np.zeros(16, dtype=np.float64)
+        self.histograma_confianza = np.zeros((16, INTERVALOS_CONFIANZA), dtype=np.int64)
+        self.suma_marginales = np.zeros(4, dtype=np.float64)
+        self.segundo_tipo = np.zeros((16, 16), dtype=np.int64)
+
+    def _contar(self, primero, segundo, confianza):
+        """Actualiza los contadores de etiquetas duras a partir de códigos enteros (N,) y confianzas 0-1."""
+        self.filas += len(primero)
+        self.conteo_tipos += np.bincount(primero, minlength=16)
+        self.suma_confianza += np.bincount(primero, weights=confianza, minlength=16)
+        intervalo = np.clip((confianza * INTERVALOS_CONFIANZA).astype(np.int64), 0, INTERVALOS_CONFIANZA - 1)
+        self.histograma_confianza += np.bincount(
+            primero * INTERVALOS_CONFIANZA + intervalo, minlength=16 * INTERVALOS_CONFIANZA
+        ).reshape(16, INTERVALOS_CONFIANZA)
+        self.segundo_tipo += np.bincount(primero * 16 + segundo, minlength=256).reshape(16, 16)
+
+    def actualizar(self, probabilidades, clases):
+        """Agrega N filas a partir de su softmax (N, 16), con las columnas en el orden de 'clases'."""
+        probabilidades = np.asarray(probabilidades, dtype=np.float64)
+        if probabilidades.ndim != 2 or probabilidades.shape[1] != 16:
+            raise ValueError("Las probabilidades deben ser una matriz (N, 16)")
+        if not len(probabilidades):
+            return self
+        por_codigo = SistemaRazonamiento.distribucion_por_codigo(probabilidades, clases)
+        # Los dos códigos más probables de cada fila sin ordenar las 16 columnas
+        dos = np.argpartition(-por_codigo, 1, axis=1)[:, :2]
+        filas = np.arange(len(por_codigo))
+        invertir = por_codigo[filas, dos[:, 1]] > por_codigo[filas, dos[:, 0]]
+        primero = np.where(invertir, dos[:, 1], dos[:, 0])
+        segundo = np.where(invertir, dos[:, 0], dos[:, 1])
+
+        self._contar(primero, segundo, por_codigo[filas, primero])
+        self.filas_distribucion += len(por_codigo)
+        self.suma_probabilidades += por_codigo.sum(axis=0)
+        self.suma_marginales += SistemaRazonamiento.marginales_por_codigo(por_codigo).sum(axis=0)
+        return self
+
+    def actualizar_resultados(self, resultados):
+        """
+        Agrega resultados ya compuestos (dicts de analizar_completo / analizar_lote o líneas de un JSONL
+        de main.py). Usa 'tipo_predicho', 'confianza', 'top_tipos' y 'dimensiones'.
+        Las filas sin puntuar por respuestas faltantes (con 'error', ver analizar_lote) se omiten.
+        """
+        primeros, segundos, confianzas, marginales = [], [], [], []
+        for resultado in resultados:
+            if "error" in resultado:
+                continue
+            top = resultado.get("top_tipos") or []
+            primeros.append(resultado["tipo_predicho"])
+            segundos.append(top[1]["tipo"] if len(top) > 1 else resultado["tipo_predicho"])
+            confianzas.append(float(str(resultado["confianza"]).rstrip("%")) / 100)
+            dimensiones = resultado.get("dimensiones")
+            if dimensiones is None:
+                raise ValueError("Los resultados no tienen 'dimensiones': puntúalos de nuevo con esta versión")
+            marginales.append([dimensiones[f"{a}/{b}"][a] for a, b in LETRAS_DIMENSION])
+        if not primeros:
+            return self
+        self._contar(SistemaRazonamiento.codificar_tipos(primeros), SistemaRazonamiento.codificar_tipos(segundos),
+                     np.array(confianzas))
+        self.suma_marginales += np.asarray(marginales).sum(axis=0)
+        return self
+
+    def combinar(self, otro):
+        """Suma los contadores de otro acumulador (por ejemplo, el parcial de otro proceso). Devuelve self."""
+        self.filas += otro.filas
+        self.filas_distribucion += otro.filas_distribucion
+        for nombre in _CONTADORES:
+            setattr(self, nombre, getattr(self, nombre) + getattr(otro, nombre))
+        return self
+
+    @classmethod
+    def combinar_todos(cls, acumuladores):
+        total = cls()
+        for acumulador in acumuladores:
+            total.combinar(acumulador)
+        return total
+
+    def guardar(self, ruta):
+        """Guarda los contadores en un .npz para combinarlos más tarde (ver cargar)."""
+        np.savez(ruta, filas=self.filas, filas_distribucion=self.filas_distribucion,
+                 **{nombre: getattr(self, nombre) for nombre in _CONTADORES})
+
+    @classmethod
+    def cargar(cls, ruta):
+        acumulador = cls()
+        with np.load(ruta) as datos:
+            acumulador.filas = int(datos["filas"])
+            acumulador.filas_distribucion = int(datos["filas_distribucion"])
+            for nombre in _CONTADORES:
+                valores = datos[nombre]
+                if valores.shape != getattr(acumulador, nombre).shape:
+                    raise ValueError(f"{ruta}: '{nombre}' tiene forma {valores.shape} y se esperaba "
+                                     f"{getattr(acumulador, nombre).shape}")
+                setattr(acumulador, nombre, valores.astype(getattr(acumulador, nombre).dtype))
+        return acumulador
+
+    def resumen(self, objetivos=None, mode="weighted", max_confusiones=10):
+        """
+        Agregados de la cohorte como dict serializable a JSON.
+        objetivos: tipos para el costo de plan medio (por defecto, los 16).
+        El costo 'predicho' usa el tipo predicho de cada fila; el 'esperado' promedia también sobre la
+        incertidumbre de cada fila (solo con filas que aportaron el softmax completo).
+        """
+        if not self.filas:
+            raise ValueError("La cohorte está vacía")
+        if mode not in ("unit", "weighted"):
+            raise ValueError("mode debe ser 'unit' o 'weighted'")
+        proporciones = self.conteo_tipos / self.filas
+        resumen = {
+            "filas": self.filas,
+            "distribucion_tipos": {_TIPOS[k]: round(float(proporciones[k]), 4) for k in _ORDEN},
+            "dimensiones": {},
+            "confianza_media": {
+                _TIPOS[k]: round(float(self.suma_confianza[k] / self.conteo_tipos[k] * 100), 2)
+                for k in _ORDEN if self.conteo_tipos[k]
+            },
+            "histograma_confianza": self.histograma_confianza.sum(axis=0).tolist(),
+        }
+        if self.filas_distribucion:
+            esperadas = self.suma_probabilidades / self.filas_distribucion
+            resumen["distribucion_esperada"] = {_TIPOS[k]: round(float(esperadas[k]), 4) for k in _ORDEN}
+
+        # Márgenes: proporción de cada letra predicha y probabilidad media de la letra
+        predichas = SistemaRazonamiento.marginales_por_codigo(proporciones)
+        medias = self.suma_marginales / self.filas
+        for i, (primera, segunda) in enumerate(LETRAS_DIMENSION):
+            resumen["dimensiones"][f"{primera}/{segunda}"] = {
+                "predicha": {primera: round(float(predichas[i]), 4), segunda: round(float(1 - predichas[i]), 4)},
+                "probabilidad_media": {primera: round(float(medias[i]), 4), segunda: round(float(1 - medias[i]), 4)},
+            }
+
+        resumen.update(self._confusiones_adyacentes(max_confusiones))
+
+        objetivos = list(objetivos) if objetivos else list(TIPOS_MBTI)
+        costo_predicho = SistemaRazonamiento.costo_esperado_por_codigo(proporciones, objetivos, mode)
+        costo_esperado = (SistemaRazonamiento.costo_esperado_por_codigo(esperadas, objetivos, mode)
+                          if self.filas_distribucion else None)
+        resumen["costo_plan_medio"] = {}
+        for j, objetivo in enumerate(objetivos):
+            costo = {"predicho": round(float(costo_predicho[j]), 4)}
+            if costo_esperado is not None:
+                costo["esperado"] = round(float(costo_esperado[j]), 4)
+            resumen["costo_plan_medio"][objetivo] = costo
+        return resumen
+
+    def _confusiones_adyacentes(self, max_confusiones):
+        """Pares de tipos a una sola letra de distancia que compiten como 1.º y 2.º más probable."""
+        pares = self.segundo_tipo + self.segundo_tipo.T
+        por_dimension = np.zeros(4, dtype=np.int64)
+        confusiones = []
+        for a in range(16):
+            for i in range(4):
+                b = a ^ (1 << i)
+                if a < b and pares[a, b]:
+                    por_dimension[i] += pares[a, b]
+                    confusiones.append((int(pares[a, b]), a, b, i))
+        confusiones.sort(key=lambda c: (-c[0], c[1], c[2]))
+        return {
+            "dimension_dudosa": {
+                f"{primera}/{segunda}": round(float(por_dimension[i] / self.filas), 4)
+                for i, (primera, segunda) in enumerate(LETRAS_DIMENSION)
+            },
+            "confusiones_adyacentes": [
+                {"tipos": [_TIPOS[a], _TIPOS[b]],
+                 "dimension": "/".join(LETRAS_DIMENSION[i]),
+                 "filas": filas,
+                 "proporcion": round(filas / self.filas, 4)}
+                for filas, a, b, i in confusiones[:max_confusiones]
+            ],
+        }
+
+
+_CONTADORES = ("conteo_tipos", "suma_probabilidades", "suma_confianza", "histograma_confianza",
+               "suma_marginales", "segundo_tipo")
+# Tipos en orden alfabético para los reportes
+_ORDEN = [SistemaRazonamiento.codificar_tipo(tipo) for tipo in sorted(TIPOS_MBTI)]
+# Tipo de cada código de 4 bits
+_TIPOS = [SistemaRazonamiento.decodificar_tipo(codigo) for codigo in range(16)]
+
+
+# Cohortes desde archivos
+
+def acumular_jsonl(ruta, tamano_bloque=10_000):
+    """Acumula un JSONL de resultados (la salida de main.py --archivo) leyéndolo por bloques de líneas."""
+    acumulador = AcumuladorCohorte()
+    bloque = []
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            if linea.strip():
+                bloque.append(json.loads(linea))
+            if len(bloque) >= tamano_bloque:
+                acumulador.actualizar_resultados(bloque)
+                bloque = []
+    acumulador.actualizar_resultados(bloque)
+    return acumulador
+
+
+# Estado de cada proceso trabajador: la percepción se carga una sola vez
+_percepcion_trabajador = None
+
+
+def _inicializar_trabajador(ruta_modelo, motor):
+    """Carga el modelo al arrancar el trabajador (sus mensajes van a stderr, el resumen a stdout)."""
+    global _percepcion_trabajador
+    from percepcion import SistemaPercepcion
+    _percepcion_trabajador = SistemaPercepcion(ruta_modelo, motor=motor)
+    _percepcion_trabajador.cargar_modelo()
+
+
+def _acumular_fragmento(X):
+    """Parcial de un fragmento: una pasada del modelo y los contadores de sus filas."""
+    clases, probabilidades = _percepcion_trabajador.probabilidades(X)
+    return AcumuladorCohorte().actualizar(probabilidades, clases)
+
+
+def acumular_archivo(ruta, procesos=1, tamano_fragmento=10_000, ruta_modelo=None, motor="keras"):
+    """
+    Puntúa un archivo de respuestas (.csv, .parquet o .npy, ver main.leer_fragmentos) y acumula la
+    cohorte sin guardar resultados por fila. Con varios procesos cada fragmento devuelve su parcial
+    y se combinan a medida que llegan (como mucho 2 fragmentos en vuelo por trabajador).
+    """
+    from main import leer_fragmentos, verificar_formato
+
+    verificar_formato(ruta)
+    if ruta_modelo is None:
+        ruta_modelo = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../models/modelo_personalidad.h5")
+    fragmentos = (X for _, X in leer_fragmentos(ruta, tamano_fragmento))
+    total = AcumuladorCohorte()
+    if procesos == 1:
+        _inicializar_trabajador(ruta_modelo, motor)
+        for X in fragmentos:
+            total.combinar(_acumular_fragmento(X))
+        return total
+
+    import multiprocessing
+    from collections import deque
+
+    contexto = multiprocessing.get_context("spawn")  # TensorFlow no es seguro tras fork
+    with contexto.Pool(procesos, initializer=_inicializar_trabajador, initargs=(ruta_modelo, motor)) as pool:
+        en_vuelo = deque()
+        for X in fragmentos:
+            en_vuelo.append(pool.apply_async(_acumular_fragmento, (X,)))
+            while len(en_vuelo) >= 2 * procesos:
+                total.combinar(en_vuelo.popleft().get())
+        while en_vuelo:
+            total.combinar(en_vuelo.popleft().get())
+    return total
+
+
+def parsear_argumentos():
+    parser = argparse.ArgumentParser(description="Analítica de cohortes MBTI")
+    origen = parser.add_mutually_exclusive_group(required=True)
+    origen.add_argument("--archivo", help="Respuestas a puntuar y acumular (.csv, .parquet o .npy)")
+    origen.add_argument("--jsonl", help="Resultados ya puntuados (salida de main.py --archivo)")
+    origen.add_argument("--combinar", nargs="+", help="Parciales .npz guardados con --guardar")
+    parser.add_argument("--objetivo", nargs="+", default=None, help="Tipos para el costo de plan medio (por defecto, los 16)")
+    parser.add_argument("--modo", choices=["weighted", "unit"], default="weighted",
+                        help=f"Modelo de costos del plan (weighted = PESOS {PESOS})")
+    parser.add_argument("--salida", default="-", help="Archivo JSON del resumen ('-' = salida estándar)")
+    parser.add_argument("--guardar", default=None, help="Guardar los contadores en este .npz para combinarlos después")
+    parser.add_argument("--procesos", type=int, default=1)
+    parser.add_argument("--tamano-fragmento", type=int, default=10_000)
+    parser.add_argument("--motor", choices=["keras", "numpy", "int8"], default="keras")
+    parser.add_argument("--modelo", default=None, help="Ruta del modelo .h5 (el .npz se busca al lado)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parsear_argumentos()
+    if args.archivo:
+        acumulador = acumular_archivo(args.archivo, args.procesos, args.tamano_fragmento, args.modelo, args.motor)
+    elif args.jsonl:
+        acumulador = acumular_jsonl(args.jsonl)
+    else:
+        acumulador = AcumuladorCohorte.combinar_todos(AcumuladorCohorte.cargar(ruta) for ruta in args.combinar)
+    if args.guardar:
+        acumulador.guardar(args.guardar)
+        print(f"Contadores de {acumulador.filas} filas guardados en {args.guardar}", file=sys.stderr)
+    objetivos = [o.upper() for o in args.objetivo] if args.objetivo else None
+    texto = json.dumps(acumulador.resumen(objetivos, args.modo), indent=2, ensure_ascii=False)
+    if args.salida == "-":
+        print(texto)
+    else:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+        print(f"✅ Resumen de {acumulador.filas} filas escrito en {args.salida}", file=sys.stderr)
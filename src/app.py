@@ -3,12 +3,14 @@ APLICACIÓN WEB STREAMLIT
 Interfaz gráfica interactiva para el sistema de análisis de personalidad MBTI.
 """
 
+import os
 import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
 from agente import AgentePersonalidad
+from cuestionario_adaptativo import CuestionarioAdaptativo, obtener_distribucion
 from razonamiento import SistemaRazonamiento, TIPOS_MBTI
 
 # Configuración general
@@ -107,6 +109,24 @@ PREGUNTAS = [
 ]
 
 
+# Agente compartido: un único modelo cargado por proceso para todas las sesiones.
+# MBTI_MOTOR=numpy sirve sin TensorFlow; MBTI_TAMANO_CACHE activa la caché de predicciones.
+@st.cache_resource
+def obtener_agente():
+    return AgentePersonalidad(
+        motor=os.environ.get("MBTI_MOTOR", "keras"),
+        tamano_cache=int(os.environ.get("MBTI_TAMANO_CACHE", "0")),
+    )
+
+
+# Distribución de respuestas por tipo del test adaptativo: una por proceso y por modelo. Si no está
+# construida (python cuestionario_adaptativo.py --solo-ajustar) la ajusta la primera sesión que la pide,
+# una sola vez: obtener_distribucion serializa el ajuste y publica el archivo con os.replace.
+@st.cache_resource
+def obtener_distribucion_respuestas(directorio_modelo):
+    return obtener_distribucion(obtener_agente().percepcion)
+
+
 # Inicializar el estado
 def inicializar_estado():
     if 'respuestas' not in st.session_state:
@@ -115,8 +135,9 @@ def inicializar_estado():
         st.session_state.pagina = 0
     if 'resultado' not in st.session_state:
         st.session_state.resultado = None
-    if 'agente' not in st.session_state:
-        st.session_state.agente = AgentePersonalidad()
+    if 'cuestionario' not in st.session_state:
+        st.session_state.cuestionario = None
+    obtener_agente()  # se carga una sola vez por proceso, en la primera sesión
 
 # Página: Test MBTI
 def pagina_test():
@@ -151,7 +172,7 @@ def pagina_test():
             if st.button("🎯 Analizar Resultado", type="primary"):
                 with st.spinner("Analizando tu personalidad..."):
                     tipo_objetivo = st.session_state.get('tipo_objetivo', None)
-                    resultado = st.session_state.agente.analizar_completo(
+                    resultado = obtener_agente().analizar_completo(
                         st.session_state.respuestas,
                         tipo_objetivo
                     )
@@ -159,6 +180,50 @@ def pagina_test():
                 st.success("¡Análisis completado!")
                 st.rerun()
 
+# Página: Test adaptativo (re-estima el tipo tras cada respuesta y termina al superar el umbral)
+def pagina_test_adaptativo(umbral):
+    st.title("🧠 Test de Personalidad MBTI Adaptativo")
+
+    cuestionario = st.session_state.cuestionario
+    if cuestionario is None or cuestionario.umbral != umbral:
+        # La primera sesión del proceso puede ajustar la distribución de respuestas por tipo sobre el dataset
+        percepcion = obtener_agente().percepcion
+        with st.spinner("Preparando el test adaptativo..."):
+            distribucion = obtener_distribucion_respuestas(percepcion.directorio_modelo)
+            cuestionario = CuestionarioAdaptativo(percepcion, umbral=umbral, distribucion=distribucion)
+        st.session_state.cuestionario = cuestionario
+    if cuestionario.distribucion_implicita:
+        st.warning("No hay distribución de respuestas por tipo (models/distribucion_respuestas.npz) ni dataset "
+                   "para calcularla: el orden de las preguntas usa la estimación del propio modelo y el test "
+                   "puede necesitar más preguntas.")
+
+    tipo, confianza = cuestionario.prediccion()
+    if cuestionario.terminado():
+        if st.session_state.resultado is None:
+            resultado = obtener_agente().analizar_probabilidades(
+                cuestionario.probabilidades(), st.session_state.get('tipo_objetivo', None)
+            )[0]
+            resultado["preguntas_respondidas"] = cuestionario.respondidas
+            st.session_state.resultado = resultado
+        st.success(f"¡Análisis completado con {cuestionario.respondidas} de {len(PREGUNTAS)} preguntas! "
+                   "Abre 'Ver Resultado' para verlo.")
+        return
+
+    st.progress(min(confianza / (umbral * 100), 1.0))
+    st.write(f"Pregunta {cuestionario.respondidas + 1} · estimación actual: {tipo} ({confianza:.1f}%)")
+
+    pregunta_idx = cuestionario.siguiente_pregunta()
+    st.markdown(f"### {PREGUNTAS[pregunta_idx]}")
+    respuesta = st.select_slider(
+        "Tu respuesta:",
+        options=[-3, -2, -1, 0, 1, 2, 3],
+        value=0,
+        key=f"adaptativa_{cuestionario.respondidas}_{pregunta_idx}"
+    )
+    if st.button("Responder ➡️", type="primary"):
+        cuestionario.responder(pregunta_idx, respuesta)
+        st.rerun()
+
 # Página: Resultado
 def pagina_resultado():
     if st.session_state.resultado is None:
@@ -178,21 +243,42 @@ def pagina_resultado():
     for rasgo in resultado["razonamiento"]:
         st.write(f"✓ {rasgo}")
 
+    hechos = resultado.get("hechos", {})
+    secciones = [("carrera", "💼 Carreras afines"), ("comunicacion", "💬 Estilo de comunicación"),
+                 ("conflicto", "⚡ En situaciones de conflicto"), ("consejo", "🌱 Sugerencias")]
+    columnas = st.columns(2)
+    for i, (categoria, titulo) in enumerate(c for c in secciones if hechos.get(c[0])):
+        with columnas[i % 2]:
+            st.markdown(f"#### {titulo}")
+            for valor in hechos[categoria]:
+                st.write(f"• {valor[0].upper()}{valor[1:]}")
+
     tipo = resultado["tipo_predicho"]
+    # Altura de cada barra: probabilidad de la letra predicha en su dimensión (1 si no hay distribución)
+    dimensiones = list(resultado.get("dimensiones", {}).values())
+    alturas = [dimensiones[i][letra] if dimensiones else 1 for i, letra in enumerate(tipo)]
     fig = go.Figure(data=[go.Bar(
         x=['Energía', 'Información', 'Decisiones', 'Estilo'],
-        y=[1, 1, 1, 1],
-        text=[tipo[0], tipo[1], tipo[2], tipo[3]],
+        y=alturas,
+        text=[f"{letra} {altura:.0%}" if dimensiones else letra for letra, altura in zip(tipo, alturas)],
         textposition='inside',
         marker_color=['#667eea', '#764ba2', '#667eea', '#764ba2']
     )])
-    fig.update_layout(height=300, title="Componentes de tu personalidad MBTI", yaxis_visible=False)
+    fig.update_layout(height=300, title="Componentes de tu personalidad MBTI",
+                      yaxis_visible=False, yaxis_range=[0, 1])
     st.plotly_chart(fig, use_container_width=True)
 
+    if resultado.get("top_tipos"):
+        st.markdown("### 📊 Tipos más probables")
+        for candidato in resultado["top_tipos"]:
+            st.write(f"{candidato['tipo']}: {candidato['probabilidad']:.1%}")
+
     if "planificacion" in resultado:
         plan = resultado["planificacion"]
         st.markdown("### 🗺️ Camino hacia tu Objetivo")
         st.write(" → ".join(plan["camino"]))
+        if "costo_esperado" in plan:
+            st.caption(f"Costo esperado considerando la incertidumbre del tipo: {plan['costo_esperado']:.2f}")
 
     col1, col2 = st.columns(2)
     with col1:
@@ -200,6 +286,7 @@ def pagina_resultado():
             st.session_state.respuestas = [0] * 60
             st.session_state.pagina = 0
             st.session_state.resultado = None
+            st.session_state.cuestionario = None
             st.rerun()
     with col2:
         import json
@@ -224,9 +311,15 @@ def main():
         if st.checkbox("Establecer tipo objetivo"):
             tipo_obj = st.selectbox("Tipo MBTI objetivo", [""] + TIPOS_MBTI)
             st.session_state.tipo_objetivo = tipo_obj if tipo_obj else None
+        adaptativo = st.checkbox("Test adaptativo (termina antes si ya hay confianza)")
+        if adaptativo:
+            umbral = st.slider("Confianza para terminar", 0.70, 0.99, 0.95, 0.01)
 
     if opcion == "🧪 Realizar Test":
-        pagina_test()
+        if adaptativo:
+            pagina_test_adaptativo(umbral)
+        else:
+            pagina_test()
     elif opcion == "📊 Ver Resultado":
         pagina_resultado()
 
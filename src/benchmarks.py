@@ -0,0 +1,825 @@
+"""
+MÓDULO DE BENCHMARKS
+Mediciones reproducibles de rendimiento del agente. Cada benchmark se ejecuta como subcomando:
+
+    python benchmarks.py arranque
+    python benchmarks.py planificador --niveles 2 4 8 16
+    python benchmarks.py planificacion_lote --usuarios 10000 --objetivos ENFP INTJ
+    python benchmarks.py carga_servidor --lanzar --concurrencia 64 --peticiones 5000
+    python benchmarks.py sesiones --sesiones 1 8 32
+    python benchmarks.py inferencia --motor keras numpy --salida base.json
+    python benchmarks.py comparar base.json nuevo.json --tolerancia 0.10
+    python benchmarks.py cuantizacion --motor keras numpy int8
+    python benchmarks.py reglas --tamanos 0 1000 10000 50000
+    python benchmarks.py entrenamiento --batch-sizes 64 256 1024 --replicas 1 2 --escalado-tasa raiz
+"""
+
+import argparse
+import heapq
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Pico de memoria residente del proceso hijo, común a los scripts que se ejecutan en un proceso nuevo.
+# VmHWM se reinicia con exec; ru_maxrss arrastra el pico del proceso padre que hizo el fork.
+# (Se antepone a scripts que pasan por str.format: no puede tener llaves.)
+_RSS_PICO = """
+import resource
+
+def rss_pico_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for linea in f:
+                if linea.startswith("VmHWM:"):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+"""
+
+# Script que se ejecuta en un proceso nuevo para medir el costo de arranque real
+_SCRIPT_ARRANQUE = _RSS_PICO + """
+import json, sys, time
+t0 = time.perf_counter()
+import {modulo}
+importacion = time.perf_counter() - t0
+primera_prediccion = None
+if {motor!r}:
+    from agente import AgentePersonalidad
+    t1 = time.perf_counter()
+    agente = AgentePersonalidad(motor={motor!r}, carga_diferida=True)
+    agente.analizar_completo([0] * 60)
+    primera_prediccion = time.perf_counter() - t1
+print("@@" + json.dumps({{
+    "importacion_s": importacion,
+    "primera_prediccion_s": primera_prediccion,
+    "rss_pico_mb": rss_pico_mb(),
+    "tensorflow_importado": "tensorflow" in sys.modules,
+    "sklearn_importado": "sklearn" in sys.modules,
+    "pandas_importado": "pandas" in sys.modules,
+}}))
+"""
+
+# (etiqueta, módulo a importar, motor para la primera predicción o None)
+ESCENARIOS_ARRANQUE = [
+    ("razonamiento", "razonamiento", None),
+    ("main.py (keras)", "main", "keras"),
+    ("main.py (numpy)", "main", "numpy"),
+    ("app.py (keras)", "app", "keras"),
+    ("app.py (numpy)", "app", "numpy"),
+]
+
+
+def benchmark_arranque(repeticiones=3):
+    """Tiempo de importación y RSS pico de main.py, app.py y 'import razonamiento', cada uno en un proceso limpio."""
+    resultados = []
+    for etiqueta, modulo, motor in ESCENARIOS_ARRANQUE:
+        script = _SCRIPT_ARRANQUE.format(modulo=modulo, motor=motor)
+        muestras = []
+        error = None
+        for _ in range(repeticiones):
+            proceso = subprocess.run(
+                [sys.executable, "-c", script], cwd=BASE_DIR, capture_output=True, text=True
+            )
+            lineas = [l for l in proceso.stdout.splitlines() if l.startswith("@@")]
+            if proceso.returncode != 0 or not lineas:
+                error = (proceso.stderr.strip().splitlines() or ["error desconocido"])[-1]
+                break
+            muestras.append(json.loads(lineas[-1][2:]))
+
+        if error:
+            resultados.append({"escenario": etiqueta, "error": error})
+            continue
+        mejor = min(muestras, key=lambda m: m["importacion_s"])
+        resultados.append({"escenario": etiqueta, "repeticiones": repeticiones, **mejor})
+    return {"arranque": resultados}
+
+
+# Tope de expansiones para la réplica del A* original: con heurística exacta y desempate por menor g
+# expande cada camino óptimo por separado y crece combinatoriamente con el tamaño del espacio
+LIMITE_EXPANSIONES_COPIAS = 50_000
+
+
+def _a_estrella_copias(espacio, inicio, objetivo):
+    """
+    Réplica genérica del A* original (copia del camino en cada inserción, sin conjunto cerrado), como referencia.
+    Devuelve {"agotado": True} si supera LIMITE_EXPANSIONES_COPIAS.
+    """
+    frontera = [(espacio.heuristica(inicio, objetivo), 0, 0, inicio, [inicio])]
+    visitados = {}
+    expandidos = 0
+    desempate = 0
+    while frontera:
+        _, g, _, actual, camino = heapq.heappop(frontera)
+        if actual in visitados and g > visitados[actual]:
+            continue
+        expandidos += 1
+        if expandidos > LIMITE_EXPANSIONES_COPIAS:
+            return {"agotado": True, "nodos_explorados": [None] * expandidos}
+        if actual == objetivo:
+            return {"costo": g, "nodos_explorados": [None] * expandidos}
+        visitados[actual] = g
+        for vecino, costo in espacio.vecinos(actual):
+            nuevo_g = g + costo
+            if vecino in visitados and nuevo_g >= visitados[vecino]:
+                continue
+            desempate += 1
+            heapq.heappush(frontera, (nuevo_g + espacio.heuristica(vecino, objetivo), nuevo_g, desempate, vecino, camino + [vecino]))
+    return None
+
+
+def benchmark_planificador(niveles=(2, 4, 8, 16), dimensiones=4, densidad_obstaculos=0.2, consultas=50, semilla=0):
+    """
+    Compara los planificadores de planificacion.py sobre espacios EspacioDimensiones crecientes
+    (niveles^dimensiones estados, costos asimétricos y una fracción de estados prohibidos).
+    """
+    from planificacion import EspacioDimensiones, a_estrella, busqueda_bidireccional
+
+    class _SinHeuristica(EspacioDimensiones):
+        def heuristica(self, estado, objetivo):
+            return 0
+
+    umbral = int(densidad_obstaculos * 1000)
+    prohibido = lambda estado: hash(estado) % 1000 < umbral
+    costos_subida = [1 + i for i in range(dimensiones)]
+    costos_bajada = list(reversed(costos_subida))
+    algoritmos = {
+        "a_estrella": (EspacioDimensiones, a_estrella),
+        "bidireccional": (EspacioDimensiones, busqueda_bidireccional),
+        "dijkstra": (_SinHeuristica, a_estrella),
+        "a_estrella_copias": (EspacioDimensiones, _a_estrella_copias),
+    }
+
+    rng = random.Random(semilla)
+    resultados = []
+    for k in niveles:
+        espacios = {
+            nombre: clase([k] * dimensiones, costos_subida, costos_bajada, prohibido=prohibido)
+            for nombre, (clase, _) in algoritmos.items()
+        }
+        consultas_k = []
+        while len(consultas_k) < consultas:
+            a = tuple(rng.randrange(k) for _ in range(dimensiones))
+            b = tuple(rng.randrange(k) for _ in range(dimensiones))
+            if not prohibido(a) and not prohibido(b):
+                consultas_k.append((a, b))
+
+        fila = {"niveles": k, "estados": k ** dimensiones, "consultas": consultas}
+        for nombre, (_, buscar) in algoritmos.items():
+            espacio = espacios[nombre]
+            expandidos = 0
+            agotadas = 0
+            t0 = time.perf_counter()
+            for a, b in consultas_k:
+                r = buscar(espacio, a, b)
+                if r is not None:
+                    expandidos += len(r["nodos_explorados"])
+                    agotadas += r.get("agotado", False)
+            fila[nombre] = {
+                "ms_por_consulta": (time.perf_counter() - t0) * 1000 / consultas,
+                "nodos_expandidos_medio": expandidos / consultas,
+            }
+            if agotadas:
+                fila[nombre]["consultas_agotadas"] = agotadas
+        resultados.append(fila)
+    return {"planificador": resultados}
+
+
+def benchmark_planificacion_lote(usuarios=10000, objetivos=("ENFP", "INTJ", "ISTJ", "ESFP"), mode="weighted", semilla=0):
+    """Compara planificar_lote (N x K pares en una llamada) contra un bucle de busqueda_a_estrella."""
+    import numpy as np
+    from razonamiento import SistemaRazonamiento, TIPOS_MBTI
+
+    rng = np.random.default_rng(semilla)
+    inicios = rng.choice(TIPOS_MBTI, size=usuarios)
+    objetivos = list(objetivos)
+
+    t0 = time.perf_counter()
+    lote = SistemaRazonamiento.planificar_lote(inicios[:, None], objetivos, mode=mode)
+    t_lote = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    costos_bucle = [
+        [SistemaRazonamiento.busqueda_a_estrella(inicio, objetivo, mode=mode)["costo"] for objetivo in objetivos]
+        for inicio in inicios.tolist()
+    ]
+    t_bucle = time.perf_counter() - t0
+
+    pares = usuarios * len(objetivos)
+    return {"planificacion_lote": {
+        "pares": pares,
+        "mode": mode,
+        "lote_s": t_lote,
+        "bucle_a_estrella_s": t_bucle,
+        "pares_por_s_lote": pares / t_lote,
+        "pares_por_s_bucle": pares / t_bucle,
+        "aceleracion": t_bucle / t_lote,
+        "costos_coinciden": bool(np.array_equal(lote["costos"], np.array(costos_bucle))),
+    }}
+
+
+def _escribir_reglas_sinteticas(ruta, cantidad, proporcion_letras=0.0, semilla=0):
+    """
+    Escribe 'cantidad' reglas que imitan una base grande: encadenan hechos de un vocabulario propio
+    (x0, x1, ...) con 1 a 3 antecedentes. Con proporcion_letras > 0 esa fracción de reglas menciona además
+    una letra MBTI, así que el índice las toca en cada inferencia aunque nunca se completen.
+    """
+    rng = random.Random(semilla)
+    reglas = []
+    for i in range(cantidad):
+        antecedentes = [f"x{rng.randrange(cantidad)}" for _ in range(rng.randint(1, 3))]
+        if rng.random() < proporcion_letras:
+            antecedentes.append(rng.choice("EINSTFJP"))
+        reglas.append({"id": f"sintetica_{i}", "si": antecedentes, "entonces": [f"x{rng.randrange(cantidad)}"]})
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump({"reglas": reglas}, f)
+
+
+def benchmark_reglas(tamanos=(0, 1000, 10000, 50000), proporcion_letras=0.0, repeticiones=200,
+                     repeticiones_sin_indice=5, semilla=0):
+    """
+    Costo de inferir los hechos de los 16 tipos con la base de data/reglas más N reglas sintéticas:
+    motor indexado por antecedente, referencia sin índice y razonar_sobre_tipo memorizado.
+    """
+    import shutil
+    import statistics
+    import tempfile
+    import razonamiento
+    from razonamiento import SistemaRazonamiento
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as directorio:
+        for nombre in os.listdir(razonamiento.DIRECTORIO_REGLAS):
+            if nombre.endswith(".json"):
+                shutil.copy(os.path.join(razonamiento.DIRECTORIO_REGLAS, nombre), directorio)
+        try:
+            for tamano in tamanos:
+                _escribir_reglas_sinteticas(os.path.join(directorio, "99_sinteticas.json"), tamano,
+                                            proporcion_letras, semilla)
+                t0 = time.perf_counter()
+                total = SistemaRazonamiento.recargar_reglas(directorio)
+                carga = time.perf_counter() - t0
+                motor = razonamiento._motor_reglas()
+                iniciales = [razonamiento._hechos_iniciales(codigo) for codigo in range(16)]
+
+                indexada = _medir(lambda: [motor.inferir(h) for h in iniciales], repeticiones)
+                sin_indice = _medir(lambda: [motor.inferir_sin_indice(h) for h in iniciales],
+                                    repeticiones_sin_indice, calentamiento=1)
+                memorizada = _medir(lambda: [SistemaRazonamiento.razonar_sobre_tipo(t) for t in razonamiento.TIPOS_MBTI],
+                                    repeticiones)
+                resultados.append({
+                    "reglas": total,
+                    "carga_s": carga,
+                    "us_por_inferencia_indexada": statistics.median(indexada) / 16 * 1e6,
+                    "us_por_inferencia_sin_indice": statistics.median(sin_indice) / 16 * 1e6,
+                    "us_por_razonar_memorizado": statistics.median(memorizada) / 16 * 1e6,
+                    "reglas_tocadas_por_inferencia": sum(motor.inferir(h).evaluaciones for h in iniciales) / 16,
+                    "reglas_evaluadas_sin_indice": sum(motor.inferir_sin_indice(h).evaluaciones for h in iniciales) / 16,
+                })
+                print(f"  {total:>6} reglas: indexada {resultados[-1]['us_por_inferencia_indexada']:.1f} µs, "
+                      f"sin índice {resultados[-1]['us_por_inferencia_sin_indice']:.1f} µs")
+        finally:
+            SistemaRazonamiento.recargar_reglas()
+    return {"reglas": resultados}
+
+
+# Simula N sesiones de Streamlit en un proceso limpio: cada sesión es un hilo que hace un análisis.
+# "por_sesion" reproduce el comportamiento anterior (un AgentePersonalidad por sesión);
+# "compartido" usa un único agente para todas (como obtener_agente con st.cache_resource).
+_SCRIPT_SESIONES = _RSS_PICO + """
+import json, threading, time
+import numpy as np
+from agente import AgentePersonalidad
+
+sesiones, modo, motor = {sesiones}, {modo!r}, {motor!r}
+respuestas = np.random.default_rng(0).integers(-3, 4, size=(sesiones, 60)).tolist()
+latencias = [0.0] * sesiones
+t0 = time.perf_counter()
+if modo == "compartido":
+    compartido = AgentePersonalidad(motor=motor)
+carga = time.perf_counter() - t0
+
+def sesion(i):
+    t = time.perf_counter()
+    agente = compartido if modo == "compartido" else AgentePersonalidad(motor=motor)
+    agente.analizar_completo(respuestas[i], "ENFP")
+    latencias[i] = time.perf_counter() - t
+
+hilos = [threading.Thread(target=sesion, args=(i,)) for i in range(sesiones)]
+t0 = time.perf_counter()
+for h in hilos:
+    h.start()
+for h in hilos:
+    h.join()
+print("@@" + json.dumps({{
+    "carga_inicial_s": carga,
+    "duracion_s": time.perf_counter() - t0,
+    "latencias": latencias,
+    "rss_pico_mb": rss_pico_mb(),
+}}))
+"""
+
+
+def benchmark_sesiones(sesiones=(1, 8, 32), motor="keras"):
+    """Memoria y latencia con N sesiones simultáneas: un agente por sesión contra un agente compartido."""
+    resultados = []
+    for n in sesiones:
+        for modo in ("por_sesion", "compartido"):
+            script = _SCRIPT_SESIONES.format(sesiones=n, modo=modo, motor=motor)
+            proceso = subprocess.run([sys.executable, "-c", script], cwd=BASE_DIR, capture_output=True, text=True)
+            lineas = [l for l in proceso.stdout.splitlines() if l.startswith("@@")]
+            if proceso.returncode != 0 or not lineas:
+                error = (proceso.stderr.strip().splitlines() or ["error desconocido"])[-1]
+                resultados.append({"sesiones": n, "modo": modo, "error": error})
+                continue
+            datos = json.loads(lineas[-1][2:])
+            resultados.append({
+                "sesiones": n,
+                "modo": modo,
+                "motor": motor,
+                "carga_inicial_s": datos["carga_inicial_s"],
+                "duracion_s": datos["duracion_s"],
+                "rss_pico_mb": datos["rss_pico_mb"],
+                **_percentiles_ms(datos["latencias"]),
+            })
+    return {"sesiones": resultados}
+
+
+# Entrena con una configuración en un proceso limpio (los hilos de TensorFlow se fijan al arrancar)
+_SCRIPT_ENTRENAMIENTO = """
+import json, os, tempfile
+from percepcion import SistemaPercepcion
+
+with tempfile.TemporaryDirectory() as directorio:
+    sistema = SistemaPercepcion(os.path.join(directorio, "modelo.h5"))
+    sistema.entrenar({csv!r}, {batch_size}, {epochs}, {escalado!r}, {replicas}, {intra}, {inter})
+print("@@" + json.dumps(sistema.rendimiento_entrenamiento))
+"""
+
+
+def benchmark_entrenamiento(ruta_csv=None, batch_sizes=(64, 256, 1024), replicas=(1,), hilos_intra=(None,),
+                            hilos_inter=None, escalado_tasa="raiz", epochs=20, exactitud_minima=0.98):
+    """
+    Tiempo por época y muestras/s de entrenar para cada combinación de batch_size, réplicas
+    (MirroredStrategy) e hilos, cada una en su propio proceso. Indica la más rápida cuya
+    exactitud de test llega a exactitud_minima.
+    """
+    import itertools
+
+    ruta_csv = os.path.abspath(ruta_csv or os.path.join(BASE_DIR, "..", "data", "16P.csv"))
+    resultados = []
+    for batch_size, n_replicas, intra in itertools.product(batch_sizes, replicas, hilos_intra):
+        script = _SCRIPT_ENTRENAMIENTO.format(csv=ruta_csv, batch_size=batch_size, epochs=epochs,
+                                              escalado=escalado_tasa, replicas=n_replicas,
+                                              intra=intra, inter=hilos_inter)
+        proceso = subprocess.run([sys.executable, "-c", script], cwd=BASE_DIR, capture_output=True, text=True)
+        lineas = [l for l in proceso.stdout.splitlines() if l.startswith("@@")]
+        if proceso.returncode != 0 or not lineas:
+            error = (proceso.stderr.strip().splitlines() or ["error desconocido"])[-1]
+            resultados.append({"batch_size": batch_size, "replicas": n_replicas, "hilos_intra": intra, "error": error})
+            continue
+        resultados.append(json.loads(lineas[-1][2:]))
+        print(f"batch {batch_size}, {n_replicas} réplica(s), intra {intra}: "
+              f"{resultados[-1]['muestras_por_segundo']:,.0f} muestras/s, exactitud {resultados[-1]['exactitud_test']}",
+              file=sys.stderr)
+
+    validas = [r for r in resultados if r.get("exactitud_test", 0) >= exactitud_minima]
+    mejor = max(validas, key=lambda r: r["muestras_por_segundo"]) if validas else None
+    return {"metadatos": _metadatos(), "exactitud_minima": exactitud_minima,
+            "configuraciones": resultados, "mas_rapida": mejor}
+
+
+def _percentiles_ms(latencias):
+    import numpy as np
+
+    if not latencias:
+        return {}
+    p50, p95, p99 = np.percentile(np.asarray(latencias) * 1000, [50, 95, 99])
+    return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+
+
+# Arranque en frío de AgentePersonalidad() (importaciones + carga del modelo) en un proceso limpio
+_SCRIPT_ARRANQUE_AGENTE = _RSS_PICO + """
+import json, time
+
+t0 = time.perf_counter()
+from agente import AgentePersonalidad
+importacion = time.perf_counter() - t0
+t1 = time.perf_counter()
+agente = AgentePersonalidad(motor={motor!r})
+carga = time.perf_counter() - t1
+t2 = time.perf_counter()
+agente.analizar_completo([0] * 60)
+primera = time.perf_counter() - t2
+print("@@" + json.dumps({{"importacion_s": importacion, "carga_modelo_s": carga,
+                          "primer_analisis_s": primera, "total_s": time.perf_counter() - t0,
+                          "rss_pico_mb": rss_pico_mb()}}))
+"""
+
+TAMANOS_LOTE = (1, 4, 16, 64, 256, 1024, 4096)
+
+
+def _metadatos():
+    """Contexto de la corrida, para saber qué se está comparando."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def _medir(funcion, repeticiones, calentamiento=3):
+    """Ejecuta 'funcion' varias veces (tras un calentamiento) y devuelve las latencias en segundos."""
+    for _ in range(calentamiento):
+        funcion()
+    latencias = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        latencias.append(time.perf_counter() - t0)
+    return latencias
+
+
+def benchmark_inferencia(motores=("keras", "numpy"), tamanos_lote=TAMANOS_LOTE, filas_por_medicion=20000,
+                         repeticiones_arranque=3, semilla=0):
+    """
+    Latencia (p50/p95/p99) y filas/s de la inferencia con respuestas sintéticas, sin datos ni red:
+      - predecir (una fila) y predecir_lote para cada tamaño de lote,
+      - arranque en frío de AgentePersonalidad() en un proceso nuevo,
+      - busqueda_a_estrella por llamada en ambos modos (todos los pares de tipos),
+      - analizar_completo de punta a punta, con y sin tipo objetivo.
+    """
+    import numpy as np
+    from agente import AgentePersonalidad
+    from razonamiento import SistemaRazonamiento, TIPOS_MBTI
+
+    rng = np.random.default_rng(semilla)
+    resultados = {"metadatos": _metadatos(), "motores": {}}
+
+    for motor in motores:
+        agente = AgentePersonalidad(motor=motor)
+        percepcion = agente.percepcion
+        datos = {}
+
+        respuestas = rng.integers(-3, 4, size=(512, 60)).tolist()
+        ciclo = iter(range(10 ** 9))
+        latencias = _medir(lambda: percepcion.predecir(respuestas[next(ciclo) % 512]), 500)
+        datos["predecir"] = {**_percentiles_ms(latencias), "filas_por_s": len(latencias) / sum(latencias)}
+
+        lotes = []
+        for tamano in tamanos_lote:
+            matriz = rng.integers(-3, 4, size=(tamano, 60)).astype(np.float32)
+            repeticiones = max(5, min(500, filas_por_medicion // tamano))
+            latencias = _medir(lambda: percepcion.predecir_lote(matriz, tamano_lote=tamano), repeticiones)
+            lotes.append({"tamano_lote": tamano, "repeticiones": repeticiones, **_percentiles_ms(latencias),
+                          "filas_por_s": tamano * repeticiones / sum(latencias)})
+        datos["predecir_lote"] = lotes
+
+        ciclo = iter(range(10 ** 9))
+        for nombre, objetivo in (("analizar_completo", None), ("analizar_completo_objetivo", "ENFP")):
+            latencias = _medir(lambda: agente.analizar_completo(respuestas[next(ciclo) % 512], objetivo), 500)
+            datos[nombre] = {**_percentiles_ms(latencias), "filas_por_s": len(latencias) / sum(latencias)}
+
+        arranques = []
+        for _ in range(repeticiones_arranque):
+            proceso = subprocess.run([sys.executable, "-c", _SCRIPT_ARRANQUE_AGENTE.format(motor=motor)],
+                                     cwd=BASE_DIR, capture_output=True, text=True)
+            lineas = [l for l in proceso.stdout.splitlines() if l.startswith("@@")]
+            if proceso.returncode != 0 or not lineas:
+                arranques = {"error": (proceso.stderr.strip().splitlines() or ["error desconocido"])[-1]}
+                break
+            arranques.append(json.loads(lineas[-1][2:]))
+        if isinstance(arranques, list):
+            arranques = {"repeticiones": len(arranques), **min(arranques, key=lambda m: m["total_s"])}
+        datos["arranque_en_frio"] = arranques
+
+        resultados["motores"][motor] = datos
+
+    pares = [(a, b) for a in TIPOS_MBTI for b in TIPOS_MBTI]
+    resultados["busqueda_a_estrella"] = {}
+    for mode in ("unit", "weighted"):
+        latencias = []
+        for _ in range(3):
+            for inicio, objetivo in pares:
+                t0 = time.perf_counter()
+                SistemaRazonamiento.busqueda_a_estrella(inicio, objetivo, mode=mode)
+                latencias.append(time.perf_counter() - t0)
+        resultados["busqueda_a_estrella"][mode] = {
+            "llamadas": len(latencias),
+            "p50_us": float(np.percentile(latencias, 50) * 1e6),
+            "p95_us": float(np.percentile(latencias, 95) * 1e6),
+            "p99_us": float(np.percentile(latencias, 99) * 1e6),
+            "llamadas_por_s": len(latencias) / sum(latencias),
+        }
+
+    return {"inferencia": resultados}
+
+
+def benchmark_cuantizacion(motores=("keras", "numpy", "int8"), tamano_lote=1024, semilla=0):
+    """
+    Memoria y latencia por predicción del modelo float (Keras y NumPy) contra el int8:
+    tamaño del archivo y de los pesos en memoria, RSS pico de un proceso que carga el agente
+    y predice una vez, latencia de predecir (una fila) y filas/s de predecir_lote.
+    El modelo int8 se genera con: python percepcion.py --exportar-int8
+    """
+    import numpy as np
+    from agente import AgentePersonalidad
+
+    rng = np.random.default_rng(semilla)
+    respuestas = rng.integers(-3, 4, size=(512, 60)).tolist()
+    matriz = rng.integers(-3, 4, size=(tamano_lote, 60)).astype(np.float32)
+    resultados = []
+
+    for motor in motores:
+        proceso = subprocess.run([sys.executable, "-c", _SCRIPT_ARRANQUE_AGENTE.format(motor=motor)],
+                                 cwd=BASE_DIR, capture_output=True, text=True)
+        lineas = [l for l in proceso.stdout.splitlines() if l.startswith("@@")]
+        if proceso.returncode != 0 or not lineas:
+            error = (proceso.stderr.strip().splitlines() or ["error desconocido"])[-1]
+            resultados.append({"motor": motor, "error": error})
+            continue
+        arranque = json.loads(lineas[-1][2:])
+
+        agente = AgentePersonalidad(motor=motor)
+        percepcion = agente.percepcion
+        ruta = percepcion.ruta_fuente(motor)  # con NumPy es el .paquete si existe, no el .npz
+        if motor == "keras":
+            memoria_pesos = sum(w.nbytes for w in percepcion.modelo.get_weights())
+        else:
+            memoria_pesos = percepcion.modelo.memoria_pesos()
+
+        ciclo = iter(range(10 ** 9))
+        latencias = _medir(lambda: percepcion.predecir(respuestas[next(ciclo) % 512]), 1000)
+        lote = _medir(lambda: percepcion.predecir_lote(matriz, tamano_lote=tamano_lote), 20)
+        resultados.append({
+            "motor": motor,
+            "archivo": os.path.basename(ruta),
+            "archivo_kb": os.path.getsize(ruta) / 1024,
+            "pesos_en_memoria_kb": memoria_pesos / 1024,
+            "rss_pico_proceso_mb": arranque["rss_pico_mb"],
+            "carga_modelo_s": arranque["carga_modelo_s"],
+            "predecir": _percentiles_ms(latencias),
+            f"predecir_lote_{tamano_lote}_filas_por_s": tamano_lote * len(lote) / sum(lote),
+        })
+    return {"cuantizacion": resultados}
+
+
+def _metricas_planas(datos, prefijo=""):
+    """Aplana un resultado de benchmark_inferencia en {ruta: valor} para comparar corridas."""
+    planas = {}
+    if isinstance(datos, dict):
+        for clave, valor in datos.items():
+            if clave != "metadatos":
+                planas.update(_metricas_planas(valor, f"{prefijo}{clave}."))
+    elif isinstance(datos, list):
+        for elemento in datos:
+            etiqueta = elemento.get("tamano_lote", "") if isinstance(elemento, dict) else ""
+            planas.update(_metricas_planas(elemento, f"{prefijo}{etiqueta}."))
+    elif isinstance(datos, (int, float)) and not isinstance(datos, bool):
+        planas[prefijo.rstrip(".")] = datos
+    return planas
+
+
+def comparar_resultados(ruta_base, ruta_nueva, tolerancia=0.10):
+    """
+    Compara dos JSON de 'inferencia' y marca regresiones mayores a 'tolerancia' (fracción):
+    latencias y tiempos (_ms, _us, _s) que suben, y rendimientos (por_s) que bajan.
+    """
+    with open(ruta_base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(ruta_nueva, encoding="utf-8") as f:
+        nueva = json.load(f)
+    planas_base, planas_nueva = _metricas_planas(base), _metricas_planas(nueva)
+
+    regresiones, mejoras = [], []
+    for metrica in sorted(planas_base.keys() & planas_nueva.keys()):
+        antes, despues = planas_base[metrica], planas_nueva[metrica]
+        if metrica.endswith("por_s"):
+            cambio = (antes - despues) / antes if antes else 0.0
+        elif metrica.endswith(("_ms", "_us", "_s")):
+            cambio = (despues - antes) / antes if antes else 0.0
+        else:
+            continue
+        fila = {"metrica": metrica, "antes": antes, "despues": despues, "empeora_en": round(cambio, 4)}
+        if cambio > tolerancia:
+            regresiones.append(fila)
+        elif cambio < -tolerancia:
+            mejoras.append(fila)
+
+    return {"comparacion": {
+        "base": base.get("inferencia", {}).get("metadatos"),
+        "nueva": nueva.get("inferencia", {}).get("metadatos"),
+        "tolerancia": tolerancia,
+        "regresiones": regresiones,
+        "mejoras": mejoras,
+    }}
+
+
+def benchmark_carga_servidor(host="127.0.0.1", puerto=8080, concurrencia=64, peticiones=5000,
+                             lanzar=False, motor="numpy", max_lote=256, max_espera_ms=5.0, semilla=0):
+    """
+    Prueba de carga contra servidor.py en localhost: 'concurrencia' clientes con conexiones keep-alive
+    envían en total 'peticiones' POST /analizar. Con lanzar=True levanta el servidor en un subproceso.
+    """
+    import http.client
+    import threading
+    import numpy as np
+
+    proceso = None
+    if lanzar:
+        proceso = subprocess.Popen(
+            [sys.executable, "servidor.py", "--host", host, "--puerto", str(puerto), "--motor", motor,
+             "--max-lote", str(max_lote), "--max-espera-ms", str(max_espera_ms)],
+            cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+
+    def conectar():
+        return http.client.HTTPConnection(host, puerto, timeout=60)
+
+    try:
+        # Esperar a que el servidor responda
+        limite = time.time() + 120
+        while True:
+            try:
+                c = conectar()
+                c.request("GET", "/salud")
+                c.getresponse().read()
+                c.close()
+                break
+            except OSError:
+                if time.time() > limite or (proceso is not None and proceso.poll() is not None):
+                    raise RuntimeError(f"El servidor no responde en {host}:{puerto}")
+                time.sleep(0.2)
+
+        rng = np.random.default_rng(semilla)
+        cuerpos = [
+            json.dumps({"respuestas": fila, "tipo_objetivo": "ENFP"}).encode()
+            for fila in rng.integers(-3, 4, size=(min(peticiones, 1000), 60)).tolist()
+        ]
+        latencias = []
+        errores = []
+        candado = threading.Lock()
+        por_cliente = [peticiones // concurrencia + (i < peticiones % concurrencia) for i in range(concurrencia)]
+
+        def cliente(indice, cantidad):
+            conexion = conectar()
+            propias = []
+            for j in range(cantidad):
+                cuerpo = cuerpos[(indice + j * concurrencia) % len(cuerpos)]
+                t0 = time.perf_counter()
+                try:
+                    conexion.request("POST", "/analizar", body=cuerpo, headers={"Content-Type": "application/json"})
+                    respuesta = conexion.getresponse()
+                    respuesta.read()
+                    if respuesta.status != 200:
+                        raise RuntimeError(f"HTTP {respuesta.status}")
+                    propias.append(time.perf_counter() - t0)
+                except Exception as error:
+                    with candado:
+                        errores.append(str(error))
+                    conexion.close()
+                    conexion = conectar()
+            conexion.close()
+            with candado:
+                latencias.extend(propias)
+
+        hilos = [threading.Thread(target=cliente, args=(i, n)) for i, n in enumerate(por_cliente)]
+        t0 = time.perf_counter()
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        duracion = time.perf_counter() - t0
+
+        c = conectar()
+        c.request("GET", "/estadisticas")
+        estadisticas = json.loads(c.getresponse().read())
+        c.close()
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait()
+
+    return {"carga_servidor": {
+        "concurrencia": concurrencia,
+        "peticiones": peticiones,
+        "errores": len(errores),
+        "duracion_s": duracion,
+        "peticiones_por_s": len(latencias) / duracion,
+        **_percentiles_ms(latencias),
+        "servidor": estadisticas,
+    }}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del agente de personalidad MBTI")
+    parser.add_argument("--salida", help="Ruta de un archivo JSON donde guardar los resultados")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    p_arranque = subparsers.add_parser("arranque", help="Tiempo de importación y RSS pico")
+    p_arranque.add_argument("--repeticiones", type=int, default=3)
+
+    p_plan = subparsers.add_parser("planificador", help="A*, bidireccional y Dijkstra sobre espacios crecientes")
+    p_plan.add_argument("--niveles", type=int, nargs="+", default=[2, 4, 8, 16])
+    p_plan.add_argument("--dimensiones", type=int, default=4)
+    p_plan.add_argument("--densidad-obstaculos", type=float, default=0.2)
+    p_plan.add_argument("--consultas", type=int, default=50)
+
+    p_lote_plan = subparsers.add_parser("planificacion_lote", help="planificar_lote contra un bucle de A*")
+    p_lote_plan.add_argument("--usuarios", type=int, default=10000)
+    p_lote_plan.add_argument("--objetivos", nargs="+", default=["ENFP", "INTJ", "ISTJ", "ESFP"])
+    p_lote_plan.add_argument("--mode", choices=["unit", "weighted"], default="weighted")
+
+    p_carga = subparsers.add_parser("carga_servidor", help="Prueba de carga contra servidor.py en localhost")
+    p_carga.add_argument("--host", default="127.0.0.1")
+    p_carga.add_argument("--puerto", type=int, default=8080)
+    p_carga.add_argument("--concurrencia", type=int, default=64)
+    p_carga.add_argument("--peticiones", type=int, default=5000)
+    p_carga.add_argument("--lanzar", action="store_true", help="Levantar el servidor en un subproceso")
+    p_carga.add_argument("--motor", choices=["keras", "numpy", "int8"], default="numpy")
+    p_carga.add_argument("--max-lote", type=int, default=256)
+    p_carga.add_argument("--max-espera-ms", type=float, default=5.0)
+
+    p_sesiones = subparsers.add_parser("sesiones", help="Agente por sesión contra agente compartido")
+    p_sesiones.add_argument("--sesiones", type=int, nargs="+", default=[1, 8, 32])
+    p_sesiones.add_argument("--motor", choices=["keras", "numpy", "int8"], default="keras")
+
+    p_inferencia = subparsers.add_parser("inferencia", help="Latencia y filas/s de predecir, arranque, A* y análisis")
+    p_inferencia.add_argument("--motor", nargs="+", choices=["keras", "numpy", "int8"], default=["keras", "numpy"])
+    p_inferencia.add_argument("--tamanos-lote", type=int, nargs="+", default=list(TAMANOS_LOTE))
+    p_inferencia.add_argument("--repeticiones-arranque", type=int, default=3)
+
+    p_comparar = subparsers.add_parser("comparar", help="Regresiones entre dos JSON de 'inferencia'")
+    p_comparar.add_argument("base")
+    p_comparar.add_argument("nueva")
+    p_comparar.add_argument("--tolerancia", type=float, default=0.10, help="Cambio relativo tolerado (0.10 = 10%%)")
+
+    p_cuant = subparsers.add_parser("cuantizacion", help="Memoria y latencia del modelo int8 contra el float")
+    p_cuant.add_argument("--motor", nargs="+", choices=["keras", "numpy", "int8"], default=["keras", "numpy", "int8"])
+    p_cuant.add_argument("--tamano-lote", type=int, default=1024)
+
+    p_reglas = subparsers.add_parser("reglas", help="Encadenamiento hacia adelante con bases de reglas crecientes")
+    p_reglas.add_argument("--tamanos", type=int, nargs="+", default=[0, 1000, 10000, 50000],
+                          help="Reglas sintéticas agregadas a la base de data/reglas")
+    p_reglas.add_argument("--proporcion-letras", type=float, default=0.0,
+                          help="Fracción de reglas sintéticas que mencionan una letra MBTI")
+
+    p_entrenamiento = subparsers.add_parser("entrenamiento", help="Tiempo por época y muestras/s de entrenar según lote, réplicas e hilos")
+    p_entrenamiento.add_argument("--csv", default=None, help="Dataset de entrenamiento (por defecto data/16P.csv)")
+    p_entrenamiento.add_argument("--batch-sizes", type=int, nargs="+", default=[64, 256, 1024])
+    p_entrenamiento.add_argument("--replicas", type=int, nargs="+", default=[1])
+    p_entrenamiento.add_argument("--hilos-intra", type=int, nargs="+", default=[None])
+    p_entrenamiento.add_argument("--hilos-inter", type=int, default=None)
+    p_entrenamiento.add_argument("--escalado-tasa", choices=["lineal", "raiz"], default="raiz")
+    p_entrenamiento.add_argument("--epochs", type=int, default=20)
+    p_entrenamiento.add_argument("--exactitud-minima", type=float, default=0.98)
+
+    args = parser.parse_args()
+
+    if args.benchmark == "arranque":
+        resultados = benchmark_arranque(args.repeticiones)
+    elif args.benchmark == "planificador":
+        resultados = benchmark_planificador(args.niveles, args.dimensiones, args.densidad_obstaculos, args.consultas)
+    elif args.benchmark == "planificacion_lote":
+        resultados = benchmark_planificacion_lote(args.usuarios, args.objetivos, args.mode)
+    elif args.benchmark == "sesiones":
+        resultados = benchmark_sesiones(args.sesiones, args.motor)
+    elif args.benchmark == "inferencia":
+        resultados = benchmark_inferencia(args.motor, args.tamanos_lote, repeticiones_arranque=args.repeticiones_arranque)
+    elif args.benchmark == "cuantizacion":
+        resultados = benchmark_cuantizacion(args.motor, args.tamano_lote)
+    elif args.benchmark == "reglas":
+        resultados = benchmark_reglas(args.tamanos, args.proporcion_letras)
+    elif args.benchmark == "entrenamiento":
+        resultados = benchmark_entrenamiento(args.csv, args.batch_sizes, args.replicas, args.hilos_intra,
+                                             args.hilos_inter, args.escalado_tasa, args.epochs, args.exactitud_minima)
+    elif args.benchmark == "comparar":
+        resultados = comparar_resultados(args.base, args.nueva, args.tolerancia)
+    elif args.benchmark == "carga_servidor":
+        resultados = benchmark_carga_servidor(
+            args.host, args.puerto, args.concurrencia, args.peticiones,
+            args.lanzar, args.motor, args.max_lote, args.max_espera_ms,
+        )
+
+    texto = json.dumps(resultados, indent=2, ensure_ascii=False)
+    print(texto)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto)
+
+
+if __name__ == "__main__":
+    main()
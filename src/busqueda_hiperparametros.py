@@ -0,0 +1,317 @@
+"""
+MÓDULO DE BÚSQUEDA DE HIPERPARÁMETROS
+Prueba configuraciones de construir_modelo / entrenamiento en paralelo y guarda el mejor modelo
+en la ruta que usa cargar_modelo.
+
+    python busqueda_hiperparametros.py --modo grid --procesos 4
+    python busqueda_hiperparametros.py --modo random --ensayos 20 --espacio espacio.json
+
+- El dataset se preprocesa una sola vez (misma división y scaler que entrenar) y se guarda como .npy;
+  los trabajadores lo abren con mmap, así todos comparten las mismas páginas en memoria y
+  cada lote se copia recién al pasarlo a Keras.
+- Cada trabajador es un proceso fijado a su propio grupo de CPUs (sched_setaffinity) y TensorFlow
+  usa tantos hilos como CPUs tiene asignadas, así los ensayos no compiten por los mismos núcleos.
+- Los ensayos malos se cortan temprano: EarlyStopping sobre val_loss y poda por mediana
+  (si en una época de control la val_accuracy queda por debajo de la mediana de los ensayos
+  que ya pasaron por esa época).
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from percepcion import SistemaPercepcion, configurar_hilos
+
+# Espacio por defecto: la configuración original (128/64, dropout 0.3, adam, batch 64) y vecinos
+ESPACIO_POR_DEFECTO = {
+    "capas": [[128, 64], [256, 128], [64, 32], [128, 64, 32]],
+    "dropout": [0.2, 0.3, 0.4],
+    "optimizador": ["adam", "rmsprop"],
+    "tasa_aprendizaje": [0.001, 0.0003],
+    "batch_size": [32, 64, 128],
+    "epochs": [100],
+}
+
+EPOCAS_CONTROL = (3, 6, 12, 24, 48)
+
+# Estado de cada proceso trabajador
+_datos = None
+_poda = None
+
+
+def generar_ensayos(espacio, modo="grid", n_ensayos=None, semilla=0):
+    """
+    Devuelve la lista de configuraciones a probar.
+    grid: producto cartesiano de las listas del espacio (recortado a n_ensayos si se indica).
+    random: n_ensayos configuraciones; cada valor es una lista (se elige uno) o un rango
+    {"uniforme": [a, b]} / {"log": [a, b]} (uniforme o log-uniforme entre a y b).
+    """
+    nombres = sorted(espacio)
+    if modo == "grid":
+        for nombre in nombres:
+            if not isinstance(espacio[nombre], list):
+                raise ValueError(f"En modo grid cada parámetro debe ser una lista: {nombre}")
+        ensayos = [dict(zip(nombres, valores)) for valores in itertools.product(*(espacio[n] for n in nombres))]
+        return ensayos[:n_ensayos] if n_ensayos else ensayos
+
+    if modo != "random":
+        raise ValueError("modo debe ser 'grid' o 'random'")
+    rng = random.Random(semilla)
+
+    def muestrear(valor):
+        if isinstance(valor, list):
+            return rng.choice(valor)
+        if "uniforme" in valor:
+            return rng.uniform(*valor["uniforme"])
+        if "log" in valor:
+            a, b = valor["log"]
+            return float(np.exp(rng.uniform(np.log(a), np.log(b))))
+        raise ValueError(f"Rango no soportado: {valor}")
+
+    return [{n: muestrear(espacio[n]) for n in nombres} for _ in range(n_ensayos or 10)]
+
+
+def preparar_datos(ruta_csv, directorio):
+    """
+    Preprocesa el dataset una vez con SistemaPercepcion.preprocesar_datos y escribe X/y de train, val
+    y test como .npy en 'directorio'. El scaler y las clases también quedan en 'directorio': models/
+    no se toca hasta promover el mejor ensayo.
+    """
+    sistema = SistemaPercepcion(os.path.join(directorio, "modelo_personalidad.h5"))
+    X_train, X_val, X_test, y_train, y_val, y_test = sistema.preprocesar_datos(sistema.cargar_dataset(ruta_csv))
+    partes = {"X_train": X_train, "X_val": X_val, "X_test": X_test,
+              "y_train": y_train, "y_val": y_val, "y_test": y_test}
+    for nombre, arreglo in partes.items():
+        if nombre.startswith("y"):
+            arreglo = np.argmax(arreglo, axis=1).astype(np.int32)  # etiquetas enteras (pérdida sparse)
+        np.save(os.path.join(directorio, f"{nombre}.npy"), np.ascontiguousarray(arreglo, dtype=arreglo.dtype))
+    return {"clases": [str(c) for c in sistema.clases], "filas_train": len(X_train), "filas_val": len(X_val)}
+
+
+def repartir_cpus(procesos):
+    """Parte las CPUs disponibles en 'procesos' grupos disjuntos (si hay menos CPUs que procesos, se comparten)."""
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+    if len(cpus) < procesos:
+        return [[cpus[i % len(cpus)]] for i in range(procesos)]
+    por_grupo = len(cpus) // procesos
+    return [cpus[i * por_grupo:(i + 1) * por_grupo] for i in range(procesos)]
+
+
+def _inicializar_trabajador(directorio, cola_cpus, estado_poda, candado_poda):
+    global _datos, _poda
+    cpus = cola_cpus.get()
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    os.environ["OMP_NUM_THREADS"] = str(len(cpus))
+
+    configurar_hilos(len(cpus), 1)
+
+    _datos = {
+        nombre: np.load(os.path.join(directorio, f"{nombre}.npy"), mmap_mode="r")
+        for nombre in ("X_train", "y_train", "X_val", "y_val")
+    }
+    _poda = (estado_poda, candado_poda)
+
+
+def _crear_lotes(X, y, batch_size, semilla=None):
+    """PyDataset que lee lotes del mmap compartido (barajados por época si hay semilla)."""
+    from tensorflow.keras.utils import PyDataset
+
+    class LotesMmap(PyDataset):
+        def __init__(self):
+            super().__init__()
+            self.rng = np.random.default_rng(semilla) if semilla is not None else None
+            self.orden = np.arange(len(X))
+            self.on_epoch_end()
+
+        def __len__(self):
+            return (len(X) + batch_size - 1) // batch_size
+
+        def __getitem__(self, i):
+            filas = np.sort(self.orden[i * batch_size:(i + 1) * batch_size])
+            return np.asarray(X[filas]), np.asarray(y[filas])
+
+        def on_epoch_end(self):
+            if self.rng is not None:
+                self.rng.shuffle(self.orden)
+
+    return LotesMmap()
+
+
+def _crear_poda():
+    """Callback de poda por mediana, compartida entre procesos a través de un dict del Manager."""
+    from tensorflow.keras.callbacks import Callback
+
+    estado, candado = _poda
+
+    class PodaMediana(Callback):
+        def __init__(self):
+            super().__init__()
+            self.podado_en = None
+
+        def on_epoch_end(self, epoca, logs=None):
+            epoca += 1
+            if epoca not in EPOCAS_CONTROL:
+                return
+            valor = float(logs.get("val_accuracy", 0.0))
+            with candado:
+                anteriores = estado.get(epoca, [])
+                estado[epoca] = anteriores + [valor]
+            if len(anteriores) >= 2 and valor < float(np.median(anteriores)):
+                self.podado_en = epoca
+                self.model.stop_training = True
+
+    return PodaMediana()
+
+
+def _ejecutar_ensayo(tarea):
+    """Entrena una configuración en el trabajador y guarda su modelo. Devuelve la fila del leaderboard."""
+    from tensorflow.keras.callbacks import EarlyStopping
+
+    id_ensayo, config, directorio, num_clases, paciencia = tarea
+    t0 = time.perf_counter()
+    X_train, y_train, X_val, y_val = (_datos[n] for n in ("X_train", "y_train", "X_val", "y_val"))
+
+    sistema = SistemaPercepcion()
+    modelo = sistema.construir_modelo(
+        X_train.shape[1], num_clases, perdida="sparse_categorical_crossentropy",
+        capas=tuple(config["capas"]), dropout=config["dropout"],
+        optimizador=config["optimizador"], tasa_aprendizaje=config.get("tasa_aprendizaje"),
+    )
+    poda = _crear_poda()
+    historia = modelo.fit(
+        _crear_lotes(X_train, y_train, int(config["batch_size"]), semilla=id_ensayo),
+        validation_data=_crear_lotes(X_val, y_val, 4096),
+        epochs=int(config["epochs"]),
+        callbacks=[EarlyStopping(monitor="val_loss", patience=paciencia, restore_best_weights=True), poda],
+        verbose=0,
+    )
+    tiempo = time.perf_counter() - t0
+
+    ruta = os.path.join(directorio, f"ensayo_{id_ensayo}.h5")
+    modelo.save(ruta)
+    return {
+        "ensayo": id_ensayo,
+        "config": config,
+        "val_accuracy": float(max(historia.history["val_accuracy"])),
+        "val_loss": float(min(historia.history["val_loss"])),
+        "epocas": len(historia.history["val_loss"]),
+        "podado_en_epoca": poda.podado_en,
+        "tiempo_entrenamiento_s": tiempo,
+        "parametros": int(modelo.count_params()),
+        "tamano_kb": os.path.getsize(ruta) / 1024,
+        "ruta": ruta,
+    }
+
+
+def promover_mejor(mejor, directorio, clases):
+    """
+    Guarda el modelo del mejor ensayo con el scaler de 'directorio' como versión de models/versiones
+    y la promueve: modelo, .npz, scaler, clases y paquete se copian juntos. Devuelve el nombre de la versión.
+    """
+    from tensorflow.keras.models import load_model
+
+    sistema = SistemaPercepcion()
+    sistema.clases = np.asarray(clases)
+    metadatos = {"origen": "busqueda_hiperparametros", "ensayo": mejor["ensayo"],
+                 "val_accuracy": mejor["val_accuracy"], "config": mejor["config"]}
+    version = sistema.guardar_version(
+        load_model(mejor["ruta"]),
+        np.load(os.path.join(directorio, "scaler_mean.npy")),
+        np.load(os.path.join(directorio, "scaler_scale.npy")),
+        int(np.load(os.path.join(directorio, "scaler_n.npy"))),
+        metadatos,
+        particion_por_hash=True,  # preprocesar_datos divide por hash del id
+    )
+    sistema.promover_version(version)
+    return os.path.basename(version)
+
+
+def buscar(ruta_csv=None, espacio=None, modo="grid", n_ensayos=None, procesos=2, paciencia=10,
+           salida=None, semilla=0):
+    """
+    Ejecuta la búsqueda y devuelve el leaderboard (ordenado por val_accuracy y luego por tiempo).
+    El mejor modelo se guarda como versión nueva en models/versiones junto con su scaler y sus clases,
+    y se promueve de una vez (SistemaPercepcion.promover_version). Si la búsqueda falla o se interrumpe,
+    models/ queda como estaba.
+    """
+    import multiprocessing
+
+    if ruta_csv is None:
+        ruta_csv = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "16P.csv")
+    ensayos = generar_ensayos(espacio or ESPACIO_POR_DEFECTO, modo, n_ensayos, semilla)
+    procesos = max(1, min(procesos, len(ensayos)))
+
+    directorio = tempfile.mkdtemp(prefix="busqueda_mbti_")
+    try:
+        info = preparar_datos(ruta_csv, directorio)
+        print(f"🔎 {len(ensayos)} ensayos ({modo}) en {procesos} procesos | "
+              f"train {info['filas_train']} | val {info['filas_val']}")
+
+        contexto = multiprocessing.get_context("spawn")
+        with contexto.Manager() as manager:
+            cola_cpus = manager.Queue()
+            for grupo in repartir_cpus(procesos):
+                cola_cpus.put(grupo)
+            estado_poda, candado_poda = manager.dict(), manager.Lock()
+
+            tareas = [(i, config, directorio, len(info["clases"]), paciencia) for i, config in enumerate(ensayos)]
+            with contexto.Pool(procesos, initializer=_inicializar_trabajador,
+                               initargs=(directorio, cola_cpus, estado_poda, candado_poda)) as pool:
+                resultados = []
+                for fila in pool.imap_unordered(_ejecutar_ensayo, tareas):
+                    estado = f"podado en época {fila['podado_en_epoca']}" if fila["podado_en_epoca"] else f"{fila['epocas']} épocas"
+                    print(f"  ensayo {fila['ensayo']:>3}: val_acc={fila['val_accuracy']:.4f} "
+                          f"({estado}, {fila['tiempo_entrenamiento_s']:.1f}s) {fila['config']}")
+                    resultados.append(fila)
+
+        leaderboard = sorted(resultados, key=lambda f: (-f["val_accuracy"], f["tiempo_entrenamiento_s"]))
+        mejor = leaderboard[0]
+
+        version = promover_mejor(mejor, directorio, info["clases"])
+        print(f"🏆 Mejor ensayo {mejor['ensayo']} (val_acc={mejor['val_accuracy']:.4f}) promovido como {version}")
+
+        for fila in leaderboard:
+            fila.pop("ruta")
+        if salida:
+            with open(salida, "w", encoding="utf-8") as f:
+                json.dump({"modo": modo, "procesos": procesos, "leaderboard": leaderboard}, f, indent=2)
+        return leaderboard
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def imprimir_leaderboard(leaderboard, limite=10):
+    print(f"\n{'#':>3} {'val_acc':>8} {'épocas':>6} {'tiempo_s':>9} {'params':>8} {'kb':>7}  config")
+    for fila in leaderboard[:limite]:
+        print(f"{fila['ensayo']:>3} {fila['val_accuracy']:>8.4f} {fila['epocas']:>6} "
+              f"{fila['tiempo_entrenamiento_s']:>9.1f} {fila['parametros']:>8} {fila['tamano_kb']:>7.1f}  {fila['config']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Búsqueda paralela de hiperparámetros del modelo de percepción")
+    parser.add_argument("--csv", default=None, help="Ruta del CSV de entrenamiento (por defecto data/16P.csv)")
+    parser.add_argument("--espacio", default=None, help="JSON con el espacio de búsqueda (por defecto ESPACIO_POR_DEFECTO)")
+    parser.add_argument("--modo", choices=["grid", "random"], default="grid")
+    parser.add_argument("--ensayos", type=int, default=None, help="Cantidad de ensayos (random) o tope (grid)")
+    parser.add_argument("--procesos", type=int, default=2)
+    parser.add_argument("--paciencia", type=int, default=10, help="Paciencia de EarlyStopping sobre val_loss")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", default="leaderboard.json", help="Archivo JSON del leaderboard")
+    args = parser.parse_args()
+
+    espacio = None
+    if args.espacio:
+        with open(args.espacio, encoding="utf-8") as f:
+            espacio = json.load(f)
+
+    leaderboard = buscar(args.csv, espacio, args.modo, args.ensayos, args.procesos,
+                         args.paciencia, args.salida, args.semilla)
+    imprimir_leaderboard(leaderboard)
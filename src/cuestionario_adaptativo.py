@@ -0,0 +1,352 @@
+"""
+MÓDULO DE CUESTIONARIO ADAPTATIVO
+Test con salida temprana: después de cada respuesta se vuelve a estimar el tipo con las preguntas
+sin responder imputadas a la media del scaler, y el test termina en cuanto la probabilidad de la
+clase predicha supera un umbral de confianza. La siguiente pregunta es la de mayor ganancia de
+información esperada.
+
+Ganancia de información de la pregunta q con la distribución actual p(k):
+    H(p) - sum_v P(v) * H(p(k | respuestas, q = v)),    P(v) = sum_k p(k) P(q = v | k)
+Las p(k | ..., q = v) salen del propio modelo (una pasada por cada valor de -3 a 3).
+P(q = v | k) es la frecuencia de cada respuesta por tipo en la partición de entrenamiento
+(models/distribucion_respuestas.npz, ver ajustar_distribucion), que se construye la primera vez
+que hace falta si el dataset está disponible (ver obtener_distribucion). Sin archivo ni dataset se usa
+la verosimilitud implícita en el modelo, P(v | k) proporcional a p(k | ..., q = v), que elige
+preguntas bastante peores (CuestionarioAdaptativo.distribucion_implicita lo indica).
+
+Construir la distribución antes de servir la app (si no, la primera sesión que la pide la ajusta):
+    python cuestionario_adaptativo.py --csv ../data/16P.csv --solo-ajustar
+
+Simulación fuera de línea sobre la partición test por hash del id, la que entrenar deja fuera del
+entrenamiento (particion.json; con un modelo sin esa constancia se avisa de que no es test reservado):
+    python cuestionario_adaptativo.py --csv ../data/16P.csv --max-filas 1000 --umbrales 0.8 0.9 0.95
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import warnings
+
+import numpy as np
+
+VALORES = np.arange(-3, 4, dtype=np.float32)
+NUM_PREGUNTAS = 60
+ESTRATEGIAS = ("ganancia", "orden")
+ARCHIVO_DISTRIBUCION = "distribucion_respuestas.npz"
+RUTA_DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "16P.csv")
+# Un solo ajuste a la vez por proceso (sesiones de la app o hilos del servidor que lo piden a la vez)
+_BLOQUEO_DISTRIBUCION = threading.Lock()
+
+
+def entropia(p, eje=-1):
+    """Entropía en bits a lo largo de 'eje'."""
+    p = np.clip(p, 1e-12, 1.0)
+    return -(p * np.log2(p)).sum(axis=eje)
+
+
+def ajustar_distribucion(percepcion, ruta_csv=None, max_filas=None, suavizado=1.0):
+    """
+    Estima P(respuesta = v | tipo) para cada pregunta con la partición de entrenamiento
+    (suavizado de Laplace) y la guarda junto al modelo. Devuelve el arreglo (16, 60, 7).
+    Escribe en un temporal y lo publica con os.replace (como paquete.escribir_paquete), así que
+    otro proceso nunca lee un .npz a medio escribir.
+    """
+    if percepcion.clases is None:
+        percepcion.cargar_modelo()
+    X, etiquetas = percepcion.muestras_particion(ruta_csv, "train", max_filas)
+    indice_clase = {c: i for i, c in enumerate(percepcion.clases)}
+    y = np.array([indice_clase[c] for c in etiquetas])
+    conteos = np.full((len(percepcion.clases), NUM_PREGUNTAS, len(VALORES)), suavizado)
+    valores = np.clip(np.rint(X), -3, 3).astype(np.int64) + 3
+    np.add.at(conteos, (y[:, None], np.arange(NUM_PREGUNTAS)[None, :], valores), 1)
+    distribucion = conteos / conteos.sum(axis=2, keepdims=True)
+
+    ruta = os.path.join(percepcion.directorio_modelo, ARCHIVO_DISTRIBUCION)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "wb") as f:
+        np.savez(f, clases=np.asarray(percepcion.clases, dtype=str), distribucion=distribucion)
+    os.replace(temporal, ruta)
+    print(f"Distribución de respuestas por tipo ({len(X)} filas) guardada en {ruta}")
+    return distribucion
+
+
+def cargar_distribucion(percepcion):
+    """Lee la distribución de respuestas por tipo, en el orden de percepcion.clases (None si no existe)."""
+    ruta = os.path.join(percepcion.directorio_modelo, ARCHIVO_DISTRIBUCION)
+    if not os.path.exists(ruta):
+        return None
+    with np.load(ruta, allow_pickle=False) as datos:
+        posicion = {c: i for i, c in enumerate(datos["clases"].tolist())}
+        return datos["distribucion"][[posicion[str(c)] for c in percepcion.clases]]
+
+
+def obtener_distribucion(percepcion, ruta_csv=None):
+    """
+    Distribución de respuestas por tipo guardada junto al modelo; si no existe y el dataset está
+    disponible, la ajusta y la guarda (solo la primera vez). None si no hay ni archivo ni dataset.
+    El ajuste lee el dataset completo: para no hacerlo durante una petición, constrúyela antes con
+    python cuestionario_adaptativo.py --solo-ajustar.
+    """
+    with _BLOQUEO_DISTRIBUCION:
+        distribucion = cargar_distribucion(percepcion)
+        if distribucion is not None:
+            return distribucion
+        ruta_csv = ruta_csv or RUTA_DATASET
+        if not os.path.exists(ruta_csv):
+            warnings.warn(f"No existe {ARCHIVO_DISTRIBUCION} ni el dataset {ruta_csv}: se usa la verosimilitud "
+                          "implícita en el modelo", stacklevel=2)
+            return None
+        return ajustar_distribucion(percepcion, ruta_csv)
+
+
+def ganancia_informacion(percepcion, X_parcial, distribucion=None, tamano_lote=4096):
+    """
+    Para N cuestionarios parciales (array (N, 60) con NaN en las preguntas sin responder) devuelve
+    (probabilidades actuales (N, 16), ganancia esperada (N, 60) en bits, -inf en las ya respondidas).
+    distribucion: P(respuesta | tipo) (16, 60, 7) de ajustar_distribucion; None usa la del modelo.
+    Evalúa todas las preguntas candidatas de todos los cuestionarios en una sola pasada por el modelo.
+    """
+    X = np.asarray(X_parcial, dtype=np.float32).reshape(-1, NUM_PREGUNTAS)
+    _, p0 = percepcion.probabilidades(X, tamano_lote)
+    ganancia = np.full(X.shape, -np.inf)
+    filas, preguntas = np.nonzero(np.isnan(X))
+    if len(filas) == 0:
+        return p0, ganancia
+
+    # Una fila por (cuestionario, pregunta candidata, valor)
+    candidatos = np.repeat(X[filas], len(VALORES), axis=0)
+    candidatos[np.arange(len(candidatos)), np.repeat(preguntas, len(VALORES))] = np.tile(VALORES, len(filas))
+    _, P = percepcion.probabilidades(candidatos, tamano_lote)
+    P = P.reshape(len(filas), len(VALORES), -1)
+
+    if distribucion is None:
+        verosimilitud = P / P.sum(axis=1, keepdims=True)             # P(v | k) implícita en el modelo
+    else:
+        verosimilitud = distribucion[:, preguntas, :].transpose(1, 2, 0)
+    prob_valor = (verosimilitud * p0[filas][:, None, :]).sum(axis=2)  # P(v) = sum_k p(k) P(v | k)
+    ganancia[filas, preguntas] = entropia(p0[filas]) - (prob_valor * entropia(P)).sum(axis=1)
+    return p0, ganancia
+
+
+class CuestionarioAdaptativo:
+    """
+    Estado de un test adaptativo. Uso:
+
+        cuestionario = CuestionarioAdaptativo(agente.percepcion, umbral=0.95)
+        while not cuestionario.terminado():
+            i = cuestionario.siguiente_pregunta()
+            cuestionario.responder(i, valor_del_usuario)
+        tipo, confianza = cuestionario.prediccion()
+
+    estrategia: "ganancia" (mayor ganancia de información esperada) u "orden" (orden original del test).
+    distribucion: P(respuesta | tipo) ya cargada (por defecto, la de obtener_distribucion).
+    distribucion_implicita: True si la estrategia "ganancia" no tiene distribución y usa la del modelo.
+    """
+
+    def __init__(self, percepcion, umbral=0.95, min_preguntas=5, max_preguntas=NUM_PREGUNTAS, estrategia="ganancia",
+                 distribucion=None):
+        if not 0 < umbral <= 1:
+            raise ValueError("umbral debe estar entre 0 y 1")
+        if estrategia not in ESTRATEGIAS:
+            raise ValueError(f"estrategia debe ser una de {ESTRATEGIAS}")
+        self.percepcion = percepcion
+        self.umbral = umbral
+        self.min_preguntas = min_preguntas
+        self.max_preguntas = max_preguntas
+        self.estrategia = estrategia
+        if estrategia == "ganancia" and distribucion is None:
+            if percepcion.clases is None:
+                percepcion.cargar_modelo()
+            distribucion = obtener_distribucion(percepcion)
+        self.distribucion = distribucion
+        self.distribucion_implicita = estrategia == "ganancia" and distribucion is None
+        self.respuestas = np.full(NUM_PREGUNTAS, np.nan, dtype=np.float32)
+        self.orden = []  # preguntas en el orden en que se respondieron
+        self._probabilidades = None
+        self._ganancia = None
+
+    def _actualizar(self):
+        if self._probabilidades is not None:
+            return
+        if self.estrategia == "ganancia":
+            p0, ganancia = ganancia_informacion(self.percepcion, self.respuestas[None, :], self.distribucion)
+            self._ganancia = ganancia[0]
+        else:
+            _, p0 = self.percepcion.probabilidades(self.respuestas[None, :])
+        self._probabilidades = p0[0]
+
+    def responder(self, indice, valor):
+        if not 0 <= indice < NUM_PREGUNTAS:
+            raise ValueError(f"La pregunta debe estar entre 0 y {NUM_PREGUNTAS - 1}")
+        if not -3 <= valor <= 3:
+            raise ValueError("La respuesta debe estar entre -3 y 3")
+        if np.isnan(self.respuestas[indice]):
+            self.orden.append(indice)
+        self.respuestas[indice] = valor
+        self._probabilidades = self._ganancia = None
+
+    @property
+    def respondidas(self):
+        return len(self.orden)
+
+    def probabilidades(self):
+        """Probabilidad de cada clase (en el orden de percepcion.clases) con lo respondido hasta ahora."""
+        self._actualizar()
+        return self._probabilidades
+
+    def prediccion(self):
+        """(tipo_predicho, confianza en %) con lo respondido hasta ahora."""
+        p = self.probabilidades()
+        indice = int(np.argmax(p))
+        return str(self.percepcion.clases[indice]), float(p[indice] * 100)
+
+    def terminado(self):
+        if self.respondidas >= self.max_preguntas:
+            return True
+        return self.respondidas >= self.min_preguntas and float(self.probabilidades().max()) >= self.umbral
+
+    def siguiente_pregunta(self):
+        """Índice de la próxima pregunta a mostrar (None si el test terminó)."""
+        if self.terminado():
+            return None
+        if self.estrategia == "orden":
+            return int(np.flatnonzero(np.isnan(self.respuestas))[0])
+        self._actualizar()
+        return int(np.argmax(self._ganancia))
+
+    def respuestas_imputadas(self):
+        """Las 60 respuestas, con las no respondidas reemplazadas por la media del scaler."""
+        return np.where(np.isnan(self.respuestas), self.percepcion.media, self.respuestas).tolist()
+
+
+def _trayectorias(percepcion, X, estrategia, umbral_maximo, min_preguntas, distribucion, tamano_grupo=128):
+    """
+    Simula el test para cada fila de X respondiendo con sus propias respuestas.
+    La secuencia de preguntas no depende del umbral, así que se guarda la confianza y la clase
+    predicha después de cada respuesta y cualquier umbral <= umbral_maximo se evalúa después.
+    Devuelve (confianza (N, 61), clase (N, 61)); la columna t es el estado con t respuestas
+    (o el último estado calculado, si la sesión ya había superado umbral_maximo).
+    """
+    n = len(X)
+    confianza = np.ones((n, NUM_PREGUNTAS + 1), dtype=np.float32)
+    clase = np.zeros((n, NUM_PREGUNTAS + 1), dtype=np.int64)
+    for inicio in range(0, n, tamano_grupo):
+        grupo = slice(inicio, min(inicio + tamano_grupo, n))
+        completas = X[grupo].astype(np.float32)
+        parciales = np.full_like(completas, np.nan)
+        activas = np.arange(len(completas))
+        for t in range(NUM_PREGUNTAS + 1):
+            if estrategia == "ganancia" and t < NUM_PREGUNTAS:
+                p, ganancia = ganancia_informacion(percepcion, parciales[activas], distribucion)
+            else:
+                _, p = percepcion.probabilidades(parciales[activas])
+            filas = inicio + activas
+            confianza[filas, t] = p.max(axis=1)
+            clase[filas, t] = p.argmax(axis=1)
+            if t == NUM_PREGUNTAS:
+                break
+            # Las sesiones que ya alcanzaron el umbral más alto no necesitan más preguntas
+            # (sus columnas siguientes conservan el último estado)
+            sigue = (p.max(axis=1) < umbral_maximo) | (t < min_preguntas)
+            hecho = filas[~sigue]
+            confianza[hecho, t + 1:] = confianza[hecho, t][:, None]
+            clase[hecho, t + 1:] = clase[hecho, t][:, None]
+            activas = activas[sigue]
+            if len(activas) == 0:
+                break
+            if estrategia == "ganancia":
+                siguiente = np.argmax(ganancia[sigue], axis=1)
+            else:
+                siguiente = np.full(len(activas), t)
+            parciales[activas, siguiente] = completas[activas, siguiente]
+    return confianza, clase
+
+
+def simular(percepcion, X, etiquetas, umbrales=(0.8, 0.9, 0.95), estrategias=ESTRATEGIAS, min_preguntas=5,
+            distribucion=None):
+    """
+    Simulación fuera de línea: por estrategia y umbral, preguntas promedio, exactitud del test adaptativo,
+    exactitud con las 60 preguntas, coincidencia con la predicción completa y exactitud perdida.
+    Las filas deben ser de test reservado para este modelo (muestras_particion(..., "test") con
+    percepcion.particion_por_hash()).
+    """
+    X = np.asarray(X, dtype=np.float32)
+    clases, prob_completa = percepcion.probabilidades(X)
+    correctas = np.asarray(clases)[:, None] == np.asarray(etiquetas)[None, :]  # (16, N)
+    columnas = np.arange(len(X))
+    completa = prob_completa.argmax(axis=1)
+    exactitud_completa = float(correctas[completa, columnas].mean())
+    resultados = []
+    for estrategia in estrategias:
+        t0 = time.perf_counter()
+        confianza, clase = _trayectorias(percepcion, X, estrategia, max(umbrales), min_preguntas, distribucion)
+        segundos = time.perf_counter() - t0
+        pasos = np.arange(NUM_PREGUNTAS + 1)
+        for umbral in umbrales:
+            alcanzado = (confianza >= umbral) & (pasos >= min_preguntas)
+            alcanzado[:, NUM_PREGUNTAS] = True
+            preguntas = alcanzado.argmax(axis=1)
+            final = clase[columnas, preguntas]
+            exactitud = float(correctas[final, columnas].mean())
+            resultados.append({
+                "estrategia": estrategia,
+                "umbral": umbral,
+                "preguntas_promedio": float(preguntas.mean()),
+                "preguntas_p90": float(np.percentile(preguntas, 90)),
+                "exactitud": exactitud,
+                "exactitud_60_preguntas": exactitud_completa,
+                "exactitud_perdida": exactitud_completa - exactitud,
+                "coincidencia_con_60": float(np.mean(final == completa)),
+                "segundos_simulacion": segundos,
+            })
+    return resultados
+
+
+def imprimir_simulacion(resultados):
+    print(f"{'estrategia':<10} {'umbral':>6} {'preguntas':>9} {'p90':>5} {'exactitud':>9} "
+          f"{'con 60':>7} {'perdida':>8} {'coincide':>8}")
+    for r in resultados:
+        print(f"{r['estrategia']:<10} {r['umbral']:>6.2f} {r['preguntas_promedio']:>9.1f} {r['preguntas_p90']:>5.0f} "
+              f"{r['exactitud']:>9.2%} {r['exactitud_60_preguntas']:>7.2%} {r['exactitud_perdida']:>8.2%} "
+              f"{r['coincidencia_con_60']:>8.2%}")
+
+
+if __name__ == "__main__":
+    from percepcion import SistemaPercepcion
+
+    parser = argparse.ArgumentParser(description="Simulación del test adaptativo con salida temprana")
+    parser.add_argument("--csv", default=None, help="CSV con etiquetas (se usa la partición de test)")
+    parser.add_argument("--max-filas", type=int, default=1000)
+    parser.add_argument("--umbrales", type=float, nargs="+", default=[0.8, 0.9, 0.95])
+    parser.add_argument("--min-preguntas", type=int, default=5)
+    parser.add_argument("--estrategias", nargs="+", choices=ESTRATEGIAS, default=list(ESTRATEGIAS))
+    parser.add_argument("--motor", choices=["keras", "numpy", "int8"], default="numpy")
+    parser.add_argument("--modelo", default=None, help="Ruta del modelo .h5 (el .npz se busca al lado)")
+    parser.add_argument("--salida", default=None, help="Guardar los resultados en JSON")
+    parser.add_argument("--ajustar-distribucion", action="store_true",
+                        help="Volver a estimar P(respuesta | tipo) aunque ya exista")
+    parser.add_argument("--solo-ajustar", action="store_true",
+                        help="Solo estimar y guardar P(respuesta | tipo) junto al modelo, sin simular")
+    args = parser.parse_args()
+
+    sistema = SistemaPercepcion(args.modelo, motor=args.motor)
+    sistema.cargar_modelo()
+    distribucion = None if args.ajustar_distribucion else cargar_distribucion(sistema)
+    if distribucion is None or args.solo_ajustar:
+        distribucion = ajustar_distribucion(sistema, args.csv)
+    if args.solo_ajustar:
+        sys.exit(0)
+    test_reservado = sistema.verificar_particion("Simulación adaptativa")
+    X, etiquetas = sistema.muestras_particion(args.csv, "test", args.max_filas)
+    print(f"Simulando {len(X)} cuestionarios de la partición de test...")
+    resultados = simular(sistema, X, etiquetas, args.umbrales, args.estrategias, args.min_preguntas, distribucion)
+    for resultado in resultados:
+        resultado["test_reservado"] = test_reservado
+    imprimir_simulacion(resultados)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"Resultados guardados en {args.salida}")
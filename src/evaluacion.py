@@ -0,0 +1,159 @@
+"""
+MÓDULO DE EVALUACIÓN FUERA DE MEMORIA
+Evalúa un modelo sobre un dataset etiquetado de cualquier tamaño: lee el CSV (o su caché binaria)
+por bloques, predice cada bloque con el predictor por lotes de percepcion y acumula la matriz de
+confusión. Precisión, recall y F1 por clase salen de la matriz al final, así que la memoria depende
+del tamaño de bloque y no del dataset.
+
+Con --particion test se evalúa la misma partición por hash del 'Response Id' que entrenar y
+entrenar_streaming reservan para test, así que las cifras son comparables con el
+evaluacion_test.json que dejan junto al modelo. Con un modelo sin particion.json (entrenado con
+la división aleatoria anterior) esas filas pueden haber estado en su entrenamiento: se avisa y el
+JSON lo indica con "test_reservado": false.
+
+El resultado se escribe en JSON para comparar versiones del modelo sin volver a leer los datos:
+    python evaluacion.py --csv data/16P.csv --particion test --motor numpy --salida eval_v2.json
+    python evaluacion.py --comparar eval_v1.json eval_v2.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from metricas import MatrizConfusion
+from percepcion import PARTICIONES, SistemaPercepcion, asignar_particion, sha256_archivo
+
+
+def evaluar_archivo(ruta_csv, ruta_modelo=None, motor="numpy", particion=None, tamano_bloque=50_000,
+                    tamano_lote=4096, max_filas=None):
+    """
+    Evalúa el modelo sobre ruta_csv leyendo por bloques (SistemaPercepcion.leer_bloques).
+    particion: "train", "val" o "test" para evaluar solo esa parte del reparto por hash del
+    'Response Id' (el mismo de entrenar y entrenar_streaming); None evalúa todas las filas.
+    Las filas con una etiqueta que el modelo no conoce se cuentan aparte y no entran a la matriz.
+    Devuelve el dict que se escribe en JSON.
+    """
+    if particion is not None and particion not in PARTICIONES:
+        raise ValueError(f"particion debe ser una de {tuple(PARTICIONES)}")
+    percepcion = SistemaPercepcion(ruta_modelo, motor=motor)
+    percepcion.cargar_modelo()  # antes de leer datos; sus mensajes van a stderr
+    test_reservado = None
+    if particion in ("val", "test"):
+        test_reservado = percepcion.verificar_particion(f"evaluacion --particion {particion}")
+    matriz = MatrizConfusion(percepcion.clases)
+    leidas = desconocidas = 0
+    segundos_modelo = 0.0
+
+    inicio = time.perf_counter()
+    for ids, X, etiquetas in percepcion.leer_bloques(ruta_csv, tamano_bloque):
+        if particion is not None:
+            seleccion = asignar_particion(ids) == PARTICIONES[particion]
+            X, etiquetas = X[seleccion], etiquetas[seleccion]
+        if max_filas is not None:
+            X, etiquetas = X[:max_filas - leidas], etiquetas[:max_filas - leidas]
+        leidas += len(X)
+
+        reales = np.searchsorted(matriz.clases, etiquetas)
+        conocidas = (reales < len(matriz.clases)) & (matriz.clases[np.minimum(reales, len(matriz.clases) - 1)] == etiquetas)
+        desconocidas += int((~conocidas).sum())
+
+        t0 = time.perf_counter()
+        _, probabilidades = percepcion.probabilidades(X[conocidas], tamano_lote)
+        segundos_modelo += time.perf_counter() - t0
+        reales = reales[conocidas]
+        matriz.actualizar(reales, np.argmax(probabilidades, axis=1), probabilidades[np.arange(len(reales)), reales])
+        if max_filas is not None and leidas >= max_filas:
+            break
+    segundos = time.perf_counter() - inicio
+
+    ruta_fuente = percepcion.ruta_fuente()
+    resultado = {
+        "modelo": {
+            "ruta": os.path.abspath(ruta_fuente),
+            "motor": percepcion.motor,
+            "version": percepcion.version_cargada,
+            "sha256": sha256_archivo(ruta_fuente),
+        },
+        "dataset": os.path.abspath(ruta_csv),
+        "particion": particion or "todas",
+        "test_reservado": test_reservado,
+        "filas_etiqueta_desconocida": desconocidas,
+    }
+    resultado.update(matriz.metricas())
+    resultado["matriz_confusion"] = {"clases": matriz.clases.tolist(), "valores": matriz.valores.tolist()}
+    resultado["rendimiento"] = {
+        "segundos": round(segundos, 3),
+        "segundos_modelo": round(segundos_modelo, 3),
+        "filas_por_segundo": round(matriz.filas / segundos, 1) if segundos > 0 else None,
+        "filas_por_segundo_modelo": round(matriz.filas / segundos_modelo, 1) if segundos_modelo > 0 else None,
+    }
+    return resultado
+
+
+def comparar(rutas):
+    """Imprime exactitud, F1 macro y F1 por clase de varias evaluaciones guardadas (la primera es la base)."""
+    evaluaciones = []
+    for ruta in rutas:
+        with open(ruta, encoding="utf-8") as f:
+            evaluaciones.append(json.load(f))
+    base = evaluaciones[0]
+    for ruta, evaluacion in zip(rutas, evaluaciones):
+        if evaluacion["dataset"] != base["dataset"] or evaluacion["particion"] != base["particion"]:
+            print(f"⚠️ {ruta} se evaluó sobre otros datos ({evaluacion['dataset']}, {evaluacion['particion']})", file=sys.stderr)
+        if evaluacion.get("test_reservado") is False:
+            print(f"⚠️ {ruta}: el modelo no reservó la partición {evaluacion['particion']}, sus cifras salen optimistas", file=sys.stderr)
+
+    nombres = [os.path.basename(r) for r in rutas]
+    ancho = max(12, *(len(n) for n in nombres))
+    print(f"{'':<10}" + "".join(f"{n:>{ancho}}" for n in nombres))
+    for etiqueta, valor in (("exactitud", lambda e: e["exactitud"]), ("f1 macro", lambda e: e["macro"]["f1"]),
+                            ("log_loss", lambda e: e["log_loss"]),
+                            ("filas/s", lambda e: e["rendimiento"]["filas_por_segundo"])):
+        print(f"{etiqueta:<10}" + "".join(f"{valor(e):>{ancho}}" for e in evaluaciones))
+    print("\nF1 por clase (diferencia contra la primera):")
+    for clase, metricas in base["por_clase"].items():
+        celdas = [f"{metricas['f1']:.4f}"]
+        for evaluacion in evaluaciones[1:]:
+            otra = evaluacion["por_clase"].get(clase)
+            celdas.append(f"{otra['f1'] - metricas['f1']:+.4f}" if otra else "-")
+        print(f"{clase:<10}" + "".join(f"{c:>{ancho}}" for c in celdas))
+
+
+def parsear_argumentos():
+    parser = argparse.ArgumentParser(description="Evaluación del modelo sobre un dataset etiquetado, por bloques")
+    parser.add_argument("--csv", default=None, help="Dataset etiquetado (por defecto data/16P.csv; usa su caché binaria si existe)")
+    parser.add_argument("--modelo", default=None, help="Ruta del modelo .h5 (el .npz y el .paquete se buscan al lado)")
+    parser.add_argument("--motor", choices=["keras", "numpy", "int8"], default="numpy")
+    parser.add_argument("--particion", choices=list(PARTICIONES), default=None,
+                        help="Evaluar solo esta partición del reparto por hash (por defecto, todas las filas)")
+    parser.add_argument("--tamano-bloque", type=int, default=50_000)
+    parser.add_argument("--tamano-lote", type=int, default=4096)
+    parser.add_argument("--max-filas", type=int, default=None)
+    parser.add_argument("--salida", default="-", help="Archivo JSON del resultado ('-' = salida estándar)")
+    parser.add_argument("--comparar", nargs="+", default=None, metavar="JSON",
+                        help="Comparar evaluaciones ya guardadas en lugar de evaluar")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parsear_argumentos()
+    if args.comparar:
+        comparar(args.comparar)
+        sys.exit(0)
+
+    ruta_csv = args.csv or os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "16P.csv")
+    resultado = evaluar_archivo(ruta_csv, args.modelo, args.motor, args.particion, args.tamano_bloque,
+                                args.tamano_lote, args.max_filas)
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida == "-":
+        print(texto)
+    else:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    rendimiento = resultado["rendimiento"]
+    print(f"✅ {resultado['filas']} filas: exactitud {resultado['exactitud']:.4f}, F1 macro {resultado['macro']['f1']:.4f}, "
+          f"{rendimiento['filas_por_segundo']} filas/s", file=sys.stderr)
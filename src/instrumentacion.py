@@ -0,0 +1,261 @@
+"""
+MÓDULO DE INSTRUMENTACIÓN
+Métricas opcionales del pipeline del agente: tiempo por etapa (percepción, razonamiento, planificación),
+tiempo de escalado contra tiempo del modelo, consultas y latencia de la tabla de planes, nodos expandidos
+e inserciones en la frontera de A* (solo cuando se ejecuta A*: planificar(metodo="a_estrella") y
+verificar_tabla_planes; el agente planifica con la tabla) y aciertos de la caché de predicciones.
+
+Está desactivada por defecto: cada punto de medición solo compara SUMIDERO con None.
+Para activarla se elige un sumidero:
+
+    import instrumentacion
+    memoria = instrumentacion.activar(instrumentacion.SumideroMemoria())
+    ...
+    print(memoria.resumen())
+
+Sumideros disponibles: SumideroMemoria (agrega en memoria), SumideroJSON (una línea JSON por evento),
+SumideroPrometheus (agrega y expone el formato de texto de Prometheus, opcionalmente por HTTP)
+y SumideroCompuesto (reenvía a varios).
+"""
+
+import bisect
+import json
+import threading
+import time
+
+# Sumidero activo (None = instrumentación desactivada)
+SUMIDERO = None
+
+# Límites superiores de los buckets de histogramas: tiempos en segundos por defecto
+LIMITES_SEGUNDOS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+LIMITES_POR_METRICA = {
+    "a_estrella_nodos_expandidos": (1, 2, 4, 8, 16, 32, 64, 128, 256),
+    "percepcion_filas_por_lote": (1, 4, 16, 64, 256, 1024, 4096, 16384),
+    # Una consulta a la tabla de planes tarda del orden de un microsegundo
+    "planificacion_tabla_segundos": (0.0000001, 0.0000005, 0.000001, 0.000002, 0.000005, 0.00001, 0.00005),
+}
+
+
+def activar(sumidero):
+    """Activa la instrumentación enviando las métricas a 'sumidero'. Devuelve el sumidero."""
+    global SUMIDERO
+    SUMIDERO = sumidero
+    return sumidero
+
+
+def desactivar():
+    global SUMIDERO
+    SUMIDERO = None
+
+
+def contar(nombre, valor=1, **etiquetas):
+    """Incrementa el contador 'nombre' (no hace nada si la instrumentación está desactivada)."""
+    sumidero = SUMIDERO
+    if sumidero is not None:
+        sumidero.contar(nombre, valor, etiquetas)
+
+
+def observar(nombre, valor, **etiquetas):
+    """Registra 'valor' en el histograma 'nombre' (no hace nada si la instrumentación está desactivada)."""
+    sumidero = SUMIDERO
+    if sumidero is not None:
+        sumidero.observar(nombre, valor, etiquetas)
+
+
+class Sumidero:
+    """Interfaz de un sumidero de métricas. Las etiquetas llegan como dict de str a valor."""
+
+    def contar(self, nombre, valor, etiquetas):
+        raise NotImplementedError
+
+    def observar(self, nombre, valor, etiquetas):
+        raise NotImplementedError
+
+
+class SumideroMemoria(Sumidero):
+    """Agrega contadores e histogramas (conteo, suma, mínimo, máximo y buckets) en memoria, seguro entre hilos."""
+
+    def __init__(self):
+        self._candado = threading.Lock()
+        self.contadores = {}
+        self.histogramas = {}
+
+    @staticmethod
+    def _clave(nombre, etiquetas):
+        return nombre, tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+    def contar(self, nombre, valor, etiquetas):
+        clave = self._clave(nombre, etiquetas)
+        with self._candado:
+            self.contadores[clave] = self.contadores.get(clave, 0) + valor
+
+    def observar(self, nombre, valor, etiquetas):
+        clave = self._clave(nombre, etiquetas)
+        with self._candado:
+            histograma = self.histogramas.get(clave)
+            if histograma is None:
+                limites = LIMITES_POR_METRICA.get(nombre, LIMITES_SEGUNDOS)
+                histograma = {"limites": limites, "buckets": [0] * (len(limites) + 1),
+                              "conteo": 0, "suma": 0.0, "minimo": valor, "maximo": valor}
+                self.histogramas[clave] = histograma
+            histograma["buckets"][bisect.bisect_left(histograma["limites"], valor)] += 1
+            histograma["conteo"] += 1
+            histograma["suma"] += valor
+            histograma["minimo"] = min(histograma["minimo"], valor)
+            histograma["maximo"] = max(histograma["maximo"], valor)
+
+    def reiniciar(self):
+        with self._candado:
+            self.contadores.clear()
+            self.histogramas.clear()
+
+    def resumen(self):
+        """Devuelve un dict serializable: contadores, histogramas (con promedio) y tasas de acierto de caché."""
+        def nombre_completo(nombre, etiquetas):
+            if not etiquetas:
+                return nombre
+            return nombre + "{" + ",".join(f"{k}={v}" for k, v in etiquetas) + "}"
+
+        with self._candado:
+            contadores = {nombre_completo(*clave): valor for clave, valor in sorted(self.contadores.items())}
+            histogramas = {}
+            for clave, h in sorted(self.histogramas.items()):
+                histogramas[nombre_completo(*clave)] = {
+                    "conteo": h["conteo"], "suma": h["suma"], "promedio": h["suma"] / h["conteo"],
+                    "minimo": h["minimo"], "maximo": h["maximo"],
+                    "buckets": dict(zip([str(l) for l in h["limites"]] + ["+Inf"], h["buckets"])),
+                }
+            aciertos = sum(v for (n, e), v in self.contadores.items()
+                           if n == "cache_predicciones_total" and ("resultado", "acierto") in e)
+            consultas = sum(v for (n, _), v in self.contadores.items() if n == "cache_predicciones_total")
+
+        resumen = {"contadores": contadores, "histogramas": histogramas}
+        if consultas:
+            resumen["tasa_aciertos_cache"] = aciertos / consultas
+        return resumen
+
+
+class SumideroJSON(Sumidero):
+    """Escribe cada evento como una línea JSON ({"ts", "tipo", "nombre", "valor", "etiquetas"}) en un archivo."""
+
+    def __init__(self, destino):
+        # destino: ruta (se abre en modo append) o un objeto archivo ya abierto
+        self._propio = isinstance(destino, str)
+        self._archivo = open(destino, "a", encoding="utf-8") if self._propio else destino
+        self._candado = threading.Lock()
+
+    def _escribir(self, tipo, nombre, valor, etiquetas):
+        linea = json.dumps({"ts": time.time(), "tipo": tipo, "nombre": nombre,
+                            "valor": valor, "etiquetas": etiquetas}, default=str)
+        with self._candado:
+            self._archivo.write(linea + "\n")
+
+    def contar(self, nombre, valor, etiquetas):
+        self._escribir("contador", nombre, valor, etiquetas)
+
+    def observar(self, nombre, valor, etiquetas):
+        self._escribir("histograma", nombre, valor, etiquetas)
+
+    def cerrar(self):
+        with self._candado:
+            if self._propio:
+                self._archivo.close()
+            else:
+                self._archivo.flush()
+
+
+class SumideroPrometheus(SumideroMemoria):
+    """SumideroMemoria que además genera el formato de texto de Prometheus y puede servirlo por HTTP."""
+
+    PREFIJO = "mbti_"
+
+    def exposicion(self):
+        def etiquetas_texto(etiquetas, extra=()):
+            pares = list(etiquetas) + list(extra)
+            if not pares:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pares) + "}"
+
+        lineas = []
+        with self._candado:
+            tipos_declarados = set()
+            for (nombre, etiquetas), valor in sorted(self.contadores.items()):
+                metrica = self.PREFIJO + nombre
+                if metrica not in tipos_declarados:
+                    lineas.append(f"# TYPE {metrica} counter")
+                    tipos_declarados.add(metrica)
+                lineas.append(f"{metrica}{etiquetas_texto(etiquetas)} {valor}")
+
+            for (nombre, etiquetas), h in sorted(self.histogramas.items()):
+                metrica = self.PREFIJO + nombre
+                if metrica not in tipos_declarados:
+                    lineas.append(f"# TYPE {metrica} histogram")
+                    tipos_declarados.add(metrica)
+                acumulado = 0
+                for limite, cantidad in zip(list(h["limites"]) + ["+Inf"], h["buckets"]):
+                    acumulado += cantidad
+                    lineas.append(f"{metrica}_bucket{etiquetas_texto(etiquetas, [('le', limite)])} {acumulado}")
+                lineas.append(f"{metrica}_sum{etiquetas_texto(etiquetas)} {h['suma']}")
+                lineas.append(f"{metrica}_count{etiquetas_texto(etiquetas)} {h['conteo']}")
+        return "\n".join(lineas) + "\n"
+
+    def servir(self, host="127.0.0.1", puerto=9100):
+        """Expone GET /metrics en un hilo de fondo. Devuelve el servidor HTTP (llamar shutdown() para detenerlo)."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        sumidero = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/metricas"):
+                    self.send_error(404)
+                    return
+                cuerpo = sumidero.exposicion().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        servidor = ThreadingHTTPServer((host, puerto), Manejador)
+        threading.Thread(target=servidor.serve_forever, name="metricas", daemon=True).start()
+        print(f"📈 Métricas en http://{host}:{servidor.server_port}/metrics")
+        return servidor
+
+
+class SumideroCompuesto(Sumidero):
+    """Reenvía cada evento a varios sumideros (p. ej. Prometheus y un log JSON a la vez)."""
+
+    def __init__(self, *sumideros):
+        self.sumideros = sumideros
+
+    def contar(self, nombre, valor, etiquetas):
+        for sumidero in self.sumideros:
+            sumidero.contar(nombre, valor, etiquetas)
+
+    def observar(self, nombre, valor, etiquetas):
+        for sumidero in self.sumideros:
+            sumidero.observar(nombre, valor, etiquetas)
+
+
+if __name__ == "__main__":
+    # Ejemplo: instrumentar análisis completos y mostrar el resumen y la exposición Prometheus
+    import numpy as np
+    import instrumentacion  # el módulo importado, no __main__: es el que consultan agente y percepción
+    from agente import AgentePersonalidad
+    from razonamiento import SistemaRazonamiento
+
+    sumidero = instrumentacion.activar(instrumentacion.SumideroPrometheus())
+    agente = AgentePersonalidad(motor="numpy", tamano_cache=64)
+    rng = np.random.default_rng(0)
+    respuestas = rng.integers(-3, 4, size=(32, 60)).tolist()
+    for i in range(200):
+        agente.analizar_completo(respuestas[i % 32], "ENFP")
+    agente.analizar_lote(rng.integers(-3, 4, size=(1000, 60)), "INTJ")
+    SistemaRazonamiento.busqueda_a_estrella("ISTJ", "ENFP")
+
+    print(json.dumps(sumidero.resumen(), indent=2, ensure_ascii=False))
+    print(sumidero.exposicion())
@@ -1,8 +1,14 @@
 '''
 MÓDULO INTEGRADOR Y EJECUTOR DEL AGENTE
+
+Sin argumentos abre el menú interactivo. Con --archivo puntúa en lote un archivo de respuestas:
+    python main.py --archivo respuestas.csv --salida resultados.jsonl --objetivo ENFP --procesos 8
 '''
 
-from agente import AgentePersonalidad
+from agente import FALTANTES, AgentePersonalidad
+import argparse
+import os
+import sys
 import numpy as np
 import json
 
@@ -116,5 +122,164 @@ def ejecutar():
         else:
             print("❌ Opción no válida.")
 
+# Puntuación masiva
+
+COLUMNAS_NO_RESPUESTA = ("Response Id", "Personalidad")
+
+
+def _importar_parquet():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as error:
+        raise ImportError("Leer archivos .parquet requiere pyarrow, que no está en requirements.txt: "
+                          "instálalo con 'pip install pyarrow' o convierte el archivo a .csv o .npy") from error
+    return pq
+
+
+def verificar_formato(ruta):
+    """
+    Comprueba que leer_fragmentos sabe leer 'ruta' y que la dependencia de su formato está instalada,
+    para fallar con un mensaje claro antes de abrir la salida y arrancar los trabajadores.
+    """
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension not in (".csv", ".parquet", ".npy"):
+        raise ValueError(f"Formato no soportado: {extension} (usar .csv, .parquet o .npy)")
+    if extension == ".parquet":
+        _importar_parquet()
+
+
+def leer_fragmentos(ruta, tamano_fragmento=10_000):
+    """
+    Lee un archivo de respuestas por fragmentos, sin cargarlo entero.
+    Formatos: .csv, .parquet (60 columnas de respuestas; 'Response Id' se usa como id si existe)
+    y .npy (matriz (N, 60), leída con mmap).
+    Genera tuplas (ids o None, X (n, 60)).
+    """
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension == ".npy":
+        X = np.load(ruta, mmap_mode="r")
+        if X.ndim != 2 or X.shape[1] != 60:
+            raise ValueError("El .npy debe ser una matriz (N, 60)")
+        for i in range(0, len(X), tamano_fragmento):
+            yield None, np.asarray(X[i:i + tamano_fragmento])
+        return
+
+    if extension == ".csv":
+        import pandas as pd
+        bloques = pd.read_csv(ruta, encoding="latin1", chunksize=tamano_fragmento)
+    elif extension == ".parquet":
+        pq = _importar_parquet()
+        bloques = (lote.to_pandas() for lote in pq.ParquetFile(ruta).iter_batches(batch_size=tamano_fragmento))
+    else:
+        raise ValueError(f"Formato no soportado: {extension} (usar .csv, .parquet o .npy)")
+
+    for bloque in bloques:
+        ids = bloque["Response Id"].tolist() if "Response Id" in bloque else None
+        respuestas = bloque.drop(columns=[c for c in COLUMNAS_NO_RESPUESTA if c in bloque])
+        if respuestas.shape[1] != 60:
+            raise ValueError(f"Se esperaban 60 columnas de respuestas y hay {respuestas.shape[1]}")
+        yield ids, respuestas.to_numpy(dtype=np.float32)
+
+
+# Estado de cada proceso trabajador: un agente cargado una sola vez
+_agente_trabajador = None
+
+
+def _inicializar_trabajador(ruta_modelo, motor):
+    global _agente_trabajador
+    _agente_trabajador = AgentePersonalidad(ruta_modelo, motor=motor, carga_diferida=True)
+
+
+def _puntuar_fragmento(tarea):
+    """Puntúa un fragmento con una sola predicción por lotes y devuelve sus líneas JSONL ya serializadas."""
+    inicio, ids, X, tipo_objetivo, faltantes = tarea
+    try:
+        resultados = _agente_trabajador.analizar_lote(X, tipo_objetivo, faltantes=faltantes)
+    except ValueError as error:
+        raise ValueError(f"Fragmento desde la fila {inicio}: {error}") from error
+    lineas = []
+    for i, resultado in enumerate(resultados):
+        registro = {"fila": inicio + i}
+        if ids is not None:
+            registro["id"] = ids[i]
+        registro.update(resultado)
+        lineas.append(json.dumps(registro, ensure_ascii=False, default=str))
+    return lineas
+
+
+def _tareas(ruta, tamano_fragmento, tipo_objetivo, faltantes):
+    inicio = 0
+    for ids, X in leer_fragmentos(ruta, tamano_fragmento):
+        yield inicio, ids, X, tipo_objetivo, faltantes
+        inicio += len(X)
+
+
+def puntuar_archivo(ruta, salida, tipo_objetivo=None, procesos=None, tamano_fragmento=10_000,
+                    ruta_modelo=None, motor="keras", faltantes="error"):
+    """
+    Puntúa todas las filas de 'ruta' y escribe un JSONL (una línea por fila, en el orden de entrada).
+    Los fragmentos se reparten entre 'procesos' trabajadores que cargan el modelo una vez cada uno;
+    como mucho hay 2 fragmentos en vuelo por trabajador, así la memoria no crece con el archivo.
+    faltantes: filas con respuestas vacías, "error" (se detiene) o "reportar" (línea con 'error' y
+    'preguntas_faltantes' en lugar del resultado); ver AgentePersonalidad.analizar_lote.
+    Devuelve la cantidad de filas escritas.
+    """
+    verificar_formato(ruta)
+    if tipo_objetivo:
+        tipo_objetivo = tipo_objetivo.upper()
+    procesos = procesos or os.cpu_count() or 1
+    escribir = sys.stdout if salida in (None, "-") else open(salida, "w", encoding="utf-8")
+    filas = 0
+    try:
+        if procesos == 1:
+            _inicializar_trabajador(ruta_modelo, motor)
+            lotes = map(_puntuar_fragmento, _tareas(ruta, tamano_fragmento, tipo_objetivo, faltantes))
+            for lineas in lotes:
+                escribir.write("\n".join(lineas) + "\n")
+                filas += len(lineas)
+            return filas
+
+        import multiprocessing
+        from collections import deque
+
+        contexto = multiprocessing.get_context("spawn")  # TensorFlow no es seguro tras fork
+        with contexto.Pool(procesos, initializer=_inicializar_trabajador, initargs=(ruta_modelo, motor)) as pool:
+            en_vuelo = deque()
+            for tarea in _tareas(ruta, tamano_fragmento, tipo_objetivo, faltantes):
+                en_vuelo.append(pool.apply_async(_puntuar_fragmento, (tarea,)))
+                while len(en_vuelo) >= 2 * procesos:
+                    lineas = en_vuelo.popleft().get()
+                    escribir.write("\n".join(lineas) + "\n")
+                    filas += len(lineas)
+            while en_vuelo:
+                lineas = en_vuelo.popleft().get()
+                escribir.write("\n".join(lineas) + "\n")
+                filas += len(lineas)
+        return filas
+    finally:
+        if escribir is not sys.stdout:
+            escribir.close()
+
+
+def parsear_argumentos():
+    parser = argparse.ArgumentParser(description="Agente de personalidad MBTI")
+    parser.add_argument("--archivo", help="Archivo de respuestas a puntuar en lote (.csv, .parquet o .npy)")
+    parser.add_argument("--salida", default="-", help="Archivo JSONL de salida ('-' = salida estándar)")
+    parser.add_argument("--objetivo", default=None, help="Tipo MBTI objetivo para agregar un plan a cada fila")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos trabajadores (por defecto, uno por CPU)")
+    parser.add_argument("--tamano-fragmento", type=int, default=10_000)
+    parser.add_argument("--motor", choices=["keras", "numpy", "int8"], default="keras")
+    parser.add_argument("--modelo", default=None, help="Ruta del modelo .h5 (el .npz se busca al lado)")
+    parser.add_argument("--faltantes", choices=FALTANTES, default="error",
+                        help="Filas con respuestas vacías: detenerse ('error') o marcarlas sin puntuar ('reportar')")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    ejecutar()
+    args = parsear_argumentos()
+    if args.archivo:
+        total = puntuar_archivo(args.archivo, args.salida, args.objetivo, args.procesos,
+                                args.tamano_fragmento, args.modelo, args.motor, args.faltantes)
+        print(f"✅ {total} filas puntuadas", file=sys.stderr)
+    else:
+        ejecutar()
@@ -0,0 +1,78 @@
+"""
+MÓDULO DE MÉTRICAS DE CLASIFICACIÓN
+Matriz de confusión acumulable y las métricas que salen de ella (exactitud, log-loss, precisión,
+recall y F1 por clase). Solo depende de NumPy: la usan percepcion (al entrenar) y evaluacion (sobre
+datasets completos) sin que percepcion tenga que importar evaluacion.
+"""
+
+import numpy as np
+
+
+class MatrizConfusion:
+    """
+    Matriz de confusión acumulable: valores[i, j] = filas de la clase real i predichas como j.
+    Como AcumuladorCohorte (analitica.py), dos matrices de la misma lista de clases se combinan sumándolas.
+    """
+
+    def __init__(self, clases):
+        self.clases = np.asarray(clases, dtype=str)
+        self.valores = np.zeros((len(self.clases), len(self.clases)), dtype=np.int64)
+        self.suma_log_loss = 0.0
+
+    @property
+    def filas(self):
+        return int(self.valores.sum())
+
+    def actualizar(self, reales, predichas, prob_reales=None):
+        """
+        reales, predichas: índices enteros (N,) en el orden de 'clases'.
+        prob_reales: probabilidad que el modelo dio a la clase real de cada fila (para la log-loss).
+        """
+        k = len(self.clases)
+        self.valores += np.bincount(np.asarray(reales) * k + np.asarray(predichas), minlength=k * k).reshape(k, k)
+        if prob_reales is not None:
+            self.suma_log_loss -= float(np.log(np.clip(prob_reales, 1e-15, 1.0)).sum())
+        return self
+
+    def combinar(self, otra):
+        if not np.array_equal(self.clases, otra.clases):
+            raise ValueError("Solo se pueden combinar matrices con las mismas clases")
+        self.valores += otra.valores
+        self.suma_log_loss += otra.suma_log_loss
+        return self
+
+    def metricas(self):
+        """
+        Precisión, recall, F1 y soporte por clase, más los promedios macro y ponderado (los mismos que
+        classification_report de scikit-learn, con 0 cuando una clase no tiene predicciones o soporte).
+        """
+        filas = self.filas
+        if not filas:
+            raise ValueError("La matriz de confusión está vacía")
+        aciertos = np.diag(self.valores).astype(np.float64)
+        soporte = self.valores.sum(axis=1)
+        predichas = self.valores.sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            precision = np.where(predichas > 0, aciertos / predichas, 0.0)
+            recall = np.where(soporte > 0, aciertos / soporte, 0.0)
+            f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+
+        def promedio(pesos):
+            return {
+                "precision": round(float(np.average(precision, weights=pesos)), 4),
+                "recall": round(float(np.average(recall, weights=pesos)), 4),
+                "f1": round(float(np.average(f1, weights=pesos)), 4),
+            }
+
+        return {
+            "filas": filas,
+            "exactitud": round(float(aciertos.sum() / filas), 4),
+            "log_loss": round(self.suma_log_loss / filas, 4),
+            "por_clase": {
+                clase: {"precision": round(float(p), 4), "recall": round(float(r), 4),
+                        "f1": round(float(f), 4), "soporte": int(s)}
+                for clase, p, r, f, s in zip(self.clases.tolist(), precision, recall, f1, soporte)
+            },
+            "macro": promedio(None),
+            "ponderado": promedio(soporte),
+        }
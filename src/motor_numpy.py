@@ -0,0 +1,258 @@
+"""
+MÓDULO MOTOR DE INFERENCIA NUMPY
+Exporta la red de percepción a arreglos .npz (con BatchNormalization plegada en las capas Dense)
+y la ejecuta solo con NumPy, sin necesidad de TensorFlow en el proceso que sirve predicciones.
+También genera una versión cuantizada a int8 (MotorInt8) para equipos con poca memoria.
+"""
+
+import os
+import numpy as np
+
+ACTIVACIONES = {
+    "linear": lambda z: z,
+    "relu": lambda z: np.maximum(z, 0, out=z),
+    "softmax": lambda z: _softmax(z),
+}
+
+
+def _softmax(z):
+    z = z - np.max(z, axis=1, keepdims=True)
+    np.exp(z, out=z)
+    z /= np.sum(z, axis=1, keepdims=True)
+    return z
+
+
+def _afin_batchnorm(capa):
+    """Devuelve (escala, desplazamiento) equivalentes a la BatchNormalization en inferencia."""
+    config = capa.get_config()
+    pesos = capa.get_weights()
+    gamma = pesos.pop(0) if config.get("scale", True) else None
+    beta = pesos.pop(0) if config.get("center", True) else None
+    media, varianza = pesos
+    escala = 1.0 / np.sqrt(varianza + config["epsilon"])
+    if gamma is not None:
+        escala = escala * gamma
+    desplazamiento = -media * escala
+    if beta is not None:
+        desplazamiento = desplazamiento + beta
+    return escala, desplazamiento
+
+
+def plegar_capas(modelo):
+    """
+    Recorre un modelo Keras secuencial y devuelve una lista de (W, b, activacion).
+    Cada BatchNormalization se pliega en una Dense:
+      - en la anterior si esa Dense no tiene activación (BN(Wx + b) es afín),
+      - si no, en la siguiente, ya que Dense(a * h + c) = (a[:, None] * W)ᵀ h + (cᵀ W + b).
+    Las capas Dropout se ignoran (son la identidad en inferencia).
+    """
+    capas = []
+    pendiente = None  # (escala, desplazamiento) a plegar en la próxima Dense
+
+    for capa in modelo.layers:
+        tipo = type(capa).__name__
+        if tipo == "Dense":
+            W, b = capa.get_weights()
+            W, b = W.astype(np.float64), b.astype(np.float64)
+            if pendiente is not None:
+                escala, desplazamiento = pendiente
+                b = desplazamiento @ W + b
+                W = escala[:, None] * W
+                pendiente = None
+            capas.append([W, b, capa.get_config()["activation"]])
+        elif tipo == "BatchNormalization":
+            escala, desplazamiento = _afin_batchnorm(capa)
+            if capas and capas[-1][2] == "linear" and pendiente is None:
+                W, b, act = capas[-1]
+                capas[-1] = [W * escala, b * escala + desplazamiento, act]
+            elif pendiente is not None:
+                escala_prev, desp_prev = pendiente
+                pendiente = (escala_prev * escala, desp_prev * escala + desplazamiento)
+            else:
+                pendiente = (escala, desplazamiento)
+        elif tipo in ("Dropout", "InputLayer"):
+            continue
+        else:
+            raise ValueError(f"Capa no soportada por el motor NumPy: {tipo}")
+
+    if pendiente is not None:
+        raise ValueError("El modelo termina en BatchNormalization; no hay Dense donde plegarla")
+
+    return [(W.astype(np.float32), b.astype(np.float32), act) for W, b, act in capas]
+
+
+def exportar_npz(modelo, ruta_npz):
+    """Pliega el modelo Keras y guarda sus pesos como arreglos planos en un .npz."""
+    capas = plegar_capas(modelo)
+    arreglos = {"activaciones": np.array([act for _, _, act in capas])}
+    for i, (W, b, _) in enumerate(capas):
+        arreglos[f"W{i}"] = W
+        arreglos[f"b{i}"] = b
+
+    os.makedirs(os.path.dirname(os.path.abspath(ruta_npz)), exist_ok=True)
+    np.savez(ruta_npz, **arreglos)
+    print(f"Modelo NumPy exportado en {ruta_npz}")
+    return ruta_npz
+
+
+class MotorNumPy:
+    """
+    Predictor de la red exportada con exportar_npz.
+    Expone predict(X, batch_size, verbose) con la misma forma que un modelo Keras,
+    así SistemaPercepcion puede usarlo en lugar de self.modelo.
+    """
+
+    def __init__(self, ruta_npz):
+        with np.load(ruta_npz, allow_pickle=False) as datos:
+            activaciones = [str(a) for a in datos["activaciones"]]
+            self.capas = [
+                (datos[f"W{i}"], datos[f"b{i}"], activacion)
+                for i, activacion in enumerate(activaciones)
+            ]
+        for _, _, activacion in self.capas:
+            if activacion not in ACTIVACIONES:
+                raise ValueError(f"Activación no soportada por el motor NumPy: {activacion}")
+        self.ruta_npz = os.path.abspath(ruta_npz)
+
+    @classmethod
+    def desde_capas(cls, capas, ruta_npz=None):
+        """Crea el motor a partir de capas (W, b, activacion) ya cargadas, p. ej. de un paquete con mmap."""
+        motor = cls.__new__(cls)
+        motor.capas = list(capas)
+        for _, _, activacion in motor.capas:
+            if activacion not in ACTIVACIONES:
+                raise ValueError(f"Activación no soportada por el motor NumPy: {activacion}")
+        motor.ruta_npz = os.path.abspath(ruta_npz) if ruta_npz else None
+        return motor
+
+    def memoria_pesos(self):
+        """Bytes que ocupan los parámetros en memoria."""
+        return sum(W.nbytes + b.nbytes for W, b, _ in self.capas)
+
+    def _propagar(self, X):
+        for W, b, activacion in self.capas:
+            X = X @ W
+            X += b
+            X = ACTIVACIONES[activacion](X)
+        return X
+
+    def predict(self, X, batch_size=None, verbose=0):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if batch_size is None or len(X) <= batch_size:
+            return self._propagar(X)
+        return np.concatenate([
+            self._propagar(X[i:i + batch_size]) for i in range(0, len(X), batch_size)
+        ])
+
+
+# Rango simétrico de int8 (se excluye -128 para que la escala sea la misma en ambos signos)
+INT8_MAX = 127
+
+
+def calibrar_rangos(capas, X_calibracion):
+    """
+    Propaga una muestra ya escalada por las capas en float32 y devuelve, por capa,
+    el máximo valor absoluto de su entrada (de donde sale la escala de cuantización de activaciones).
+    """
+    X = np.asarray(X_calibracion, dtype=np.float32)
+    rangos = []
+    for W, b, activacion in capas:
+        rangos.append(float(np.max(np.abs(X))))
+        X = ACTIVACIONES[activacion](X @ W + b)
+    return rangos
+
+
+def exportar_int8(capas, X_calibracion, ruta_npz):
+    """
+    Cuantiza a int8 las capas (W, b, activacion) de plegar_capas / MotorNumPy con una escala por capa:
+      - pesos: escala_w = max|W| / 127, W_q = round(W / escala_w),
+      - entrada de cada capa: escala_x = max|x| / 127 calibrada sobre X_calibracion.
+    El sesgo queda en float32 y se suma después de reescalar el acumulador.
+    Guarda un .npz con W{i} (int8), b{i}, escala_x{i}, escala_w{i} y activaciones.
+    """
+    rangos = calibrar_rangos(capas, X_calibracion)
+    arreglos = {"activaciones": np.array([act for _, _, act in capas])}
+    for i, ((W, b, _), rango) in enumerate(zip(capas, rangos)):
+        # El producto int8 x int8 se acumula en float32: es exacto mientras no pase de 2^24
+        if W.shape[0] * INT8_MAX * INT8_MAX >= 2 ** 24:
+            raise ValueError(f"Capa {i} demasiado ancha para acumular exactamente en float32: {W.shape[0]} entradas")
+        escala_w = max(float(np.max(np.abs(W))), 1e-12) / INT8_MAX
+        escala_x = max(rango, 1e-12) / INT8_MAX
+        arreglos[f"W{i}"] = np.clip(np.rint(W / escala_w), -INT8_MAX, INT8_MAX).astype(np.int8)
+        arreglos[f"b{i}"] = np.asarray(b, dtype=np.float32)
+        arreglos[f"escala_w{i}"] = np.float32(escala_w)
+        arreglos[f"escala_x{i}"] = np.float32(escala_x)
+
+    os.makedirs(os.path.dirname(os.path.abspath(ruta_npz)), exist_ok=True)
+    np.savez(ruta_npz, **arreglos)
+    print(f"Modelo int8 exportado en {ruta_npz}")
+    return ruta_npz
+
+
+class MotorInt8(MotorNumPy):
+    """
+    Predictor de la red cuantizada con exportar_int8. Los pesos quedan en memoria como int8.
+    En cada capa la entrada se cuantiza a int8 con su escala calibrada, se multiplica por W_q
+    (acumulación entera exacta) y el resultado se lleva a float con escala_x * escala_w.
+    Misma interfaz predict que MotorNumPy.
+    """
+
+    def __init__(self, ruta_npz):
+        with np.load(ruta_npz, allow_pickle=False) as datos:
+            activaciones = [str(a) for a in datos["activaciones"]]
+            self.capas = [
+                (datos[f"W{i}"], datos[f"b{i}"], activacion,
+                 float(datos[f"escala_x{i}"]), float(datos[f"escala_w{i}"]))
+                for i, activacion in enumerate(activaciones)
+            ]
+        for W, _, activacion, _, _ in self.capas:
+            if W.dtype != np.int8:
+                raise ValueError(f"{ruta_npz} no es un modelo int8")
+            if activacion not in ACTIVACIONES:
+                raise ValueError(f"Activación no soportada por el motor int8: {activacion}")
+        self.ruta_npz = os.path.abspath(ruta_npz)
+
+    def memoria_pesos(self):
+        """Bytes que ocupan los parámetros en memoria."""
+        return sum(W.nbytes + b.nbytes for W, b, _, _, _ in self.capas)
+
+    def _propagar(self, X):
+        for W_q, b, activacion, escala_x, escala_w in self.capas:
+            X_q = np.rint(X * (1.0 / escala_x))
+            np.clip(X_q, -INT8_MAX, INT8_MAX, out=X_q)
+            X = X_q @ W_q.astype(np.float32)
+            X *= escala_x * escala_w
+            X += b
+            X = ACTIVACIONES[activacion](X)
+        return X
+
+
+def verificar_paridad(modelo, motor, n=2048, semilla=0, tolerancia=1e-4):
+    """
+    Compara las probabilidades del modelo Keras con las del motor NumPy
+    sobre respuestas sintéticas ya escaladas. Devuelve la diferencia máxima absoluta.
+    """
+    rng = np.random.default_rng(semilla)
+    X = rng.standard_normal((n, modelo.input_shape[-1])).astype(np.float32)
+    esperado = modelo.predict(X, batch_size=n, verbose=0)
+    obtenido = motor.predict(X)
+    diferencia = float(np.max(np.abs(esperado - obtenido)))
+    coincidencias = float(np.mean(np.argmax(esperado, axis=1) == np.argmax(obtenido, axis=1)))
+    if diferencia > tolerancia:
+        raise AssertionError(f"El motor NumPy difiere del modelo Keras: {diferencia:.2e} > {tolerancia:.0e}")
+    print(f"Paridad Keras/NumPy: diferencia máxima {diferencia:.2e}, argmax coincide en {coincidencias:.1%}")
+    return diferencia
+
+
+if __name__ == "__main__":
+    from tensorflow.keras.models import load_model
+
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+    ruta_h5 = os.path.join(BASE_DIR, "..", "models", "modelo_personalidad.h5")
+    ruta_npz = os.path.splitext(ruta_h5)[0] + ".npz"
+
+    modelo = load_model(ruta_h5)
+    exportar_npz(modelo, ruta_npz)
+    verificar_paridad(modelo, MotorNumPy(ruta_npz))
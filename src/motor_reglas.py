@@ -0,0 +1,156 @@
+"""
+MÓDULO DE MOTOR DE REGLAS
+Encadenamiento hacia adelante sobre reglas "si A y B ... entonces C, D" cargadas desde archivos JSON.
+
+Las reglas se indexan por antecedente (memoria alfa, como en Rete): cada hecho nuevo solo toca las
+reglas que lo mencionan, y cada regla lleva la cuenta de cuántos antecedentes le faltan. Cuando esa
+cuenta llega a 0 la regla se dispara y sus consecuentes entran como hechos nuevos. El costo de una
+inferencia depende de las reglas afectadas por los hechos derivados, no del total de reglas de la base.
+
+Los antecedentes son conjunciones de hechos positivos (sin negación), así que el conjunto de hechos
+derivados no depende del orden de disparo y se puede memorizar por conjunto de hechos iniciales.
+
+Formato de los archivos de reglas:
+
+    {"reglas": [
+        {"id": "temperamento_analista", "si": ["N", "T"], "entonces": ["temperamento:analista"],
+         "explicacion": "texto opcional que se muestra cuando la regla se dispara"}
+    ]}
+"""
+
+import json
+import os
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class Regla(NamedTuple):
+    id: str
+    antecedentes: Tuple[str, ...]
+    consecuentes: Tuple[str, ...]
+    explicacion: Optional[str] = None
+
+
+class Inferencia(NamedTuple):
+    """Resultado de una inferencia. 'hechos' y 'disparadas' están en el orden en que se derivaron."""
+    hechos: Tuple[str, ...]
+    disparadas: Tuple[str, ...]
+    explicaciones: Tuple[str, ...]
+    evaluaciones: int  # veces que se tocó una regla desde el índice
+
+
+def leer_reglas(ruta: str) -> List[Regla]:
+    """Lee un archivo JSON de reglas y valida cada entrada."""
+    with open(ruta, encoding="utf-8") as f:
+        datos = json.load(f)
+    reglas = []
+    for posicion, entrada in enumerate(datos.get("reglas", [])):
+        id_regla = entrada.get("id") or f"{os.path.basename(ruta)}#{posicion}"
+        antecedentes = tuple(dict.fromkeys(entrada.get("si", [])))
+        consecuentes = tuple(dict.fromkeys(entrada.get("entonces", [])))
+        if not antecedentes:
+            raise ValueError(f"{ruta}: la regla '{id_regla}' no tiene antecedentes ('si')")
+        if not consecuentes:
+            raise ValueError(f"{ruta}: la regla '{id_regla}' no tiene consecuentes ('entonces')")
+        if not all(isinstance(h, str) and h for h in antecedentes + consecuentes):
+            raise ValueError(f"{ruta}: los hechos de la regla '{id_regla}' deben ser cadenas no vacías")
+        reglas.append(Regla(id_regla, antecedentes, consecuentes, entrada.get("explicacion")))
+    return reglas
+
+
+def cargar_reglas(origen: str) -> List[Regla]:
+    """Reglas de un archivo .json o de todos los .json de un directorio (en orden alfabético)."""
+    if os.path.isdir(origen):
+        rutas = [os.path.join(origen, nombre) for nombre in sorted(os.listdir(origen)) if nombre.endswith(".json")]
+    else:
+        rutas = [origen]
+    reglas = []
+    for ruta in rutas:
+        reglas.extend(leer_reglas(ruta))
+    return reglas
+
+
+class MotorReglas:
+    """Base de reglas indexada por antecedente. Es inmutable: se puede compartir entre hilos."""
+
+    def __init__(self, reglas: Iterable[Regla]):
+        self.reglas = list(reglas)
+        vistos = set()
+        for regla in self.reglas:
+            if regla.id in vistos:
+                raise ValueError(f"Regla duplicada: {regla.id}")
+            vistos.add(regla.id)
+        # Memoria alfa: hecho -> índices de las reglas que lo tienen como antecedente
+        self._indice: Dict[str, Tuple[int, ...]] = {}
+        for i, regla in enumerate(self.reglas):
+            for hecho in regla.antecedentes:
+                self._indice.setdefault(hecho, []).append(i)
+        self._indice = {hecho: tuple(indices) for hecho, indices in self._indice.items()}
+        self._num_antecedentes = [len(regla.antecedentes) for regla in self.reglas]
+
+    def __len__(self) -> int:
+        return len(self.reglas)
+
+    def inferir(self, hechos_iniciales: Sequence[str]) -> Inferencia:
+        """Encadenamiento hacia adelante hasta el punto fijo, tocando solo las reglas afectadas por cada hecho."""
+        indice, num_antecedentes, reglas = self._indice, self._num_antecedentes, self.reglas
+        # Antecedentes que aún le faltan a cada regla tocada (las no tocadas no ocupan memoria)
+        faltantes: Dict[int, int] = {}
+        hechos = dict.fromkeys(hechos_iniciales)
+        pendientes = deque(hechos)
+        disparadas, explicaciones = [], []
+        evaluaciones = 0
+
+        while pendientes:
+            hecho = pendientes.popleft()
+            for i in indice.get(hecho, ()):
+                evaluaciones += 1
+                resto = faltantes.get(i, num_antecedentes[i]) - 1
+                faltantes[i] = resto
+                if resto:
+                    continue
+                regla = reglas[i]
+                disparadas.append(regla.id)
+                if regla.explicacion:
+                    explicaciones.append(regla.explicacion)
+                for consecuente in regla.consecuentes:
+                    if consecuente not in hechos:
+                        hechos[consecuente] = None
+                        pendientes.append(consecuente)
+
+        return Inferencia(tuple(hechos), tuple(disparadas), tuple(explicaciones), evaluaciones)
+
+    def inferir_sin_indice(self, hechos_iniciales: Sequence[str]) -> Inferencia:
+        """
+        Referencia ingenua: recorre todas las reglas en cada pasada hasta que ninguna agrega hechos.
+        Deriva el mismo conjunto de hechos que inferir (el orden puede variar); sirve para verificar y comparar.
+        """
+        hechos = dict.fromkeys(hechos_iniciales)
+        disparada = [False] * len(self.reglas)
+        disparadas, explicaciones = [], []
+        evaluaciones = 0
+        cambio = True
+        while cambio:
+            cambio = False
+            for i, regla in enumerate(self.reglas):
+                if disparada[i]:
+                    continue
+                evaluaciones += 1
+                if all(h in hechos for h in regla.antecedentes):
+                    disparada[i] = cambio = True
+                    disparadas.append(regla.id)
+                    if regla.explicacion:
+                        explicaciones.append(regla.explicacion)
+                    for consecuente in regla.consecuentes:
+                        hechos.setdefault(consecuente, None)
+        return Inferencia(tuple(hechos), tuple(disparadas), tuple(explicaciones), evaluaciones)
+
+
+def agrupar_hechos(hechos: Iterable[str]) -> Dict[str, List[str]]:
+    """Agrupa los hechos 'categoria:valor' por categoría (los hechos sin categoría se omiten)."""
+    grupos: Dict[str, List[str]] = {}
+    for hecho in hechos:
+        categoria, separador, valor = hecho.partition(":")
+        if separador:
+            grupos.setdefault(categoria, []).append(valor)
+    return grupos
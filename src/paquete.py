@@ -0,0 +1,137 @@
+"""
+MÓDULO DE PAQUETES DE MODELO
+Un paquete (.paquete) es un único archivo versionado con todo lo necesario para predecir:
+pesos de la red (BatchNormalization ya plegada, como el motor NumPy), media y escala del scaler,
+lista de clases, metadatos y un SHA-256 de los datos.
+
+Formato (sin pickle):
+    b"MBTIPAQ1" | largo de la cabecera (uint64 little-endian) | cabecera JSON | relleno | datos
+La cabecera describe cada arreglo (dtype, forma y desplazamiento dentro de la sección de datos);
+los arreglos están alineados a 64 bytes para poder leerlos con mmap sin copiar.
+
+Los paquetes se escriben en un archivo temporal y se publican con os.replace, así que un lector
+ve el paquete anterior completo o el nuevo completo, nunca una mezcla.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+
+import numpy as np
+
+MAGIA = b"MBTIPAQ1"
+FORMATO = 1
+ALINEACION = 64
+
+
+def _alinear(n):
+    return (n + ALINEACION - 1) // ALINEACION * ALINEACION
+
+
+def escribir_paquete(ruta, capas, media, escala, clases, metadatos=None, version=None):
+    """
+    Escribe un paquete de forma atómica.
+    capas: lista de (W, b, activacion) como devuelve motor_numpy.plegar_capas.
+    version: etiqueta libre (por defecto, la fecha y hora de escritura).
+    Devuelve la cabecera escrita.
+    """
+    arreglos = {"media": np.asarray(media, dtype=np.float64), "escala": np.asarray(escala, dtype=np.float64)}
+    for i, (W, b, _) in enumerate(capas):
+        arreglos[f"W{i}"] = np.ascontiguousarray(W, dtype=np.float32)
+        arreglos[f"b{i}"] = np.ascontiguousarray(b, dtype=np.float32)
+
+    descriptores, desplazamiento = {}, 0
+    for nombre, arreglo in arreglos.items():
+        descriptores[nombre] = {"dtype": arreglo.dtype.str, "forma": list(arreglo.shape), "desplazamiento": desplazamiento}
+        desplazamiento = _alinear(desplazamiento + arreglo.nbytes)
+    datos = bytearray(desplazamiento)
+    for nombre, arreglo in arreglos.items():
+        inicio = descriptores[nombre]["desplazamiento"]
+        datos[inicio:inicio + arreglo.nbytes] = arreglo.tobytes()
+
+    cabecera = {
+        "formato": FORMATO,
+        "version": version or time.strftime("%Y%m%d-%H%M%S"),
+        "clases": [str(c) for c in clases],
+        "activaciones": [act for _, _, act in capas],
+        "arreglos": descriptores,
+        "bytes_datos": len(datos),
+        "sha256": hashlib.sha256(datos).hexdigest(),
+        "metadatos": metadatos or {},
+    }
+    texto = json.dumps(cabecera, ensure_ascii=False).encode("utf-8")
+    inicio_datos = _alinear(len(MAGIA) + 8 + len(texto))
+
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "wb") as f:
+        f.write(MAGIA + struct.pack("<Q", len(texto)) + texto)
+        f.write(b"\0" * (inicio_datos - f.tell()))
+        f.write(datos)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, ruta)
+    print(f"Paquete {cabecera['version']} escrito en {ruta}")
+    return cabecera
+
+
+class Paquete:
+    """
+    Paquete leído de disco. Atributos: capas [(W, b, activacion)], media, escala, clases (arreglo str),
+    version, metadatos, sha256 y ruta. Con mmap=True los arreglos son vistas de solo lectura del archivo.
+    """
+
+    def __init__(self, ruta, mmap_=True, verificar=True):
+        with open(ruta, "rb") as f:
+            if f.read(len(MAGIA)) != MAGIA:
+                raise ValueError(f"{ruta} no es un paquete de modelo MBTI")
+            (largo,) = struct.unpack("<Q", f.read(8))
+            cabecera = json.loads(f.read(largo).decode("utf-8"))
+            if cabecera["formato"] != FORMATO:
+                raise ValueError(f"Formato de paquete no soportado: {cabecera['formato']}")
+            inicio_datos = _alinear(len(MAGIA) + 8 + largo)
+            if mmap_:
+                buffer = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))[inicio_datos:]
+            else:
+                f.seek(inicio_datos)
+                buffer = memoryview(f.read())
+
+        if len(buffer) < cabecera["bytes_datos"]:
+            raise ValueError(f"Paquete truncado: {ruta}")
+        buffer = buffer[:cabecera["bytes_datos"]]
+        if verificar and hashlib.sha256(buffer).hexdigest() != cabecera["sha256"]:
+            raise ValueError(f"Checksum inválido en {ruta}: el paquete está corrupto")
+
+        def arreglo(nombre):
+            d = cabecera["arreglos"][nombre]
+            dtype = np.dtype(d["dtype"])
+            cantidad = int(np.prod(d["forma"], dtype=np.int64))
+            return np.frombuffer(buffer, dtype=dtype, count=cantidad, offset=d["desplazamiento"]).reshape(d["forma"])
+
+        self.ruta = os.path.abspath(ruta)
+        self.version = cabecera["version"]
+        self.metadatos = cabecera["metadatos"]
+        self.sha256 = cabecera["sha256"]
+        self.clases = np.array(cabecera["clases"])
+        self.media = arreglo("media")
+        self.escala = arreglo("escala")
+        self.capas = [(arreglo(f"W{i}"), arreglo(f"b{i}"), act) for i, act in enumerate(cabecera["activaciones"])]
+
+
+def leer_paquete(ruta, mmap_=True, verificar=True):
+    return Paquete(ruta, mmap_=mmap_, verificar=verificar)
+
+
+if __name__ == "__main__":
+    # Muestra la cabecera de un paquete y verifica su checksum
+    import sys
+
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+    ruta = sys.argv[1] if len(sys.argv) > 1 else os.path.join(BASE_DIR, "..", "models", "modelo_personalidad.paquete")
+    paquete = leer_paquete(ruta)
+    print(f"Paquete {paquete.version} ({paquete.sha256[:12]}…): {len(paquete.capas)} capas, "
+          f"{len(paquete.clases)} clases, {len(paquete.media)} preguntas")
+    print(json.dumps(paquete.metadatos, indent=2, ensure_ascii=False))
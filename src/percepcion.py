@@ -1,153 +1,1329 @@
 """
 MÓDULO DE PERCEPCIÓN Y APRENDIZAJE AUTOMÁTICO
 Maneja la carga de datos, preprocesamiento, entrenamiento y predicción del modelo de red neuronal.
+
+Las dependencias de entrenamiento (pandas, scikit-learn, TensorFlow) se importan solo dentro
+de los métodos que las usan, para que servir predicciones con el motor NumPy no las cargue.
 """
+import hashlib
+import json
 import os
-import pandas as pd
+import sys
+import threading
+import time
+import warnings
+from collections import OrderedDict
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.metrics import classification_report, confusion_matrix
-from tensorflow.keras.models import Sequential, load_model
-from tensorflow.keras.layers import Dense, Dropout, BatchNormalization
-from tensorflow.keras.callbacks import EarlyStopping
-from tensorflow.keras.utils import to_categorical
-from tensorflow.keras.models import load_model
+import instrumentacion
+from metricas import MatrizConfusion
+from motor_numpy import MotorInt8, MotorNumPy, exportar_int8, exportar_npz, plegar_capas
+from paquete import escribir_paquete, leer_paquete
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODELS_DIR = os.path.join(BASE_DIR, "..", "models")
 DATA_DIR = os.path.join(BASE_DIR, "..", "data")
 
+MOTORES = ("keras", "numpy", "int8")
+
+COLUMNA_ID = "Response Id"
+COLUMNA_ETIQUETA = "Personalidad"
+PARTICIONES = {"train": 0, "val": 1, "test": 2}
+ARCHIVOS_PREPROCESAMIENTO = ("label_mapping.npy", "scaler_mean.npy", "scaler_scale.npy", "scaler_n.npy")
+# Constancia, junto al modelo, de que se entrenó con la partición por hash del id (asignar_particion)
+ARCHIVO_PARTICION = "particion.json"
+
+# Tasa de aprendizaje de referencia (Adam por defecto de Keras) y el batch_size con el que se ajustó
+TASA_BASE = 0.001
+BATCH_BASE = 64
+ESCALADOS_TASA = ("lineal", "raiz")
+
+
+def configurar_hilos(intra=None, inter=None, replicas=1):
+    """
+    Hilos de TensorFlow para entrenar en CPU. Hay que llamarla antes de la primera operación de
+    TensorFlow del proceso; si ya se inicializó, avisa y deja la configuración como estaba.
+    intra: hilos de cada operación (por defecto, las CPUs asignadas al proceso).
+    inter: operaciones independientes que pueden correr a la vez (por defecto, lo decide TensorFlow).
+    replicas: con más de 1 parte la CPU en ese número de dispositivos lógicos, para entrenar en
+    paralelo de datos con MirroredStrategy (ver entrenar).
+    Devuelve la configuración aplicada.
+    """
+    import tensorflow as tf
+
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    intra = intra or cpus
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(intra)
+        if inter:
+            tf.config.threading.set_inter_op_parallelism_threads(inter)
+        if replicas > 1:
+            cpu = tf.config.list_physical_devices("CPU")[0]
+            tf.config.set_logical_device_configuration(cpu, [tf.config.LogicalDeviceConfiguration()] * replicas)
+    except RuntimeError as error:
+        print(f"⚠️ TensorFlow ya está inicializado, no se cambian los hilos: {error}")
+    return {"hilos_intra": tf.config.threading.get_intra_op_parallelism_threads(),
+            "hilos_inter": tf.config.threading.get_inter_op_parallelism_threads(),
+            "replicas": len(tf.config.list_logical_devices("CPU"))}
+
+
+def tasa_escalada(batch_size, escalado=None, tasa_base=TASA_BASE):
+    """
+    Tasa de aprendizaje para batch_size a partir de la de BATCH_BASE: "lineal" la multiplica por
+    batch_size / 64 y "raiz" por su raíz cuadrada (más estable con Adam en lotes grandes).
+    """
+    if escalado is None:
+        return tasa_base
+    if escalado not in ESCALADOS_TASA:
+        raise ValueError(f"escalado debe ser uno de {ESCALADOS_TASA}")
+    factor = batch_size / BATCH_BASE
+    return tasa_base * (factor if escalado == "lineal" else factor ** 0.5)
+
+
+def dataset_memoria(X, y, batch_size, semilla=None):
+    """
+    tf.data sobre arreglos en memoria: barajado por época (con 'semilla'), lotes armados en
+    paralelo y prefetch, para que el siguiente lote esté listo mientras se entrena el actual.
+    """
+    import tensorflow as tf
+
+    dataset = tf.data.Dataset.from_tensor_slices((np.asarray(X, dtype=np.float32), np.asarray(y, dtype=np.float32)))
+    if semilla is not None:
+        dataset = dataset.shuffle(len(X), seed=semilla, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size, num_parallel_calls=tf.data.AUTOTUNE, deterministic=semilla is None)
+    opciones = tf.data.Options()
+    # Con MirroredStrategy cada réplica toma una parte de cada lote (no hay archivos que repartir)
+    opciones.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.DATA
+    return dataset.with_options(opciones).prefetch(tf.data.AUTOTUNE)
+
+
+def crear_medidor_epocas(muestras_por_epoca):
+    """Callback de Keras que mide cada época (segundos y muestras/s) y guarda las mediciones en .epocas."""
+    from tensorflow.keras.callbacks import Callback
+
+    class MedidorEpocas(Callback):
+        def __init__(self):
+            super().__init__()
+            self.epocas = []
+
+        def on_epoch_begin(self, epoca, logs=None):
+            self._inicio = time.perf_counter()
+
+        def on_epoch_end(self, epoca, logs=None):
+            segundos = time.perf_counter() - self._inicio
+            self.epocas.append({"epoca": epoca + 1, "segundos": segundos,
+                                "muestras_por_segundo": muestras_por_epoca / segundos})
+            print(f"Época {epoca + 1}: {segundos:.2f} s, {muestras_por_epoca / segundos:,.0f} muestras/s")
+
+        def resumen(self):
+            """Mediana por época, sin la primera (incluye el trazado del grafo) si hay más de una."""
+            medidas = self.epocas[1:] or self.epocas
+            segundos = float(np.median([e["segundos"] for e in medidas]))
+            return {"epocas": len(self.epocas), "segundos_epoca": round(segundos, 3),
+                    "muestras_por_segundo": round(muestras_por_epoca / segundos, 1)}
+
+    return MedidorEpocas()
+
+
+def _fraccion_hash(ids):
+    """Hash determinista (splitmix64) de cada id a un valor en [0, 1); no depende del orden ni del tamaño del archivo."""
+    with np.errstate(over="ignore"):
+        z = np.asarray(ids).astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def ruta_cache(ruta_csv):
+    """Directorio de la caché binaria asociada a un CSV (data/16P.csv -> data/16P.cache/)."""
+    return os.path.splitext(os.path.abspath(ruta_csv))[0] + ".cache"
+
+
+def _huella_archivo(ruta):
+    """Tamaño y fecha de modificación: detección rápida de cambios en el CSV fuente."""
+    info = os.stat(ruta)
+    return {"tamano": info.st_size, "mtime_ns": info.st_mtime_ns}
+
+
+def sha256_archivo(ruta, tamano_bloque=1 << 20):
+    """SHA-256 (hex) de un archivo leído por bloques: identifica el modelo o el dataset en los reportes."""
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(tamano_bloque), b""):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+class DatasetCache:
+    """
+    Dataset preprocesado en formato columnar binario (ver SistemaPercepcion.convertir_a_cache).
+    X (filas, 60) int8, y (filas,) uint8 e ids (filas,) int64 son vistas np.memmap de solo lectura.
+    """
+
+    def __init__(self, directorio):
+        with open(os.path.join(directorio, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        filas, columnas = self.meta["filas"], len(self.meta["preguntas"])
+        self.directorio = directorio
+        self.clases = np.array(self.meta["clases"])
+        self.preguntas = self.meta["preguntas"]
+        self.X = np.memmap(os.path.join(directorio, "respuestas.int8"), dtype=np.int8, mode="r", shape=(filas, columnas))
+        self.y = np.memmap(os.path.join(directorio, "etiquetas.uint8"), dtype=np.uint8, mode="r", shape=(filas,))
+        self.ids = np.memmap(os.path.join(directorio, "ids.int64"), dtype=np.int64, mode="r", shape=(filas,))
+
+    def __len__(self):
+        return self.meta["filas"]
+
+    @staticmethod
+    def es_valida(ruta_csv):
+        """True si existe una caché completa para el CSV y el CSV no cambió desde la conversión."""
+        meta = os.path.join(ruta_cache(ruta_csv), "meta.json")
+        if not os.path.exists(meta):
+            return False
+        with open(meta, encoding="utf-8") as f:
+            fuente = json.load(f)["fuente"]
+        return not os.path.exists(ruta_csv) or {
+            "tamano": fuente["tamano"], "mtime_ns": fuente["mtime_ns"]
+        } == _huella_archivo(ruta_csv)
+
+
+def clave_respuestas(respuestas):
+    """
+    Empaqueta 60 respuestas enteras en -3..3 en una clave de 23 bytes (3 bits por respuesta).
+    Devuelve None si alguna respuesta no es un entero de ese rango (esas consultas no se cachean).
+    """
+    X = np.asarray(respuestas)
+    if X.dtype.kind == "f":
+        if not np.all(X == np.round(X)):
+            return None
+    elif X.dtype.kind not in "iu":
+        return None
+    if X.min() < -3 or X.max() > 3:
+        return None
+    bits = np.unpackbits((X + 3).astype(np.uint8)[:, None], axis=1)[:, 5:]
+    return np.packbits(bits).tobytes()
+
+
+def asignar_particion(ids, proporcion_train=0.70, proporcion_val=0.15):
+    """
+    Asigna cada fila a train (0), val (1) o test (2) según el hash de su id (70/15/15).
+    Es la división de entrenar y entrenar_streaming; los modelos entrenados así dejan particion.json
+    junto a ellos (ver SistemaPercepcion.particion_por_hash).
+    """
+    fraccion = _fraccion_hash(ids)
+    particion = np.full(fraccion.shape, PARTICIONES["test"], dtype=np.uint8)
+    particion[fraccion < proporcion_train + proporcion_val] = PARTICIONES["val"]
+    particion[fraccion < proporcion_train] = PARTICIONES["train"]
+    return particion
+
+def cargar_clases(ruta):
+    """
+    Lee label_mapping.npy sin pickle. Los archivos antiguos guardaban las clases como arreglo de
+    objetos (LabelEncoder.classes_); solo para esos se acepta pickle y se convierten a str.
+    """
+    try:
+        return np.load(ruta, allow_pickle=False)
+    except ValueError:
+        return np.load(ruta, allow_pickle=True).astype(str)
+
+
+def combinar_estadisticas(media, escala, n, X_nuevo):
+    """
+    Actualiza la media y la desviación de un StandardScaler ya ajustado sobre n filas con filas nuevas,
+    sin volver a leer las anteriores (combinación de varianzas de Chan et al.).
+    Devuelve (media, escala, n) actualizados.
+    """
+    X_nuevo = np.asarray(X_nuevo, dtype=np.float64)
+    n_nuevo = len(X_nuevo)
+    if n_nuevo == 0:
+        return media, escala, n
+    total = n + n_nuevo
+    delta = X_nuevo.mean(axis=0) - media
+    m2 = np.square(escala) * n + X_nuevo.var(axis=0) * n_nuevo + np.square(delta) * n * n_nuevo / total
+    escala_nueva = np.sqrt(m2 / total)
+    escala_nueva[escala_nueva == 0] = 1.0  # igual que StandardScaler con varianza nula
+    return media + delta * n_nuevo / total, escala_nueva, total
+
+
+def reescalar_primera_capa(modelo, media_anterior, escala_anterior, media_nueva, escala_nueva):
+    """
+    Ajusta la primera Dense para que el modelo dé las mismas salidas con el scaler nuevo:
+    z_anterior = a * z_nuevo + c, con a = escala_nueva / escala_anterior y c = (media_nueva - media_anterior) / escala_anterior,
+    así que W' = a[:, None] * W y b' = b + c W.
+    """
+    capa = next(c for c in modelo.layers if type(c).__name__ == "Dense")
+    W, b = capa.get_weights()
+    a = escala_nueva / escala_anterior
+    c = (media_nueva - media_anterior) / escala_anterior
+    capa.set_weights([(a[:, None] * W).astype(W.dtype), (b + c @ W).astype(b.dtype)])
+
+
 class SistemaPercepcion:
-    def __init__(self, ruta_modelo=None):
+    def __init__(self, ruta_modelo=None, motor="keras", tamano_cache=0):
+        """
+        motor: "keras", "numpy" o "int8" (ver cargar_modelo).
+        tamano_cache: cantidad máxima de resultados de predecir guardados en una caché LRU
+        indexada por las respuestas (0 = sin caché).
+        """
         if ruta_modelo is None:
             ruta_modelo = os.path.join(MODELS_DIR, "modelo_personalidad.h5")
+        if motor not in MOTORES:
+            raise ValueError(f"motor debe ser uno de {MOTORES}")
         self.ruta_modelo = os.path.abspath(ruta_modelo)
+        self.ruta_npz = os.path.splitext(self.ruta_modelo)[0] + ".npz"
+        self.ruta_int8 = os.path.splitext(self.ruta_modelo)[0] + ".int8.npz"
+        self.ruta_paquete = os.path.splitext(self.ruta_modelo)[0] + ".paquete"
+        # Scaler, clases y versiones viven junto al modelo
+        self.directorio_modelo = os.path.dirname(self.ruta_modelo)
+        self.motor = motor
         self.modelo = None
-        self.scaler = StandardScaler()
-        self.label_encoder = LabelEncoder()
+        self._scaler = None
+        self._label_encoder = None
+        # Parámetros de preprocesamiento usados en inferencia (arreglos NumPy)
+        self.clases = None
+        self.media = None
+        self.escala = None
+        # Estado que usa la inferencia: (modelo, clases, media, escala), publicado de una sola vez.
+        # Cada predicción toma esta tupla al empezar, así una recarga no mezcla pesos y scaler.
+        self._inferencia = None
+        self.version_cargada = None
+        # Configuración y medidas del último entrenar (ver entrenar)
+        self.rendimiento_entrenamiento = None
+        # Caché LRU de predecir: clave_respuestas -> (tipo, confianza, probabilidades)
+        self.tamano_cache = tamano_cache
+        self._cache = OrderedDict()
+        self._huella_modelo = None
+        self.cache_aciertos = 0
+        self.cache_fallos = 0
+        # Una misma instancia puede compartirse entre hilos (p. ej. sesiones de Streamlit):
+        # _candado protege la carga del modelo, la caché y la pasada de Keras.
+        self._candado = threading.RLock()
+
+    @property
+    def scaler(self):
+        """StandardScaler de scikit-learn, creado (e importado) solo cuando se usa."""
+        if self._scaler is None:
+            from sklearn.preprocessing import StandardScaler
+            self._scaler = StandardScaler()
+            if self.media is not None:
+                self._scaler.mean_, self._scaler.scale_ = self.media, self.escala
+        return self._scaler
+
+    @property
+    def label_encoder(self):
+        """LabelEncoder de scikit-learn, creado (e importado) solo cuando se usa."""
+        if self._label_encoder is None:
+            from sklearn.preprocessing import LabelEncoder
+            self._label_encoder = LabelEncoder()
+            if self.clases is not None:
+                self._label_encoder.classes_ = self.clases
+        return self._label_encoder
 
     def cargar_dataset(self, ruta_csv=None):
+        """
+        Carga el dataset. Si existe una caché binaria válida (convertir_a_cache) devuelve un
+        DatasetCache con vistas memmap en lugar de parsear el CSV.
+        """
         if ruta_csv is None:
             ruta_csv = os.path.join(DATA_DIR, "16P.csv")
+        if DatasetCache.es_valida(ruta_csv):
+            dataset = DatasetCache(ruta_cache(ruta_csv))
+            print(f"Dataset cargado desde caché: {len(dataset)} filas, {len(dataset.preguntas)} preguntas")
+            return dataset
+        import pandas as pd
         df = pd.read_csv(ruta_csv, encoding="latin1")
         print(f"Dataset cargado: {df.shape[0]} filas, {df.shape[1]} columnas")
         return df
 
+    def leer_bloques(self, ruta_csv=None, tamano_bloque=50_000):
+        """
+        Lee el CSV por bloques con tipos compactos (respuestas int8) sin cargarlo entero en memoria.
+        Genera tuplas (ids, X int8 (n, 60), etiquetas). Si hay caché binaria válida, lee de ella.
+        """
+        if ruta_csv is None:
+            ruta_csv = os.path.join(DATA_DIR, "16P.csv")
+        if DatasetCache.es_valida(ruta_csv):
+            dataset = DatasetCache(ruta_cache(ruta_csv))
+            for i in range(0, len(dataset), tamano_bloque):
+                fin = i + tamano_bloque
+                yield np.asarray(dataset.ids[i:fin]), np.asarray(dataset.X[i:fin]), dataset.clases[dataset.y[i:fin]]
+            return
+        yield from self.leer_bloques_csv(ruta_csv, tamano_bloque)
+
+    def leer_bloques_csv(self, ruta_csv, tamano_bloque=50_000):
+        """Como leer_bloques, pero siempre desde el CSV (ignora la caché)."""
+        import pandas as pd
+
+        columnas = pd.read_csv(ruta_csv, encoding="latin1", nrows=0).columns
+        preguntas = [c for c in columnas if c not in (COLUMNA_ID, COLUMNA_ETIQUETA)]
+        dtypes = {c: np.int8 for c in preguntas}
+        dtypes[COLUMNA_ID] = np.int64
+        dtypes[COLUMNA_ETIQUETA] = str
+
+        for bloque in pd.read_csv(ruta_csv, encoding="latin1", dtype=dtypes, chunksize=tamano_bloque):
+            yield (
+                bloque[COLUMNA_ID].to_numpy(),
+                bloque[preguntas].to_numpy(dtype=np.int8),
+                bloque[COLUMNA_ETIQUETA].to_numpy(dtype=str),
+            )
+
+    def convertir_a_cache(self, ruta_csv=None, tamano_bloque=50_000):
+        """
+        Conversión única del CSV a una caché columnar binaria junto al CSV (ruta_cache):
+          respuestas.int8 (filas x 60), etiquetas.uint8, ids.int64 y meta.json
+          (clases, filas, preguntas, tamaño/mtime y sha256 del CSV fuente).
+        cargar_dataset y leer_bloques la usan automáticamente mientras el CSV no cambie.
+        """
+        if ruta_csv is None:
+            ruta_csv = os.path.join(DATA_DIR, "16P.csv")
+        import pandas as pd
+
+        directorio = ruta_cache(ruta_csv)
+        os.makedirs(directorio, exist_ok=True)
+        meta_path = os.path.join(directorio, "meta.json")
+        if os.path.exists(meta_path):
+            os.remove(meta_path)  # la caché queda inválida hasta terminar de escribirla
+
+        preguntas = [c for c in pd.read_csv(ruta_csv, encoding="latin1", nrows=0).columns
+                     if c not in (COLUMNA_ID, COLUMNA_ETIQUETA)]
+        indices_clase = {}
+        filas = 0
+        with open(os.path.join(directorio, "respuestas.int8"), "wb") as f_X, \
+                open(os.path.join(directorio, "etiquetas.uint8"), "wb") as f_y, \
+                open(os.path.join(directorio, "ids.int64"), "wb") as f_ids:
+            for ids, X, y in self.leer_bloques_csv(ruta_csv, tamano_bloque):
+                for clase in np.unique(y).tolist():
+                    indices_clase.setdefault(clase, len(indices_clase))
+                f_X.write(np.ascontiguousarray(X).tobytes())
+                f_y.write(np.array([indices_clase[c] for c in y], dtype=np.uint8).tobytes())
+                f_ids.write(ids.astype(np.int64).tobytes())
+                filas += len(ids)
+
+        # Reordenar las etiquetas al orden alfabético de clases (el mismo que usa LabelEncoder)
+        clases = sorted(indices_clase)
+        nuevo_indice = np.zeros(max(len(clases), 1), dtype=np.uint8)
+        for i, clase in enumerate(clases):
+            nuevo_indice[indices_clase[clase]] = i
+        if filas:
+            y = np.memmap(os.path.join(directorio, "etiquetas.uint8"), dtype=np.uint8, mode="r+", shape=(filas,))
+            for i in range(0, filas, tamano_bloque):
+                y[i:i + tamano_bloque] = nuevo_indice[y[i:i + tamano_bloque]]
+            y.flush()
+            del y
+
+        meta = {
+            "clases": clases,
+            "filas": filas,
+            "preguntas": preguntas,
+            "fuente": {"ruta": os.path.abspath(ruta_csv), **_huella_archivo(ruta_csv), "sha256": sha256_archivo(ruta_csv)},
+        }
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        print(f"Caché escrita en {directorio}: {filas} filas, {len(clases)} clases")
+        return directorio
+
+    def _preprocesar_cache(self, dataset):
+        """preprocesar_datos para un DatasetCache: trabaja sobre las vistas memmap y solo copia al escalar cada partición."""
+        from tensorflow.keras.utils import to_categorical
+
+        self.label_encoder.classes_ = self.clases = dataset.clases
+        for i in range(0, len(dataset), 50_000):
+            self.scaler.partial_fit(dataset.X[i:i + 50_000])
+        self.media, self.escala = self.scaler.mean_, self.scaler.scale_
+
+        os.makedirs(self.directorio_modelo, exist_ok=True)
+        np.save(self._ruta_artefacto("label_mapping.npy"), np.asarray(self.clases, dtype=str))
+        np.save(self._ruta_artefacto("scaler_mean.npy"), self.media)
+        np.save(self._ruta_artefacto("scaler_scale.npy"), self.escala)
+        np.save(self._ruta_artefacto("scaler_n.npy"), np.int64(self.scaler.n_samples_seen_))
+
+        # División por hash del 'Response Id' (asignar_particion), la misma que con el CSV
+        particion = asignar_particion(np.asarray(dataset.ids))
+        idx_train, idx_val, idx_test = (np.flatnonzero(particion == codigo) for codigo in PARTICIONES.values())
+        self._guardar_particion()
+        print(f"Train: {len(idx_train)} | Val: {len(idx_val)} | Test: {len(idx_test)}")
+
+        num_clases = len(self.clases)
+        return tuple(
+            [self._escalar(dataset.X[idx]) for idx in (idx_train, idx_val, idx_test)]
+            + [to_categorical(dataset.y[idx], num_classes=num_clases) for idx in (idx_train, idx_val, idx_test)]
+        )
+
     def preprocesar_datos(self, df):
+        if isinstance(df, DatasetCache):
+            return self._preprocesar_cache(df)
+
+        from tensorflow.keras.utils import to_categorical
 
-        df.drop('Response Id', axis=1, inplace=True)
+        ids = df.pop(COLUMNA_ID).to_numpy()
 
         X = df.drop(columns=["Personalidad"])
         y = df["Personalidad"]
 
         # Codificar etiquetas
         y_encoded = self.label_encoder.fit_transform(y)
+        self.clases = self.label_encoder.classes_
 
         # Crear carpeta de modelos si no existe
-        os.makedirs(MODELS_DIR, exist_ok=True)
+        os.makedirs(self.directorio_modelo, exist_ok=True)
 
         # Guardar el mapeo de etiquetas solo si ya existe el atributo
         if hasattr(self.label_encoder, "classes_"):
-            np.save(os.path.join(MODELS_DIR, "label_mapping.npy"), self.label_encoder.classes_)
+            np.save(self._ruta_artefacto("label_mapping.npy"), np.asarray(self.label_encoder.classes_, dtype=str))
         else:
             print("Advertencia: El LabelEncoder aún no tiene clases definidas.")
 
         # Escalar características
         X_scaled = self.scaler.fit_transform(X)
-        np.save(os.path.join(MODELS_DIR, "scaler_mean.npy"), self.scaler.mean_)
-        np.save(os.path.join(MODELS_DIR, "scaler_scale.npy"), self.scaler.scale_)
+        self.media, self.escala = self.scaler.mean_, self.scaler.scale_
+        np.save(self._ruta_artefacto("scaler_mean.npy"), self.scaler.mean_)
+        np.save(self._ruta_artefacto("scaler_scale.npy"), self.scaler.scale_)
+        np.save(self._ruta_artefacto("scaler_n.npy"), np.int64(self.scaler.n_samples_seen_))
 
-        # División estratificada
-        X_train, X_temp, y_train, y_temp = train_test_split(
-            X_scaled, y_encoded, test_size=0.3, random_state=42, stratify=y_encoded
-        )
-        X_val, X_test, y_val, y_test = train_test_split(
-            X_temp, y_temp, test_size=0.5, random_state=42, stratify=y_temp
-        )
+        # División por hash del 'Response Id' (asignar_particion): la misma de entrenar_streaming,
+        # actualizar_incremental y evaluacion.py, así su partición test nunca se usó para entrenar
+        particion = asignar_particion(ids)
+        X_train, X_val, X_test = (X_scaled[particion == codigo] for codigo in PARTICIONES.values())
+        y_train, y_val, y_test = (y_encoded[particion == codigo] for codigo in PARTICIONES.values())
+        self._guardar_particion()
 
         print(f"Train: {X_train.shape[0]} | Val: {X_val.shape[0]} | Test: {X_test.shape[0]}")
 
         # One-hot encoding
-        y_train_cat = to_categorical(y_train)
-        y_val_cat = to_categorical(y_val)
-        y_test_cat = to_categorical(y_test)
+        num_clases = len(self.clases)
+        y_train_cat = to_categorical(y_train, num_classes=num_clases)
+        y_val_cat = to_categorical(y_val, num_classes=num_clases)
+        y_test_cat = to_categorical(y_test, num_classes=num_clases)
 
         return X_train, X_val, X_test, y_train_cat, y_val_cat, y_test_cat
 
-    def construir_modelo(self, input_dim, num_classes):
-        modelo = Sequential([
-            Dense(128, activation="relu", input_shape=(input_dim,)),
-            BatchNormalization(),
-            Dropout(0.3),
-            Dense(64, activation="relu"),
-            BatchNormalization(),
-            Dropout(0.3),
-            Dense(num_classes, activation="softmax")
-        ])
-        modelo.compile(optimizer="adam", loss="categorical_crossentropy", metrics=["accuracy"])
+    def construir_modelo(self, input_dim, num_classes, perdida="categorical_crossentropy",
+                         capas=(128, 64), dropout=0.3, optimizador="adam", tasa_aprendizaje=None):
+        """
+        Red densa: por cada ancho en 'capas', Dense(relu) -> BatchNormalization -> Dropout; salida softmax.
+        optimizador: nombre de un optimizador de Keras; tasa_aprendizaje=None usa la de Keras por defecto.
+        Los valores por defecto son la arquitectura original (128/64, dropout 0.3, adam).
+        """
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import Dense, Dropout, BatchNormalization, Input
+        from tensorflow.keras import optimizers
+
+        modelo = Sequential([Input(shape=(input_dim,))])
+        for ancho in capas:
+            modelo.add(Dense(ancho, activation="relu"))
+            modelo.add(BatchNormalization())
+            modelo.add(Dropout(dropout))
+        modelo.add(Dense(num_classes, activation="softmax"))
+
+        if tasa_aprendizaje is not None:
+            optimizador = optimizers.get({"class_name": optimizador, "config": {"learning_rate": tasa_aprendizaje}})
+        modelo.compile(optimizer=optimizador, loss=perdida, metrics=["accuracy"])
         return modelo
 
-    def entrenar(self, ruta_csv="../data/16P.csv"):
-        """Pipeline completo de entrenamiento"""
+    def entrenar(self, ruta_csv="../data/16P.csv", batch_size=BATCH_BASE, epochs=100, escalado_tasa=None,
+                 replicas=1, hilos_intra=None, hilos_inter=None):
+        """
+        Pipeline completo de entrenamiento.
+        Divide train/val/test con asignar_particion (hash del 'Response Id') y lo deja anotado en particion.json.
+        Los datos se sirven con tf.data (dataset_memoria) en lugar de pasar los arreglos a fit.
+        batch_size / escalado_tasa: lotes más grandes aprovechan más núcleos; con escalado_tasa
+        ("lineal" o "raiz") la tasa de aprendizaje se ajusta al tamaño de lote (tasa_escalada).
+        replicas: con más de 1 entrena en paralelo de datos con MirroredStrategy sobre esa cantidad
+        de CPUs lógicas; cada paso reparte el lote entre las réplicas.
+        hilos_intra / hilos_inter: ver configurar_hilos (tiene efecto si TensorFlow no arrancó todavía).
+        Deja en self.rendimiento_entrenamiento la configuración, el tiempo por época, las muestras/s
+        y la exactitud de test, y lo guarda en los metadatos del paquete.
+        """
+        configuracion = configurar_hilos(hilos_intra, hilos_inter, replicas)
+        import tensorflow as tf
+        from tensorflow.keras.callbacks import EarlyStopping
+        from sklearn.metrics import classification_report
+
         df = self.cargar_dataset(ruta_csv)
         X_train, X_val, X_test, y_train, y_val, y_test = self.preprocesar_datos(df)
 
-        self.modelo = self.construir_modelo(X_train.shape[1], y_train.shape[1])
+        if replicas > 1:
+            dispositivos = [d.name for d in tf.config.list_logical_devices("CPU")][:replicas]
+            estrategia = tf.distribute.MirroredStrategy(dispositivos)
+        else:
+            estrategia = tf.distribute.get_strategy()
+        tasa = tasa_escalada(batch_size, escalado_tasa)
+        with estrategia.scope():
+            self.modelo = self.construir_modelo(X_train.shape[1], y_train.shape[1], tasa_aprendizaje=tasa)
 
         early_stop = EarlyStopping(monitor="val_loss", patience=10, restore_best_weights=True)
+        medidor = crear_medidor_epocas(len(X_train))
 
         history = self.modelo.fit(
-            X_train, y_train,
-            validation_data=(X_val, y_val),
-            epochs=100,
-            batch_size=64,
-            callbacks=[early_stop],
+            dataset_memoria(X_train, y_train, batch_size, semilla=42),
+            validation_data=dataset_memoria(X_val, y_val, 4096),
+            epochs=epochs,
+            callbacks=[early_stop, medidor],
             verbose=1
         )
 
         # Evaluación final
-        test_loss, test_acc = self.modelo.evaluate(X_test, y_test)
+        test_loss, test_acc = self.modelo.evaluate(dataset_memoria(X_test, y_test, 4096))
         print(f"\nEvaluación: Accuracy = {test_acc:.3f}")
+        self.rendimiento_entrenamiento = {
+            **configuracion, "batch_size": batch_size, "tasa_aprendizaje": tasa,
+            **medidor.resumen(), "exactitud_test": round(float(test_acc), 4),
+        }
+        print(f"Rendimiento: {json.dumps(self.rendimiento_entrenamiento, ensure_ascii=False)}")
 
         # Reporte detallado
-        y_pred = np.argmax(self.modelo.predict(X_test), axis=1)
+        probabilidades = self.modelo.predict(X_test)
+        y_pred = np.argmax(probabilidades, axis=1)
         y_true = np.argmax(y_test, axis=1)
         print("\nReporte de clasificación:")
-        print(classification_report(y_true, y_pred, target_names=self.label_encoder.classes_))
+        print(classification_report(y_true, y_pred, target_names=self.clases))
+        matriz = MatrizConfusion(self.clases).actualizar(y_true, y_pred, probabilidades[np.arange(len(y_true)), y_true])
+        self._guardar_evaluacion(matriz)
 
         # Guardar modelo
         self.modelo.save(self.ruta_modelo)
         print(f"Modelo guardado en {self.ruta_modelo}")
+        self.exportar_numpy()
+        self.exportar_paquete(metadatos={"entrenamiento": self.rendimiento_entrenamiento})
+
+        return history
+
+    def _guardar_evaluacion(self, matriz):
+        """
+        Guarda junto al modelo las métricas y la matriz de confusión de test en el formato de
+        evaluacion.py: es la partición test por hash, la misma de evaluacion.py --particion test.
+        """
+        resultado = {"particion": "test", "test_reservado": True}
+        resultado.update(matriz.metricas())
+        resultado["matriz_confusion"] = {"clases": matriz.clases.tolist(), "valores": matriz.valores.tolist()}
+        ruta = self._ruta_artefacto("evaluacion_test.json")
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"Matriz de confusión de test guardada en {ruta}")
+
+    def _guardar_particion(self, directorio=None):
+        """Deja constancia junto al modelo de que se entrena con la partición por hash del id (asignar_particion)."""
+        with open(os.path.join(directorio or self.directorio_modelo, ARCHIVO_PARTICION), "w", encoding="utf-8") as f:
+            json.dump({"metodo": "hash", "columna_id": COLUMNA_ID,
+                       "proporciones": {"train": 0.70, "val": 0.15, "test": 0.15}}, f, indent=2)
+
+    def particion_por_hash(self):
+        """
+        True si el modelo se entrenó con la partición por hash del 'Response Id' (hay particion.json junto
+        a él), así que las filas val y test de asignar_particion no estuvieron en su entrenamiento.
+        Los modelos entrenados con la división aleatoria anterior (como el de models/ original) dan False.
+        """
+        ruta = self._ruta_artefacto(ARCHIVO_PARTICION)
+        if not os.path.exists(ruta):
+            return False
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f).get("metodo") == "hash"
+
+    def verificar_particion(self, uso):
+        """Avisa con warnings.warn si las particiones val/test por hash pueden incluir filas de entrenamiento de este modelo."""
+        if self.particion_por_hash():
+            return True
+        warnings.warn(
+            f"{uso}: el modelo de {self.directorio_modelo} no tiene {ARCHIVO_PARTICION}, así que no se entrenó con "
+            "la partición por hash del 'Response Id'; sus filas val/test pueden haber estado en el entrenamiento "
+            "y las métricas salen optimistas. Reentrénalo con entrenar o entrenar_streaming.",
+            stacklevel=2,
+        )
+        return False
+
+    def _ajustar_estadisticas_streaming(self, ruta_csv, tamano_bloque):
+        """Primera pasada: ajusta el scaler con partial_fit y reúne las clases y el tamaño de cada partición."""
+        clases = set()
+        filas = np.zeros(len(PARTICIONES), dtype=np.int64)
+        for ids, X, y in self.leer_bloques(ruta_csv, tamano_bloque):
+            self.scaler.partial_fit(X)
+            clases.update(np.unique(y).tolist())
+            filas += np.bincount(asignar_particion(ids), minlength=len(PARTICIONES))
+
+        self.label_encoder.classes_ = self.clases = np.array(sorted(clases))
+        self.media, self.escala = self.scaler.mean_, self.scaler.scale_
+
+        os.makedirs(self.directorio_modelo, exist_ok=True)
+        np.save(self._ruta_artefacto("label_mapping.npy"), np.asarray(self.clases, dtype=str))
+        np.save(self._ruta_artefacto("scaler_mean.npy"), self.media)
+        np.save(self._ruta_artefacto("scaler_scale.npy"), self.escala)
+        np.save(self._ruta_artefacto("scaler_n.npy"), np.int64(self.scaler.n_samples_seen_))
+        self._guardar_particion()
+        return dict(zip(PARTICIONES, filas.tolist()))
+
+    def _lotes_particion(self, ruta_csv, particion, tamano_bloque, batch_size, semilla=None):
+        """
+        Genera (X escalado float32, y entero) en lotes de batch_size para una partición.
+        Con 'semilla' baraja las filas dentro de cada bloque (entrenamiento).
+        """
+        rng = np.random.default_rng(semilla) if semilla is not None else None
+        codigo = PARTICIONES[particion]
+        for ids, X, y in self.leer_bloques(ruta_csv, tamano_bloque):
+            filas = np.flatnonzero(asignar_particion(ids) == codigo)
+            if rng is not None:
+                rng.shuffle(filas)
+            X_scaled = self._escalar(X[filas])
+            y_int = np.searchsorted(self.clases, y[filas]).astype(np.int32)
+            for i in range(0, len(filas), batch_size):
+                yield X_scaled[i:i + batch_size], y_int[i:i + batch_size]
+
+    def _dataset_particion(self, ruta_csv, particion, tamano_bloque, batch_size, semilla=None):
+        import tensorflow as tf
+
+        num_preguntas = len(self.media)
+        return tf.data.Dataset.from_generator(
+            lambda: self._lotes_particion(ruta_csv, particion, tamano_bloque, batch_size, semilla),
+            output_signature=(
+                tf.TensorSpec(shape=(None, num_preguntas), dtype=tf.float32),
+                tf.TensorSpec(shape=(None,), dtype=tf.int32),
+            ),
+        ).prefetch(tf.data.AUTOTUNE)
+
+    def entrenar_streaming(self, ruta_csv=None, tamano_bloque=50_000, batch_size=64, epochs=100):
+        """
+        Entrenamiento con memoria acotada para CSV de cualquier tamaño.
+        - Lee por bloques con respuestas int8 (leer_bloques); nunca carga el archivo completo.
+        - Ajusta el StandardScaler incrementalmente con partial_fit.
+        - Divide train/val/test por hash del 'Response Id' (determinista, sin barajar en memoria).
+        - Alimenta Keras desde un tf.data generado por bloques, con etiquetas enteras y pérdida sparse
+          (sin matrices one-hot).
+        Cada época vuelve a leer el CSV, así el pico de memoria depende de tamano_bloque y no del dataset.
+        """
+        from tensorflow.keras.callbacks import EarlyStopping
+        from sklearn.metrics import classification_report
+
+        filas = self._ajustar_estadisticas_streaming(ruta_csv, tamano_bloque)
+        print(f"Train: {filas['train']} | Val: {filas['val']} | Test: {filas['test']}")
+
+        train = self._dataset_particion(ruta_csv, "train", tamano_bloque, batch_size, semilla=42)
+        val = self._dataset_particion(ruta_csv, "val", tamano_bloque, batch_size)
+
+        self.modelo = self.construir_modelo(len(self.media), len(self.clases), perdida="sparse_categorical_crossentropy")
+        early_stop = EarlyStopping(monitor="val_loss", patience=10, restore_best_weights=True)
+        medidor = crear_medidor_epocas(filas["train"])
+        history = self.modelo.fit(train, validation_data=val, epochs=epochs, callbacks=[early_stop, medidor], verbose=1)
+        print(f"Rendimiento: {json.dumps(medidor.resumen(), ensure_ascii=False)}")
+
+        # Evaluación final por bloques (solo se guardan las etiquetas, uint8)
+        matriz = MatrizConfusion(self.clases)
+        y_true, y_pred = [], []
+        for X, y in self._lotes_particion(ruta_csv, "test", tamano_bloque, tamano_bloque):
+            probabilidades = self.modelo.predict(X, batch_size=1024, verbose=0)
+            y_true.append(y.astype(np.uint8))
+            y_pred.append(np.argmax(probabilidades, axis=1).astype(np.uint8))
+            matriz.actualizar(y, y_pred[-1], probabilidades[np.arange(len(y)), y])
+        y_true, y_pred = np.concatenate(y_true), np.concatenate(y_pred)
+        print(f"\nEvaluación: Accuracy = {np.mean(y_true == y_pred):.3f}")
+        print("\nReporte de clasificación:")
+        print(classification_report(y_true, y_pred, labels=np.arange(len(self.clases)), target_names=self.clases))
+        self._guardar_evaluacion(matriz)
+
+        self.modelo.save(self.ruta_modelo)
+        print(f"Modelo guardado en {self.ruta_modelo}")
+        self.exportar_numpy()
+        self.exportar_paquete()
 
         return history
 
-    def cargar_modelo(self):
-        if os.path.exists(self.ruta_modelo):
+    def _filas_scaler(self, ruta_historico, tamano_bloque):
+        """Cantidad de filas sobre las que se ajustó el scaler (scaler_n.npy o, si falta, las filas del histórico)."""
+        ruta_n = self._ruta_artefacto("scaler_n.npy")
+        if os.path.exists(ruta_n):
+            return int(np.load(ruta_n))
+        return sum(len(ids) for ids, _, _ in self.leer_bloques(ruta_historico, tamano_bloque))
+
+    def _muestra_replay(self, ruta_historico, cantidad, tamano_bloque, semilla=0):
+        """Muestra aleatoria (sin reemplazo, aprox. 'cantidad' filas) de la partición train del histórico, en dos pasadas por bloques."""
+        codigo = PARTICIONES["train"]
+        total = sum(int(np.sum(asignar_particion(ids) == codigo)) for ids, _, _ in self.leer_bloques(ruta_historico, tamano_bloque))
+        probabilidad = min(1.0, cantidad / total) if total else 0.0
+        rng = np.random.default_rng(semilla)
+        bloques_X, bloques_y = [], []
+        for ids, X, y in self.leer_bloques(ruta_historico, tamano_bloque):
+            mascara = (asignar_particion(ids) == codigo) & (rng.random(len(ids)) < probabilidad)
+            bloques_X.append(X[mascara])
+            bloques_y.append(y[mascara])
+        return np.concatenate(bloques_X), np.concatenate(bloques_y)
+
+    def _exactitud(self, modelo, X, etiquetas, media, escala):
+        if len(X) == 0:
+            return None
+        X_scaled = ((X - media) / escala).astype(np.float32)
+        prob = np.concatenate([
+            np.asarray(modelo.predict_on_batch(X_scaled[i:i + 4096])) for i in range(0, len(X_scaled), 4096)
+        ])
+        return float(np.mean(self.clases[np.argmax(prob, axis=1)] == etiquetas))
+
+    def actualizar_incremental(self, ruta_nuevos, ruta_historico=None, epochs=5, proporcion_replay=1.0,
+                               tasa_aprendizaje=1e-4, batch_size=64, tamano_bloque=50_000, promover=False, semilla=0):
+        """
+        Actualiza el modelo de models/ con respuestas nuevas sin reentrenar desde cero:
+        1. Actualiza la media y escala del scaler con las filas nuevas (combinar_estadisticas) y
+           compensa la primera capa para que el modelo no cambie por el nuevo escalado.
+        2. Ajusta unas pocas épocas con la partición train de los datos nuevos mezclada con una muestra
+           de repaso (replay) del histórico de tamaño proporcion_replay * filas nuevas, con tasa de aprendizaje baja.
+        3. Mide la exactitud antes y después sobre la partición test (por hash del id) del histórico y de los nuevos.
+           Solo es test reservado si el modelo se entrenó con esa partición (particion_por_hash); si no, se avisa.
+        4. Guarda todo como una versión nueva en models/versiones/vNNN; con promover=True además la copia a models/.
+        Las clases no cambian: si los datos nuevos traen etiquetas desconocidas se lanza ValueError.
+        Devuelve los metadatos de la versión.
+        """
+        from tensorflow.keras.callbacks import EarlyStopping
+        from tensorflow.keras.models import load_model
+        from tensorflow.keras.optimizers import Adam
+
+        if ruta_historico is None:
+            ruta_historico = os.path.join(DATA_DIR, "16P.csv")
+        particion_por_hash = self.verificar_particion("actualizar_incremental")
+        self.media = None
+        self._cargar_preprocesamiento()
+        media_anterior, escala_anterior = self.media, self.escala
+        n_anterior = self._filas_scaler(ruta_historico, tamano_bloque)
+
+        # 1. Datos nuevos: estadísticas del scaler y partición por hash
+        media, escala, n = media_anterior, escala_anterior, n_anterior
+        partes = {nombre: ([], []) for nombre in PARTICIONES}
+        for ids, X, y in self.leer_bloques(ruta_nuevos, tamano_bloque):
+            desconocidas = set(np.unique(y).tolist()) - set(self.clases.tolist())
+            if desconocidas:
+                raise ValueError(f"Los datos nuevos tienen etiquetas que el modelo no conoce: {sorted(desconocidas)}")
+            media, escala, n = combinar_estadisticas(media, escala, n, X)
+            particion = asignar_particion(ids)
+            for nombre, codigo in PARTICIONES.items():
+                partes[nombre][0].append(X[particion == codigo])
+                partes[nombre][1].append(y[particion == codigo])
+        nuevos = {nombre: (np.concatenate(Xs), np.concatenate(ys)) for nombre, (Xs, ys) in partes.items()}
+        if len(nuevos["train"][0]) == 0:
+            raise ValueError(f"No hay filas nuevas para entrenar en {ruta_nuevos}")
+
+        X_replay, y_replay = self._muestra_replay(
+            ruta_historico, int(proporcion_replay * len(nuevos["train"][0])), tamano_bloque, semilla)
+        X_test_hist, y_test_hist = self.muestras_particion(ruta_historico, "test", None, tamano_bloque)
+
+        # 2. Exactitud del modelo actual y compensación del nuevo escalado
+        modelo = load_model(self.ruta_modelo)
+        antes = {
+            "test_historico": self._exactitud(modelo, X_test_hist, y_test_hist, media_anterior, escala_anterior),
+            "test_nuevos": self._exactitud(modelo, *nuevos["test"], media_anterior, escala_anterior),
+        }
+        muestra = X_test_hist[:512].astype(np.float32)
+        prob_anterior = np.asarray(modelo.predict_on_batch(((muestra - media_anterior) / escala_anterior).astype(np.float32)))
+        reescalar_primera_capa(modelo, media_anterior, escala_anterior, media, escala)
+        prob_reescalado = np.asarray(modelo.predict_on_batch(((muestra - media) / escala).astype(np.float32)))
+
+        # 3. Ajuste fino sobre nuevos + repaso
+        rng = np.random.default_rng(semilla)
+        X_ajuste = np.concatenate([nuevos["train"][0], X_replay])
+        y_ajuste = np.searchsorted(self.clases, np.concatenate([nuevos["train"][1], y_replay]))
+        orden = rng.permutation(len(X_ajuste))
+        X_ajuste = ((X_ajuste[orden] - media) / escala).astype(np.float32)
+        y_ajuste = y_ajuste[orden].astype(np.int32)
+
+        validacion = None
+        if len(nuevos["val"][0]):
+            validacion = (((nuevos["val"][0] - media) / escala).astype(np.float32),
+                          np.searchsorted(self.clases, nuevos["val"][1]).astype(np.int32))
+        # BatchNormalization congelada (modo inferencia): con pocos datos nuevos sus medias móviles
+        # se desplazarían hacia ese lote y el modelo olvidaría lo aprendido
+        for capa in modelo.layers:
+            if type(capa).__name__ == "BatchNormalization":
+                capa.trainable = False
+        modelo.compile(optimizer=Adam(learning_rate=tasa_aprendizaje),
+                       loss="sparse_categorical_crossentropy", metrics=["accuracy"])
+        modelo.fit(
+            X_ajuste, y_ajuste, validation_data=validacion, epochs=epochs, batch_size=batch_size, verbose=1,
+            callbacks=[EarlyStopping(monitor="val_loss", patience=2, restore_best_weights=True)] if validacion else [],
+        )
+        for capa in modelo.layers:
+            capa.trainable = True
+
+        despues = {
+            "test_historico": self._exactitud(modelo, X_test_hist, y_test_hist, media, escala),
+            "test_nuevos": self._exactitud(modelo, *nuevos["test"], media, escala),
+        }
+        print(f"\nExactitud test histórico: {antes['test_historico']:.4f} -> {despues['test_historico']:.4f}")
+        if despues["test_nuevos"] is not None:
+            print(f"Exactitud test nuevos:    {antes['test_nuevos']:.4f} -> {despues['test_nuevos']:.4f}")
+
+        # 4. Versión nueva
+        metadatos = {
+            "version_base": self.version_actual(),
+            "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "ruta_nuevos": os.path.abspath(ruta_nuevos),
+            "filas_nuevas": {nombre: len(X) for nombre, (X, _) in nuevos.items()},
+            "filas_replay": len(X_replay),
+            "filas_scaler": {"antes": n_anterior, "despues": n},
+            "epochs": epochs,
+            "tasa_aprendizaje": tasa_aprendizaje,
+            "diferencia_reescalado": float(np.max(np.abs(prob_anterior - prob_reescalado))),
+            "exactitud_antes": antes,
+            "exactitud_despues": despues,
+            "particion_por_hash": particion_por_hash,
+        }
+        # El ajuste fino usa la partición train por hash: la versión la hereda si el modelo base también
+        directorio = self.guardar_version(modelo, media, escala, n, metadatos, particion_por_hash)
+        if promover:
+            self.promover_version(directorio)
+        return metadatos
+
+    def version_actual(self):
+        """Nombre de la versión promovida en models/ ('base' si nunca se promovió una)."""
+        ruta = self._ruta_artefacto("version.json")
+        if not os.path.exists(ruta):
+            return "base"
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)["version"]
+
+    def guardar_version(self, modelo, media, escala, n, metadatos, particion_por_hash=False):
+        """
+        Guarda modelo, .npz, scaler, clases (self.clases), metadatos y paquete como versión nueva en
+        models/versiones/vNNN sin tocar el modelo servido. Devuelve el directorio (ver promover_version).
+        particion_por_hash: el modelo se entrenó con asignar_particion (se guarda particion.json).
+        """
+        os.makedirs(self._ruta_artefacto("versiones"), exist_ok=True)
+        numeros = [int(d[1:]) for d in os.listdir(self._ruta_artefacto("versiones")) if d.startswith("v") and d[1:].isdigit()]
+        version = f"v{max(numeros, default=0) + 1:03d}"
+        directorio = os.path.join(self._ruta_artefacto("versiones"), version)
+        os.makedirs(directorio)
+
+        nombre_modelo = os.path.basename(self.ruta_modelo)
+        modelo.save(os.path.join(directorio, nombre_modelo))
+        exportar_npz(modelo, os.path.join(directorio, os.path.splitext(nombre_modelo)[0] + ".npz"))
+        np.save(os.path.join(directorio, "label_mapping.npy"), np.asarray(self.clases, dtype=str))
+        np.save(os.path.join(directorio, "scaler_mean.npy"), media)
+        np.save(os.path.join(directorio, "scaler_scale.npy"), escala)
+        np.save(os.path.join(directorio, "scaler_n.npy"), np.int64(n))
+        if particion_por_hash:
+            self._guardar_particion(directorio)
+        metadatos["version"] = version
+        with open(os.path.join(directorio, "metadata.json"), "w", encoding="utf-8") as f:
+            json.dump(metadatos, f, indent=2, ensure_ascii=False)
+        escribir_paquete(os.path.join(directorio, os.path.basename(self.ruta_paquete)), plegar_capas(modelo),
+                         media, escala, self.clases, {**metadatos, "filas_scaler": int(n)}, version)
+        print(f"Versión {version} guardada en {directorio}")
+        return directorio
+
+    def promover_version(self, directorio):
+        """Copia una versión de models/versiones a las rutas que usa cargar_modelo."""
+        import shutil
+
+        nombre_modelo = os.path.basename(self.ruta_modelo)
+        copias = [(nombre_modelo, self.ruta_modelo),
+                  (os.path.splitext(nombre_modelo)[0] + ".npz", self.ruta_npz)]
+        copias += [(nombre, self._ruta_artefacto(nombre)) for nombre in ARCHIVOS_PREPROCESAMIENTO]
+        for nombre, destino in copias:
+            # Copia a un temporal y reemplazo atómico: un lector nunca ve un archivo a medio escribir
+            shutil.copyfile(os.path.join(directorio, nombre), destino + ".tmp")
+            os.replace(destino + ".tmp", destino)
+        # La constancia de partición viaja con la versión; si la versión no la tiene, no puede quedar la anterior
+        if os.path.exists(os.path.join(directorio, ARCHIVO_PARTICION)):
+            shutil.copyfile(os.path.join(directorio, ARCHIVO_PARTICION), self._ruta_artefacto(ARCHIVO_PARTICION))
+        elif os.path.exists(self._ruta_artefacto(ARCHIVO_PARTICION)):
+            os.remove(self._ruta_artefacto(ARCHIVO_PARTICION))
+        version = os.path.basename(os.path.normpath(directorio))
+
+        # El paquete va último: es el archivo que vigilan los procesos con recarga en caliente
+        nombre_paquete = os.path.basename(self.ruta_paquete)
+        if os.path.exists(os.path.join(directorio, nombre_paquete)):
+            shutil.copyfile(os.path.join(directorio, nombre_paquete), self.ruta_paquete + ".tmp")
+            os.replace(self.ruta_paquete + ".tmp", self.ruta_paquete)
+        else:
+            # Versiones guardadas antes del formato de paquete: se arma con los archivos recién copiados
+            escribir_paquete(self.ruta_paquete, MotorNumPy(self.ruta_npz).capas,
+                             np.load(self._ruta_artefacto("scaler_mean.npy")),
+                             np.load(self._ruta_artefacto("scaler_scale.npy")),
+                             cargar_clases(self._ruta_artefacto("label_mapping.npy")), version=version)
+        with open(self._ruta_artefacto("version.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": version}, f)
+        print(f"Versión {version} promovida a {self.directorio_modelo}")
+
+    def exportar_paquete(self, ruta_paquete=None, metadatos=None, version=None):
+        """
+        Escribe el paquete versionado (pesos plegados, scaler, clases, metadatos y checksum) del modelo actual.
+        Usa el modelo Keras en memoria si lo hay; si no, el .npz exportado.
+        """
+        if self.modelo is not None and not isinstance(self.modelo, MotorNumPy):
+            capas = plegar_capas(self.modelo)
+        else:
+            if not os.path.exists(self.ruta_npz):
+                self.exportar_numpy()
+            capas = MotorNumPy(self.ruta_npz).capas
+        if self.media is None:
+            self._cargar_preprocesamiento()
+        ruta_n = self._ruta_artefacto("scaler_n.npy")
+        metadatos = dict(metadatos or {})
+        if os.path.exists(ruta_n):
+            metadatos.setdefault("filas_scaler", int(np.load(ruta_n)))
+        return escribir_paquete(ruta_paquete or self.ruta_paquete, capas, self.media, self.escala,
+                                self.clases, metadatos, version)
+
+    def exportar_numpy(self, ruta_npz=None):
+        """Exporta el modelo Keras a .npz (BatchNormalization plegada) para el motor NumPy."""
+        if self.modelo is None or isinstance(self.modelo, MotorNumPy):
+            from tensorflow.keras.models import load_model
             self.modelo = load_model(self.ruta_modelo)
-            self.label_encoder.classes_ = np.load(os.path.join(MODELS_DIR, "label_mapping.npy"), allow_pickle=True)
-            self.scaler.mean_ = np.load(os.path.join(MODELS_DIR, "scaler_mean.npy"))
-            self.scaler.scale_ = np.load(os.path.join(MODELS_DIR, "scaler_scale.npy"))
-            print("Modelo cargado correctamente")
+        return exportar_npz(self.modelo, ruta_npz or self.ruta_npz)
+
+    def muestras_particion(self, ruta_csv, particion, max_filas, tamano_bloque=50_000):
+        """Primeras max_filas filas de una partición (por hash del id), leídas por bloques. Devuelve (X int8, etiquetas)."""
+        bloques_X, bloques_y, total = [], [], 0
+        for ids, X, etiquetas in self.leer_bloques(ruta_csv, tamano_bloque):
+            mascara = asignar_particion(ids) == PARTICIONES[particion]
+            bloques_X.append(X[mascara])
+            bloques_y.append(etiquetas[mascara])
+            total += int(mascara.sum())
+            if max_filas is not None and total >= max_filas:
+                break
+        if total == 0:
+            raise ValueError(f"No hay filas de la partición '{particion}' en {ruta_csv}")
+        return np.concatenate(bloques_X)[:max_filas], np.concatenate(bloques_y)[:max_filas]
+
+    def exportar_int8(self, ruta_csv=None, muestras_calibracion=2048, ruta_int8=None):
+        """
+        Cuantiza el modelo NumPy (.npz) a int8 con escalas por capa calibradas sobre
+        'muestras_calibracion' filas de la partición de entrenamiento (por hash del id, la misma
+        que usó entrenar; ver particion_por_hash). No necesita TensorFlow.
+        """
+        if not os.path.exists(self.ruta_npz):
+            self.exportar_numpy()
+        self._cargar_preprocesamiento()
+        self.verificar_particion("exportar_int8")
+        X, _ = self.muestras_particion(ruta_csv, "train", muestras_calibracion)
+        return exportar_int8(MotorNumPy(self.ruta_npz).capas, self._escalar(X), ruta_int8 or self.ruta_int8)
+
+    def evaluar_cuantizacion(self, ruta_csv=None, max_filas=None):
+        """
+        Compara el modelo float (NumPy) con el int8 sobre la partición de test (la que entrenar reservó):
+        imprime el classification_report de cada uno (el mismo que entrenar) y devuelve
+        la deriva por clase de precisión, recall y F1 (int8 - float), la coincidencia de argmax
+        y la diferencia máxima de probabilidades. test_reservado indica si el modelo se entrenó
+        con esa partición (si no, se avisa y las exactitudes salen optimistas).
+        """
+        from sklearn.metrics import classification_report
+
+        self._cargar_preprocesamiento()
+        test_reservado = self.verificar_particion("evaluar_cuantizacion")
+        X, etiquetas = self.muestras_particion(ruta_csv, "test", max_filas)
+        X_scaled = self._escalar(X)
+        prob_float = MotorNumPy(self.ruta_npz).predict(X_scaled, batch_size=4096)
+        prob_int8 = MotorInt8(self.ruta_int8).predict(X_scaled, batch_size=4096)
+        pred_float = self.clases[np.argmax(prob_float, axis=1)]
+        pred_int8 = self.clases[np.argmax(prob_int8, axis=1)]
+
+        clases = [str(c) for c in self.clases]
+        reportes = {}
+        for nombre, pred in (("float", pred_float), ("int8", pred_int8)):
+            print(f"\nReporte de clasificación ({nombre}):")
+            print(classification_report(etiquetas, pred, labels=clases, target_names=clases, zero_division=0))
+            reportes[nombre] = classification_report(etiquetas, pred, labels=clases, target_names=clases,
+                                                     zero_division=0, output_dict=True)
+
+        deriva = {
+            clase: {metrica: reportes["int8"][clase][metrica] - reportes["float"][clase][metrica]
+                    for metrica in ("precision", "recall", "f1-score")}
+            for clase in clases
+        }
+        return {
+            "filas": len(X),
+            "test_reservado": test_reservado,
+            "accuracy_float": float(np.mean(pred_float == etiquetas)),
+            "accuracy_int8": float(np.mean(pred_int8 == etiquetas)),
+            "coincidencia_argmax": float(np.mean(pred_float == pred_int8)),
+            "diferencia_max_probabilidad": float(np.max(np.abs(prob_float - prob_int8))),
+            "deriva_por_clase": deriva,
+            "peor_deriva_f1": min(deriva.items(), key=lambda item: item[1]["f1-score"]),
+        }
+
+    def cargar_modelo(self, motor=None):
+        """
+        Carga el modelo y los parámetros de preprocesamiento.
+        motor: "keras" (modelo .h5 con TensorFlow), "numpy" (pesos sin TensorFlow)
+        o "int8" (pesos cuantizados .int8.npz, ver exportar_int8).
+        Con "numpy", si existe el paquete (.paquete) se lee de ahí con mmap: pesos, scaler y clases
+        salen del mismo archivo verificado. Si no, se usan el .npz y los .npy de preprocesamiento.
+        Si no se indica, usa el motor elegido al construir el sistema.
+        Se puede volver a llamar con el sistema en uso: el estado nuevo se publica de una vez.
+        """
+        if motor is not None:
+            if motor not in MOTORES:
+                raise ValueError(f"motor debe ser uno de {MOTORES}")
+            self.motor = motor
+        ruta = self.ruta_fuente()
+        if not os.path.exists(ruta):
+            raise FileNotFoundError(f"No se encontró el modelo en {ruta}")
+
+        version = None
+        if ruta == self.ruta_paquete:
+            paquete = leer_paquete(ruta)
+            modelo = MotorNumPy.desde_capas(paquete.capas, ruta)
+            clases, media, escala, version = paquete.clases, paquete.media, paquete.escala, paquete.version
         else:
-            raise FileNotFoundError(f"No se encontró el modelo en {self.ruta_modelo}")
+            if self.motor == "numpy":
+                modelo = MotorNumPy(ruta)
+            elif self.motor == "int8":
+                modelo = MotorInt8(ruta)
+            else:
+                from tensorflow.keras.models import load_model
+                modelo = load_model(ruta)
+            clases = cargar_clases(self._ruta_artefacto("label_mapping.npy"))
+            media = np.load(self._ruta_artefacto("scaler_mean.npy"))
+            escala = np.load(self._ruta_artefacto("scaler_scale.npy"))
 
-    def predecir(self, respuestas):
-        if self.modelo is None:
+        with self._candado:
+            self.clases, self.media, self.escala = clases, media, escala
+            self._scaler = self._label_encoder = None
+            self._invalidar_cache_si_cambio(ruta)
+            self.modelo = modelo
+            self.version_cargada = version
+            # Se publica al final y en una sola asignación: quien lo vea ya tiene todo listo
+            self._inferencia = (modelo, clases, media, escala)
+        print("Modelo cargado correctamente", file=sys.stderr)
+
+    def ruta_fuente(self, motor=None):
+        """Archivo del que carga 'motor' (por defecto el actual; el paquete tiene prioridad con el motor NumPy)."""
+        motor = motor or self.motor
+        if motor == "numpy":
+            return self.ruta_paquete if os.path.exists(self.ruta_paquete) else self.ruta_npz
+        return self.ruta_int8 if motor == "int8" else self.ruta_modelo
+
+    def recargar_si_cambio(self):
+        """
+        Recarga el modelo si sus archivos cambiaron desde la última carga (recarga en caliente).
+        Las predicciones en curso terminan con el estado anterior; las siguientes usan el nuevo.
+        Devuelve True si recargó. Si el archivo nuevo es inválido se conserva el modelo cargado.
+        """
+        if self._inferencia is None or self._huella(self.ruta_fuente()) == self._huella_modelo:
+            return False
+        try:
             self.cargar_modelo()
+        except (OSError, ValueError) as error:
+            print(f"⚠️ No se pudo recargar el modelo, se mantiene el anterior: {error}", file=sys.stderr)
+            return False
+        return True
+
+    def _ruta_artefacto(self, nombre):
+        return os.path.join(self.directorio_modelo, nombre)
+
+    def _cargar_preprocesamiento(self):
+        """Carga clases, media y escala sin cargar el modelo (para exportar o evaluar motores)."""
+        if self.media is None:
+            self.clases = cargar_clases(self._ruta_artefacto("label_mapping.npy"))
+            self.media = np.load(self._ruta_artefacto("scaler_mean.npy"))
+            self.escala = np.load(self._ruta_artefacto("scaler_scale.npy"))
+
+    def _asegurar_modelo(self):
+        """Carga el modelo una sola vez aunque varios hilos lo pidan a la vez. Devuelve el estado de inferencia."""
+        estado = self._inferencia
+        if estado is None:
+            with self._candado:
+                if self._inferencia is None:
+                    self.cargar_modelo()
+                estado = self._inferencia
+        return estado
+
+    def _huella(self, ruta):
+        archivos = [ruta]
+        if ruta != self.ruta_paquete:
+            archivos += [self._ruta_artefacto(n) for n in ("label_mapping.npy", "scaler_mean.npy", "scaler_scale.npy")]
+        return (self.motor,) + tuple((a, tuple(_huella_archivo(a).values()) if os.path.exists(a) else None)
+                                     for a in archivos)
+
+    def _invalidar_cache_si_cambio(self, ruta):
+        """Vacía la caché de predicciones si los pesos o el preprocesamiento cargados son distintos a los anteriores."""
+        huella = self._huella(ruta)
+        if huella != self._huella_modelo:
+            self._cache.clear()
+            self._huella_modelo = huella
+
+    def estadisticas_cache(self):
+        consultas = self.cache_aciertos + self.cache_fallos
+        return {
+            "capacidad": self.tamano_cache,
+            "entradas": len(self._cache),
+            "aciertos": self.cache_aciertos,
+            "fallos": self.cache_fallos,
+            "tasa_aciertos": self.cache_aciertos / consultas if consultas else 0.0,
+        }
+
+    def _propagar(self, X_scaled, tamano_lote=1024, modelo=None):
+        """
+        Pasada hacia adelante en bloques de tamano_lote filas (con 'modelo' o, si no se indica, self.modelo).
+        Con Keras usa predict_on_batch: Keras.predict arma un pipeline de datos en cada llamada
+        y cuesta decenas de ms incluso para una sola fila.
+        """
+        modelo = self.modelo if modelo is None else modelo
+        if isinstance(modelo, MotorNumPy):
+            # El motor NumPy no tiene estado mutable: los hilos pueden usarlo en paralelo
+            return modelo.predict(X_scaled, batch_size=tamano_lote)
+        with self._candado:
+            return np.concatenate([
+                np.asarray(modelo.predict_on_batch(X_scaled[i:i + tamano_lote]))
+                for i in range(0, len(X_scaled), tamano_lote)
+            ])
+
+    def _escalar(self, X, media=None, escala=None):
+        """Equivalente a StandardScaler.transform usando solo NumPy."""
+        media = self.media if media is None else media
+        escala = self.escala if escala is None else escala
+        return ((X - media) / escala).astype(np.float32)
+
+    def _registrar_tiempos(self, t0, t1, t2, filas):
+        """Envía a la instrumentación el tiempo de escalado (t0-t1) y el de la pasada del modelo (t1-t2)."""
+        motor = self.motor
+        instrumentacion.observar("percepcion_escalado_segundos", t1 - t0)
+        instrumentacion.observar("percepcion_modelo_segundos", t2 - t1, motor=motor)
+        instrumentacion.observar("percepcion_filas_por_lote", filas)
+        instrumentacion.contar("percepcion_filas_total", filas, motor=motor)
+
+    def predecir(self, respuestas):
+        tipo_predicho, confianza, _, _ = self.predecir_distribucion(respuestas)
+        return tipo_predicho, confianza
+
+    def predecir_distribucion(self, respuestas):
+        """
+        Como predecir, pero devuelve también el vector softmax completo y las clases del modelo que lo
+        calculó: (tipo_predicho, confianza, probabilidades (16,), clases). Usa esas clases y no
+        self.clases, que una recarga puede cambiar entre la predicción y su lectura.
+        """
+        estado = self._asegurar_modelo()
+        modelo, clases, media, escala = estado
 
         if len(respuestas) != 60:
             raise ValueError("Debe ingresar exactamente 60 respuestas")
 
+        clave = clave_respuestas(respuestas) if self.tamano_cache > 0 else None
+        if clave is not None:
+            with self._candado:
+                guardado = self._cache.get(clave)
+                if guardado is not None:
+                    self._cache.move_to_end(clave)
+                    self.cache_aciertos += 1
+                    instrumentacion.contar("cache_predicciones_total", resultado="acierto")
+                    return guardado
+                self.cache_fallos += 1
+            instrumentacion.contar("cache_predicciones_total", resultado="fallo")
+
+        medir = instrumentacion.SUMIDERO is not None
+        if medir:
+            t0 = time.perf_counter()
         X = np.array(respuestas).reshape(1, -1)
-        X_scaled = self.scaler.transform(X)
-        pred = self.modelo.predict(X_scaled, verbose=0)
-        tipo_predicho = self.label_encoder.classes_[np.argmax(pred)]
+        X_scaled = self._escalar(X, media, escala)
+        if medir:
+            t1 = time.perf_counter()
+        pred = self._propagar(X_scaled, modelo=modelo)
+        if medir:
+            self._registrar_tiempos(t0, t1, time.perf_counter(), 1)
+        tipo_predicho = clases[np.argmax(pred)]
         confianza = np.max(pred) * 100
+        resultado = (tipo_predicho, confianza, np.asarray(pred[0]), clases)
 
-        return tipo_predicho, confianza
+        if clave is not None:
+            with self._candado:
+                # Si hubo una recarga mientras tanto, este resultado es del modelo anterior: no se guarda
+                if self._inferencia is estado:
+                    self._cache[clave] = resultado
+                if len(self._cache) > self.tamano_cache:
+                    self._cache.popitem(last=False)
+
+        return resultado
+
+    def predecir_lote(self, matriz, tamano_lote=1024):
+        """
+        Predice N cuestionarios de una sola vez.
+        matriz: array (N, 60) o iterable de listas de 60 respuestas.
+        Escala todo el lote una vez y hace una única pasada por el modelo,
+        procesada en bloques de 'tamano_lote' filas.
+        Devuelve una lista de N tuplas (tipo_predicho, confianza).
+        """
+        modelo, clases, media, escala = self._asegurar_modelo()
+
+        X = np.asarray(matriz if isinstance(matriz, np.ndarray) else list(matriz), dtype=np.float32)
+        if X.size == 0:
+            return []
+        if X.ndim != 2 or X.shape[1] != 60:
+            raise ValueError("Cada fila del lote debe tener exactamente 60 respuestas")
+
+        medir = instrumentacion.SUMIDERO is not None
+        if medir:
+            t0 = time.perf_counter()
+        X_scaled = self._escalar(X, media, escala)
+        if medir:
+            t1 = time.perf_counter()
+        pred = self._propagar(X_scaled, tamano_lote, modelo)
+        if medir:
+            self._registrar_tiempos(t0, t1, time.perf_counter(), len(X))
+        indices = np.argmax(pred, axis=1)
+        tipos = clases[indices]
+        confianzas = pred[np.arange(len(pred)), indices] * 100
+
+        return list(zip(tipos.tolist(), confianzas.tolist()))
+
+    def probabilidades(self, matriz, tamano_lote=1024):
+        """
+        Probabilidades de las 16 clases para N cuestionarios, admitiendo respuestas faltantes:
+        las celdas NaN se imputan con la media del scaler (quedan en 0 después de escalar).
+        Devuelve (clases, array (N, 16)), con las columnas en el orden de 'clases'.
+        """
+        modelo, clases, media, escala = self._asegurar_modelo()
+        X = np.asarray(matriz if isinstance(matriz, np.ndarray) else list(matriz), dtype=np.float32)
+        if X.size == 0:
+            return clases, np.empty((0, len(clases)), dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != 60:
+            raise ValueError("Cada fila debe tener exactamente 60 respuestas")
+
+        medir = instrumentacion.SUMIDERO is not None
+        if medir:
+            t0 = time.perf_counter()
+        X_scaled = np.nan_to_num(self._escalar(X, media, escala), nan=0.0)
+        if medir:
+            t1 = time.perf_counter()
+        pred = np.asarray(self._propagar(X_scaled, tamano_lote, modelo))
+        if medir:
+            self._registrar_tiempos(t0, t1, time.perf_counter(), len(X))
+        return clases, pred
 
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Entrenamiento del modelo de percepción")
+    parser.add_argument("--csv", default=None, help="Ruta del CSV de entrenamiento (por defecto data/16P.csv)")
+    parser.add_argument("--streaming", action="store_true", help="Entrenar por bloques con memoria acotada")
+    parser.add_argument("--tamano-bloque", type=int, default=50_000)
+    parser.add_argument("--convertir-cache", action="store_true", help="Solo convertir el CSV a caché binaria")
+    parser.add_argument("--exportar-int8", action="store_true",
+                        help="Cuantizar el modelo a int8 (calibrado con datos de train) y reportar la deriva en test")
+    parser.add_argument("--muestras-calibracion", type=int, default=2048)
+    parser.add_argument("--actualizar", default=None, metavar="CSV_NUEVOS",
+                        help="Actualizar el modelo de models/ con respuestas nuevas (ajuste fino con repaso)")
+    parser.add_argument("--epochs-ajuste", type=int, default=5)
+    parser.add_argument("--proporcion-replay", type=float, default=1.0)
+    parser.add_argument("--promover", action="store_true", help="Copiar la versión actualizada a models/")
+    parser.add_argument("--batch-size", type=int, default=BATCH_BASE)
+    parser.add_argument("--epochs", type=int, default=100)
+    parser.add_argument("--escalado-tasa", choices=ESCALADOS_TASA, default=None,
+                        help=f"Escalar la tasa de aprendizaje con el batch_size (referencia: {TASA_BASE} con {BATCH_BASE})")
+    parser.add_argument("--replicas", type=int, default=1,
+                        help="Entrenar en paralelo de datos con MirroredStrategy sobre N CPUs lógicas")
+    parser.add_argument("--hilos-intra", type=int, default=None, help="Hilos por operación (por defecto, todas las CPUs)")
+    parser.add_argument("--hilos-inter", type=int, default=None, help="Operaciones independientes en paralelo")
+    args = parser.parse_args()
+
     sistema = SistemaPercepcion()
-    sistema.entrenar()
+    if args.convertir_cache:
+        sistema.convertir_a_cache(args.csv, tamano_bloque=args.tamano_bloque)
+    elif args.actualizar:
+        metadatos = sistema.actualizar_incremental(args.actualizar, args.csv, args.epochs_ajuste,
+                                                   args.proporcion_replay, promover=args.promover)
+        print(json.dumps(metadatos, indent=2, ensure_ascii=False))
+    elif args.exportar_int8:
+        sistema.exportar_int8(args.csv, args.muestras_calibracion)
+        reporte = sistema.evaluar_cuantizacion(args.csv)
+        print(json.dumps(reporte, indent=2, ensure_ascii=False))
+    elif args.streaming:
+        configurar_hilos(args.hilos_intra, args.hilos_inter)
+        sistema.entrenar_streaming(args.csv, tamano_bloque=args.tamano_bloque, batch_size=args.batch_size,
+                                   epochs=args.epochs)
+    else:
+        sistema.entrenar(args.csv or os.path.join(DATA_DIR, "16P.csv"), args.batch_size, args.epochs,
+                         args.escalado_tasa, args.replicas, args.hilos_intra, args.hilos_inter)
@@ -0,0 +1,214 @@
+"""
+MÓDULO DE PLANIFICACIÓN GENERAL
+Búsqueda informada sobre espacios de estados con modelos de costo intercambiables.
+Un espacio define sus transiciones (vecinos/predecesores con costo) y su heurística;
+los algoritmos (A* y búsqueda bidireccional) no conocen nada del dominio.
+"""
+
+import heapq
+from itertools import count, product
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+Estado = Hashable
+
+
+class EspacioEstados:
+    """
+    Interfaz de un espacio de estados. Las subclases implementan:
+      - vecinos(estado): transiciones salientes (vecino, costo)
+      - predecesores(estado): transiciones entrantes (previo, costo); solo la usa la búsqueda bidireccional.
+        Por defecto se asume un espacio simétrico (predecesores = vecinos).
+      - heuristica(estado, objetivo): estimación admisible del costo restante (0 = Dijkstra).
+    """
+
+    def vecinos(self, estado: Estado) -> Iterable[Tuple[Estado, float]]:
+        raise NotImplementedError
+
+    def predecesores(self, estado: Estado) -> Iterable[Tuple[Estado, float]]:
+        return self.vecinos(estado)
+
+    def heuristica(self, estado: Estado, objetivo: Estado) -> float:
+        return 0
+
+
+class EspacioDimensiones(EspacioEstados):
+    """
+    Estados = tuplas de niveles discretos, uno por dimensión (niveles[i] valores posibles en la dimensión i).
+    Cada acción sube o baja un nivel en una sola dimensión; los costos pueden ser asimétricos:
+    costos_subida[i] (nivel k -> k+1) y costos_bajada[i] (k+1 -> k).
+    'prohibido' es un predicado opcional de estados no alcanzables (obstáculos).
+    Con niveles=[2, 2, 2, 2] y costos iguales a PESOS es el espacio MBTI de razonamiento.py.
+    """
+
+    def __init__(self, niveles: Sequence[int], costos_subida: Sequence[float],
+                 costos_bajada: Optional[Sequence[float]] = None,
+                 prohibido: Optional[Callable[[Tuple[int, ...]], bool]] = None):
+        if costos_bajada is None:
+            costos_bajada = costos_subida
+        if not len(niveles) == len(costos_subida) == len(costos_bajada):
+            raise ValueError("niveles, costos_subida y costos_bajada deben tener la misma longitud")
+        if min(costos_subida) <= 0 or min(costos_bajada) <= 0:
+            raise ValueError("Los costos de transición deben ser positivos")
+        self.niveles = list(niveles)
+        self.costos_subida = list(costos_subida)
+        self.costos_bajada = list(costos_bajada)
+        self.prohibido = prohibido
+
+    def __len__(self) -> int:
+        total = 1
+        for n in self.niveles:
+            total *= n
+        return total
+
+    def estados(self) -> Iterable[Tuple[int, ...]]:
+        return product(*(range(n) for n in self.niveles))
+
+    def _transiciones(self, estado, subida, bajada):
+        prohibido = self.prohibido
+        for i, nivel in enumerate(estado):
+            if nivel + 1 < self.niveles[i]:
+                vecino = estado[:i] + (nivel + 1,) + estado[i + 1:]
+                if prohibido is None or not prohibido(vecino):
+                    yield vecino, subida[i]
+            if nivel > 0:
+                vecino = estado[:i] + (nivel - 1,) + estado[i + 1:]
+                if prohibido is None or not prohibido(vecino):
+                    yield vecino, bajada[i]
+
+    def vecinos(self, estado):
+        return self._transiciones(estado, self.costos_subida, self.costos_bajada)
+
+    def predecesores(self, estado):
+        # Llegar a 'estado' subiendo desde abajo cuesta una subida, y bajando desde arriba una bajada
+        return self._transiciones(estado, self.costos_bajada, self.costos_subida)
+
+    def heuristica(self, estado, objetivo):
+        """Suma por dimensión del costo sin obstáculos: admisible y consistente."""
+        h = 0
+        for i, (a, b) in enumerate(zip(estado, objetivo)):
+            if b > a:
+                h += (b - a) * self.costos_subida[i]
+            elif a > b:
+                h += (a - b) * self.costos_bajada[i]
+        return h
+
+
+def _reconstruir(padres: Dict[Estado, Optional[Estado]], estado: Estado) -> List[Estado]:
+    camino = []
+    while estado is not None:
+        camino.append(estado)
+        estado = padres[estado]
+    camino.reverse()
+    return camino
+
+
+def a_estrella(espacio: EspacioEstados, inicio: Estado, objetivo: Estado) -> Optional[Dict]:
+    """
+    A* con punteros a padre (sin copiar caminos), conjunto cerrado y desempate en la frontera:
+    a igual f se prefiere el mayor g (nodo más cercano al objetivo) y luego el orden de inserción,
+    así los estados nunca se comparan entre sí.
+    Devuelve dict con 'camino', 'costo', 'nodos_explorados', 'eficiencia' e 'inserciones_frontera',
+    o None si el objetivo no es alcanzable.
+    """
+    heuristica = espacio.heuristica
+    orden = count()
+    g_mejor = {inicio: 0}
+    padres = {inicio: None}
+    cerrados = set()
+    nodos_explorados = []
+    frontera = [(heuristica(inicio, objetivo), 0, next(orden), inicio)]
+    inserciones = 1
+
+    while frontera:
+        _, menos_g, _, actual = heapq.heappop(frontera)
+        if actual in cerrados:
+            continue
+        cerrados.add(actual)
+        nodos_explorados.append(actual)
+        g = -menos_g
+
+        if actual == objetivo:
+            camino = _reconstruir(padres, actual)
+            return {
+                "camino": camino,
+                "costo": g,
+                "nodos_explorados": nodos_explorados,
+                "eficiencia": len(camino) / len(nodos_explorados),
+                "inserciones_frontera": inserciones
+            }
+
+        for vecino, costo in espacio.vecinos(actual):
+            if vecino in cerrados:
+                continue
+            nuevo_g = g + costo
+            if nuevo_g < g_mejor.get(vecino, float("inf")):
+                g_mejor[vecino] = nuevo_g
+                padres[vecino] = actual
+                heapq.heappush(frontera, (nuevo_g + heuristica(vecino, objetivo), -nuevo_g, next(orden), vecino))
+                inserciones += 1
+
+    return None
+
+
+def busqueda_bidireccional(espacio: EspacioEstados, inicio: Estado, objetivo: Estado) -> Optional[Dict]:
+    """
+    Búsqueda de costo uniforme bidireccional: una frontera avanza desde 'inicio' por vecinos y otra
+    retrocede desde 'objetivo' por predecesores, expandiendo siempre la de menor costo.
+    Se detiene cuando la suma de los mínimos de ambas fronteras alcanza el mejor encuentro (óptimo).
+    En espacios grandes sin buena heurística explora del orden de dos bolas de radio C/2 en vez de una de radio C.
+    Devuelve el mismo formato que a_estrella.
+    """
+    if inicio == objetivo:
+        return {"camino": [inicio], "costo": 0, "nodos_explorados": [inicio],
+                "eficiencia": 1.0, "inserciones_frontera": 1}
+
+    orden = count()
+    # Índice 0: búsqueda hacia adelante; índice 1: hacia atrás
+    g = ({inicio: 0}, {objetivo: 0})
+    padres = ({inicio: None}, {objetivo: None})
+    cerrados = (set(), set())
+    fronteras = ([(0, next(orden), inicio)], [(0, next(orden), objetivo)])
+    expandir = (espacio.vecinos, espacio.predecesores)
+    nodos_explorados = []
+    inserciones = 2
+    mejor_costo = float("inf")
+    encuentro = None
+
+    while fronteras[0] and fronteras[1]:
+        if fronteras[0][0][0] + fronteras[1][0][0] >= mejor_costo:
+            break
+        lado = 0 if fronteras[0][0][0] <= fronteras[1][0][0] else 1
+        g_actual, _, actual = heapq.heappop(fronteras[lado])
+        if actual in cerrados[lado]:
+            continue
+        cerrados[lado].add(actual)
+        nodos_explorados.append(actual)
+
+        for vecino, costo in expandir[lado](actual):
+            nuevo_g = g_actual + costo
+            if nuevo_g < g[lado].get(vecino, float("inf")):
+                g[lado][vecino] = nuevo_g
+                padres[lado][vecino] = actual
+                heapq.heappush(fronteras[lado], (nuevo_g, next(orden), vecino))
+                inserciones += 1
+            otro_g = g[1 - lado].get(vecino)
+            if otro_g is not None and g[lado][vecino] + otro_g < mejor_costo:
+                mejor_costo = g[lado][vecino] + otro_g
+                encuentro = vecino
+
+    if encuentro is None:
+        return None
+
+    camino = _reconstruir(padres[0], encuentro)
+    estado = padres[1][encuentro]
+    while estado is not None:
+        camino.append(estado)
+        estado = padres[1][estado]
+
+    return {
+        "camino": camino,
+        "costo": mejor_costo,
+        "nodos_explorados": nodos_explorados,
+        "eficiencia": len(camino) / len(nodos_explorados),
+        "inserciones_frontera": inserciones
+    }
@@ -3,7 +3,15 @@ MÓDULO DE RAZONAMIENTO LÓGICO Y BÚSQUEDA INFORMADA
 """
 
 import heapq
-from typing import List, Dict, Optional, Tuple
+import os
+import time
+from typing import List, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+import instrumentacion
+from motor_reglas import Inferencia, MotorReglas, agrupar_hechos, cargar_reglas
+from planificacion import EspacioEstados, a_estrella, busqueda_bidireccional
 
 # Base de conocimiento MBTI
 TIPOS_MBTI = [
@@ -33,20 +41,230 @@ DESCRIPCIONES = {
     "ESFP": "Alegre, espontáneo y divertido. Vive el momento y disfruta el presente."
 }
 
+# Base de reglas para el encadenamiento hacia adelante (todos los .json del directorio, ver motor_reglas.py).
+# Hechos iniciales de un tipo: sus cuatro letras y "tipo:XXXX"; los derivados son "categoria:valor".
+DIRECTORIO_REGLAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "reglas")
+
 # Pesos por dimensión (E/I, N/S, T/F, J/P).
 # Uso estos pesos en el modo 'weighted' como costo de transición
 PESOS = [2, 3, 3, 1]
 
+# Codificación de estados como máscara de 4 bits: el bit i vale 1 si la dimensión i
+# tiene su segunda letra (bit 0: I, bit 1: S, bit 2: F, bit 3: P).
+LETRAS_DIMENSION = [("E", "I"), ("N", "S"), ("T", "F"), ("J", "P")]
+BITS_DIMENSION = [1, 2, 4, 8]
+_TIPOS_POR_CODIGO = [
+    "".join(letras[(codigo >> i) & 1] for i, letras in enumerate(LETRAS_DIMENSION))
+    for codigo in range(16)
+]
+_CODIGOS = {tipo: codigo for codigo, tipo in enumerate(_TIPOS_POR_CODIGO)}
+
+# Costo de cada dimensión según el modo, y tablas por máscara XOR de 16 entradas:
+# _POPCOUNT[m] = bits encendidos en m; _PESO_MASCARA[mode][m] = suma de costos de los bits de m
+COSTOS_DIMENSION = {"unit": [1, 1, 1, 1], "weighted": PESOS}
+_POPCOUNT = [bin(mascara).count("1") for mascara in range(16)]
+_PESO_MASCARA = {
+    mode: [sum(c for bit, c in zip(BITS_DIMENSION, costos) if mascara & bit) for mascara in range(16)]
+    for mode, costos in COSTOS_DIMENSION.items()
+}
+
+# Vecinos por XOR de un bit, en el orden de las dimensiones: _VECINOS[mode][codigo] = [(vecino, costo), ...]
+_VECINOS = {
+    mode: [[(codigo ^ bit, c) for bit, c in zip(BITS_DIMENSION, costos)] for codigo in range(16)]
+    for mode, costos in COSTOS_DIMENSION.items()
+}
+
+# Rango alfabético de cada código: A* guarda los caminos como listas de rangos para que la frontera
+# desempate exactamente igual que al comparar cadenas
+_TIPOS_ALFABETICOS = sorted(_TIPOS_POR_CODIGO)
+_RANGO_ALFABETICO = [_TIPOS_ALFABETICOS.index(tipo) for tipo in _TIPOS_POR_CODIGO]
+
+# Tablas de planes óptimos por modo (se construyen la primera vez que se usan):
+# _TABLAS_PLANES[mode][inicio][objetivo] = (costo, camino)
+_TABLAS_PLANES = {}
+
+
+def _construir_tabla_planes(mode: str) -> List[List[Tuple[int, Tuple[str, ...]]]]:
+    """Dijkstra desde cada uno de los 16 estados codificados; devuelve la tabla 16x16 de (costo, camino)."""
+    vecinos = _VECINOS[mode]
+    tabla = []
+    for origen in range(16):
+        distancia = {origen: 0}
+        padre = {origen: None}
+        frontera = [(0, origen)]
+        while frontera:
+            g, actual = heapq.heappop(frontera)
+            if g > distancia[actual]:
+                continue
+            for vecino, costo in vecinos[actual]:
+                if vecino not in distancia or g + costo < distancia[vecino]:
+                    distancia[vecino] = g + costo
+                    padre[vecino] = actual
+                    heapq.heappush(frontera, (g + costo, vecino))
+
+        fila = []
+        for destino in range(16):
+            camino = []
+            nodo = destino
+            while nodo is not None:
+                camino.append(_TIPOS_POR_CODIGO[nodo])
+                nodo = padre[nodo]
+            fila.append((distancia[destino], tuple(reversed(camino))))
+        tabla.append(fila)
+    return tabla
+
+
+def _tabla_planes(mode: str) -> List[List[Tuple[int, Tuple[str, ...]]]]:
+    if mode not in _TABLAS_PLANES:
+        _TABLAS_PLANES[mode] = _construir_tabla_planes(mode)
+    return _TABLAS_PLANES[mode]
+
+
+# Motor de reglas (se carga la primera vez que se usa) e inferencia memorizada por código:
+# _INFERENCIAS_POR_CODIGO[codigo] = (Inferencia, hechos derivados agrupados por categoría)
+_MOTOR_REGLAS: Optional[MotorReglas] = None
+_INFERENCIAS_POR_CODIGO: List[Optional[Tuple[Inferencia, Dict[str, Tuple[str, ...]]]]] = [None] * 16
+
+
+def _motor_reglas() -> MotorReglas:
+    global _MOTOR_REGLAS
+    if _MOTOR_REGLAS is None:
+        _MOTOR_REGLAS = MotorReglas(cargar_reglas(DIRECTORIO_REGLAS))
+    return _MOTOR_REGLAS
+
+
+def _hechos_iniciales(codigo: int) -> List[str]:
+    tipo = _TIPOS_POR_CODIGO[codigo]
+    return list(tipo) + [f"tipo:{tipo}"]
+
+
+def _inferencia_tipo(codigo: int) -> Tuple[Inferencia, Dict[str, Tuple[str, ...]]]:
+    memorizada = _INFERENCIAS_POR_CODIGO[codigo]
+    if memorizada is None:
+        iniciales = _hechos_iniciales(codigo)
+        inferencia = _motor_reglas().inferir(iniciales)
+        grupos = agrupar_hechos(inferencia.hechos[len(iniciales):])
+        memorizada = (inferencia, {categoria: tuple(valores) for categoria, valores in grupos.items()})
+        _INFERENCIAS_POR_CODIGO[codigo] = memorizada
+    return memorizada
+
+
+# Versiones NumPy para planificación por lotes: peso de cada máscara XOR y matriz 16x16 de caminos
+_PESO_MASCARA_NP = {mode: np.array(pesos, dtype=np.int64) for mode, pesos in _PESO_MASCARA.items()}
+_CAMINOS_NP = {}
+
+
+def _caminos_np(mode: str) -> np.ndarray:
+    if mode not in _CAMINOS_NP:
+        caminos = np.empty((16, 16), dtype=object)
+        for i, fila in enumerate(_tabla_planes(mode)):
+            for j, (_, camino) in enumerate(fila):
+                caminos[i, j] = camino
+        _CAMINOS_NP[mode] = caminos
+    return _CAMINOS_NP[mode]
+
+
+# Matriz 16x16 de costos de plan por modo: _MATRIZ_COSTOS[mode][inicio, objetivo] (peso de la máscara XOR)
+_MATRIZ_COSTOS = {
+    mode: pesos[np.arange(16)[:, None] ^ np.arange(16)[None, :]] for mode, pesos in _PESO_MASCARA_NP.items()
+}
+# _BITS_NP[codigo, i] = 1 si el código tiene la segunda letra de la dimensión i (I, S, F, P)
+_BITS_NP = np.array([[(codigo >> i) & 1 for i in range(4)] for codigo in range(16)], dtype=np.float64)
+# Código de cada columna de un vector de probabilidades, por orden de clases: tuple(clases) -> códigos
+_CODIGOS_POR_ORDEN = {}
+
+
+def _codigos_clases(clases) -> np.ndarray:
+    clave = tuple(str(c) for c in clases)
+    codigos = _CODIGOS_POR_ORDEN.get(clave)
+    if codigos is None:
+        if sorted(clave) != _TIPOS_ALFABETICOS:
+            raise ValueError("Las clases deben ser los 16 tipos MBTI")
+        codigos = _codificar_arreglo(list(clave))
+        _CODIGOS_POR_ORDEN[clave] = codigos
+    return codigos
+
+
+def _codificar_arreglo(tipos) -> np.ndarray:
+    """Codifica un arreglo (de cualquier forma) de tipos MBTI a códigos de 4 bits, resolviendo cada valor distinto una vez."""
+    tipos = np.asarray(tipos)
+    if np.issubdtype(tipos.dtype, np.integer):
+        if tipos.size and (tipos.min() < 0 or tipos.max() > 15):
+            raise ValueError("Los códigos MBTI deben estar entre 0 y 15")
+        return tipos.astype(np.int64)
+    unicos, inversos = np.unique(tipos, return_inverse=True)
+    invalidos = [t for t in unicos.tolist() if t not in _CODIGOS]
+    if invalidos:
+        raise ValueError(f"Tipo MBTI inválido: {invalidos[0]}")
+    codigos = np.array([_CODIGOS[t] for t in unicos.tolist()], dtype=np.int64)
+    return codigos[inversos].reshape(tipos.shape)
+
+
+class EspacioMBTI(EspacioEstados):
+    """
+    Los 16 tipos como espacio de estados (códigos de 4 bits) con un modelo de costos por dimensión.
+    costos[i]: pasar de la primera a la segunda letra de la dimensión i (E→I, N→S, T→F, J→P).
+    costos_inversos[i]: sentido contrario (I→E, ...); por defecto igual a costos (simétrico).
+    """
+
+    def __init__(self, costos: Sequence[float] = PESOS, costos_inversos: Optional[Sequence[float]] = None):
+        if costos_inversos is None:
+            costos_inversos = costos
+        if len(costos) != 4 or len(costos_inversos) != 4:
+            raise ValueError("Se necesita un costo por cada una de las 4 dimensiones")
+        # Costo de cada bit según si el estado de partida lo tiene apagado (ida) o encendido (vuelta)
+        ida = list(zip(BITS_DIMENSION, costos))
+        vuelta = list(zip(BITS_DIMENSION, costos_inversos))
+        self._vecinos = [
+            [(codigo ^ bit, c_vuelta if codigo & bit else c_ida) for (bit, c_ida), (_, c_vuelta) in zip(ida, vuelta)]
+            for codigo in range(16)
+        ]
+        self._predecesores = [
+            [(codigo ^ bit, c_ida if codigo & bit else c_vuelta) for (bit, c_ida), (_, c_vuelta) in zip(ida, vuelta)]
+            for codigo in range(16)
+        ]
+        # h(a, b) = suma de los costos dirigidos de los bits distintos (exacta sin obstáculos)
+        self._h = [
+            [sum(c_vuelta if a & bit else c_ida for (bit, c_ida), (_, c_vuelta) in zip(ida, vuelta) if (a ^ b) & bit)
+             for b in range(16)]
+            for a in range(16)
+        ]
+
+    def vecinos(self, estado: int):
+        return self._vecinos[estado]
+
+    def predecesores(self, estado: int):
+        return self._predecesores[estado]
+
+    def heuristica(self, estado: int, objetivo: int):
+        return self._h[estado][objetivo]
+
 
 class SistemaRazonamiento:
     @staticmethod
     def validar_tipo_mbti(tipo: str) -> bool:
         """Valida que el tipo MBTI sea correcto."""
-        if not isinstance(tipo, str) or len(tipo) != 4:
-            return False
-        if tipo[0] not in ['E', 'I'] or tipo[1] not in ['N', 'S'] or tipo[2] not in ['T', 'F'] or tipo[3] not in ['J', 'P']:
-            return False
-        return tipo in TIPOS_MBTI
+        return isinstance(tipo, str) and tipo in _CODIGOS
+
+    @staticmethod
+    def codificar_tipo(tipo: str) -> int:
+        """Convierte un tipo MBTI ('INTP') a su máscara de 4 bits."""
+        try:
+            return _CODIGOS[tipo]
+        except (KeyError, TypeError):
+            raise ValueError(f"Tipo MBTI inválido: {tipo}") from None
+
+    @staticmethod
+    def codificar_tipos(tipos) -> np.ndarray:
+        """Como codificar_tipo para un arreglo de cualquier forma de tipos MBTI (o de códigos, que se validan)."""
+        return _codificar_arreglo(tipos)
+
+    @staticmethod
+    def decodificar_tipo(codigo: int) -> str:
+        """Convierte una máscara de 4 bits a su tipo MBTI."""
+        if not 0 <= codigo < 16:
+            raise ValueError(f"Código MBTI inválido: {codigo}")
+        return _TIPOS_POR_CODIGO[codigo]
 
     @staticmethod
     def obtener_descripcion(tipo: str) -> str:
@@ -54,33 +272,60 @@ class SistemaRazonamiento:
 
     @staticmethod
     def razonar_sobre_tipo(tipo: str) -> Dict:
+        """
+        Encadenamiento hacia adelante desde las letras del tipo con la base de reglas de DIRECTORIO_REGLAS.
+        'razonamiento' son las explicaciones de las reglas disparadas; 'hechos' agrupa los hechos derivados
+        por categoría (rasgo, temperamento, carrera, comunicacion, conflicto, ...).
+        La inferencia de cada uno de los 16 tipos se calcula una vez por proceso.
+        """
         if not SistemaRazonamiento.validar_tipo_mbti(tipo):
             raise ValueError(f"Tipo MBTI inválido: {tipo}")
 
-        razonamiento = []
-        razonamiento.append("Extrovertido: Obtiene energía de la interacción social" if tipo[0] == "E" else "Introvertido: Obtiene energía del tiempo a solas")
-        razonamiento.append("Intuitivo: Se enfoca en ideas y patrones abstractos" if tipo[1] == "N" else "Sensorial: Prefiere hechos concretos y experiencias reales")
-        razonamiento.append("Pensamiento: Toma decisiones basadas en lógica y objetividad" if tipo[2] == "T" else "Sentimiento: Toma decisiones basadas en valores y empatía")
-        razonamiento.append("Juicio: Prefiere planificación, estructura y cierre" if tipo[3] == "J" else "Percepción: Prefiere flexibilidad y espontaneidad")
-
+        inferencia, grupos = _inferencia_tipo(_CODIGOS[tipo])
+        # Copias: quien recibe el resultado puede modificarlo sin tocar lo memorizado
         return {
             "tipo": tipo,
             "descripcion": SistemaRazonamiento.obtener_descripcion(tipo),
-            "razonamiento": razonamiento
+            "razonamiento": list(inferencia.explicaciones),
+            "hechos": {categoria: list(valores) for categoria, valores in grupos.items()},
+            "reglas_aplicadas": list(inferencia.disparadas)
         }
 
+    @staticmethod
+    def recargar_reglas(directorio: str = DIRECTORIO_REGLAS) -> int:
+        """Vuelve a leer la base de reglas y descarta las inferencias memorizadas. Devuelve la cantidad de reglas."""
+        global _MOTOR_REGLAS
+        motor = MotorReglas(cargar_reglas(directorio))
+        _MOTOR_REGLAS = motor
+        _INFERENCIAS_POR_CODIGO[:] = [None] * 16
+        return len(motor)
+
+    @staticmethod
+    def verificar_reglas() -> int:
+        """
+        Compara la inferencia indexada con la referencia sin índice para los 16 tipos (mismo conjunto de hechos).
+        Devuelve la cantidad de tipos verificados; lanza AssertionError ante una diferencia.
+        """
+        motor = _motor_reglas()
+        for codigo in range(16):
+            iniciales = _hechos_iniciales(codigo)
+            indexada, referencia = motor.inferir(iniciales), motor.inferir_sin_indice(iniciales)
+            assert set(indexada.hechos) == set(referencia.hechos), f"{_TIPOS_POR_CODIGO[codigo]}: hechos distintos"
+            assert set(indexada.disparadas) == set(referencia.disparadas), f"{_TIPOS_POR_CODIGO[codigo]}: reglas distintas"
+        return 16
+
     @staticmethod
     def heuristica_hamming(tipo_actual: str, tipo_objetivo: str) -> int:
-        """Heurística admisible para costo unitario: número de letras distintas (distancia de Hamming)."""
-        return sum(1 for a, b in zip(tipo_actual, tipo_objetivo) if a != b)
+        """Heurística admisible para costo unitario: número de letras distintas (popcount del XOR)."""
+        return _POPCOUNT[_CODIGOS[tipo_actual] ^ _CODIGOS[tipo_objetivo]]
 
     @staticmethod
     def heuristica_ponderada(tipo_actual: str, tipo_objetivo: str) -> int:
         """
-        Heurística ponderada: suma de pesos de las dimensiones que difieren.
+        Heurística ponderada: suma de pesos de las dimensiones que difieren (peso de la máscara XOR).
         Es admisible **si** las acciones tienen costo igual al peso correspondiente.
         """
-        return sum(weight for i, weight in enumerate(PESOS) if tipo_actual[i] != tipo_objetivo[i])
+        return _PESO_MASCARA["weighted"][_CODIGOS[tipo_actual] ^ _CODIGOS[tipo_objetivo]]
 
     # Generador de vecinos (retorna (vecino, costo_transicion))
     @staticmethod
@@ -91,22 +336,7 @@ class SistemaRazonamiento:
           - "unit": cada transición cuesta 1
           - "weighted": la transición de la dimensión i cuesta PESOS[i]
         """
-        cambios = {
-            0: {"E": "I", "I": "E"},
-            1: {"N": "S", "S": "N"},
-            2: {"T": "F", "F": "T"},
-            3: {"J": "P", "P": "J"}
-        }
-
-        vecinos = []
-        for i, letra in enumerate(tipo):
-            nuevo = list(tipo)
-            nuevo[i] = cambios[i][letra]
-            vecino = "".join(nuevo)
-            if vecino in TIPOS_MBTI:
-                costo = 1 if mode == "unit" else PESOS[i]
-                vecinos.append((vecino, costo))
-        return vecinos
+        return [(_TIPOS_POR_CODIGO[vecino], costo) for vecino, costo in _VECINOS[mode][_CODIGOS[tipo]]]
 
     # Búsqueda A*
     @staticmethod
@@ -115,6 +345,7 @@ class SistemaRazonamiento:
         Algoritmo A* para encontrar el camino óptimo entre dos tipos MBTI.
         mode: "unit" (g(n)=1 por acción) o "weighted" (g(n)=peso del rasgo cambiado).
         Devuelve dict con 'camino', 'costo', 'nodos_explorados', 'eficiencia'.
+        Internamente los estados son máscaras de 4 bits (vecinos por XOR, h por peso de la máscara XOR).
         """
         if not SistemaRazonamiento.validar_tipo_mbti(inicio):
             raise ValueError(f"Tipo inicio inválido: {inicio}")
@@ -123,47 +354,211 @@ class SistemaRazonamiento:
         if mode not in ("unit", "weighted"):
             raise ValueError("mode debe ser 'unit' o 'weighted'")
 
-        # Selecciona heurística adecuada (admisible según el modo)
-        if mode == "unit":
-            heuristica = SistemaRazonamiento.heuristica_hamming
-        else:
-            heuristica = SistemaRazonamiento.heuristica_ponderada
+        # Heurística admisible según el modo: popcount (unit) o peso de la máscara (weighted)
+        peso_mascara = _PESO_MASCARA[mode]
+        vecinos = _VECINOS[mode]
+        codigo_inicio, codigo_objetivo = _CODIGOS[inicio], _CODIGOS[objetivo]
 
-        # Nodo en la frontera: (f = g + h, g, estado, camino)
-        inicio_h = heuristica(inicio, objetivo)
-        frontera = [(inicio_h, 0, inicio, [inicio])]
-        visitados = {}
+        # Nodo en la frontera: (f = g + h, g, rango alfabético, estado). El camino sale de los punteros
+        # a padre al llegar al objetivo, sin copiar una lista por cada inserción
+        frontera = [(peso_mascara[codigo_inicio ^ codigo_objetivo], 0, _RANGO_ALFABETICO[codigo_inicio], codigo_inicio)]
+        inserciones = 1
+        g_mejor = {codigo_inicio: 0}
+        padres = {codigo_inicio: None}
+        cerrados = set()
         nodos_explorados = []
 
         while frontera:
-            f, g, actual, camino = heapq.heappop(frontera)
-            # Si ya hay un mejor g registrado para 'actual', salta
-            if actual in visitados and g > visitados[actual]:
+            _, g, _, actual = heapq.heappop(frontera)
+            # La heurística es consistente: la primera vez que sale un estado ya tiene su mejor g
+            if actual in cerrados:
                 continue
-
+            cerrados.add(actual)
             nodos_explorados.append(actual)
 
-            if actual == objetivo:
+            if actual == codigo_objetivo:
+                camino = []
+                while actual is not None:
+                    camino.append(actual)
+                    actual = padres[actual]
+                camino.reverse()
+                if instrumentacion.SUMIDERO is not None:
+                    instrumentacion.observar("a_estrella_nodos_expandidos", len(nodos_explorados), mode=mode)
+                    instrumentacion.contar("a_estrella_nodos_expandidos_total", len(nodos_explorados), mode=mode)
+                    instrumentacion.contar("a_estrella_inserciones_frontera_total", inserciones, mode=mode)
                 return {
-                    "camino": camino,
+                    "camino": [_TIPOS_POR_CODIGO[c] for c in camino],
                     "costo": g,
-                    "nodos_explorados": nodos_explorados,
-                    "eficiencia": len(camino) / len(nodos_explorados) if nodos_explorados else 0.0
+                    "nodos_explorados": [_TIPOS_POR_CODIGO[c] for c in nodos_explorados],
+                    "eficiencia": len(camino) / len(nodos_explorados),
+                    "inserciones_frontera": inserciones
                 }
 
-            visitados[actual] = g
-
-            for vecino, costo_transicion in SistemaRazonamiento.generar_vecinos_con_costos(actual, mode=mode):
-                nuevo_g = g + costo_transicion
-                h_vec = heuristica(vecino, objetivo)
-                prioridad = nuevo_g + h_vec
-                # Si tenemos ya mejor g para vecino, saltar (mejor camino conocido)
-                if vecino in visitados and nuevo_g >= visitados[vecino]:
+            for vecino, costo_transicion in vecinos[actual]:
+                if vecino in cerrados:
                     continue
-                heapq.heappush(frontera, (prioridad, nuevo_g, vecino, camino + [vecino]))
+                nuevo_g = g + costo_transicion
+                # Solo se inserta si mejora el mejor g conocido para el vecino
+                if nuevo_g < g_mejor.get(vecino, float("inf")):
+                    g_mejor[vecino] = nuevo_g
+                    padres[vecino] = actual
+                    prioridad = nuevo_g + peso_mascara[vecino ^ codigo_objetivo]
+                    heapq.heappush(frontera, (prioridad, nuevo_g, _RANGO_ALFABETICO[vecino], vecino))
+                    inserciones += 1
 
         return None
 
+    # Planificación por tabla precalculada
+    @staticmethod
+    def planificar(inicio: str, objetivo: str, mode: str = "weighted", metodo: str = "tabla") -> Optional[Dict]:
+        """
+        Devuelve el plan óptimo entre dos tipos MBTI con el mismo formato que busqueda_a_estrella.
+        metodo:
+          - "tabla": consulta O(1) en la tabla 16x16 de planes del modo (se construye una vez por proceso).
+            No hay búsqueda, así que 'nodos_explorados' son solo los nodos del camino.
+          - "a_estrella": ejecuta busqueda_a_estrella (referencia / verificación).
+        """
+        if metodo == "a_estrella":
+            return SistemaRazonamiento.busqueda_a_estrella(inicio, objetivo, mode=mode)
+        if metodo != "tabla":
+            raise ValueError("metodo debe ser 'tabla' o 'a_estrella'")
+        if not SistemaRazonamiento.validar_tipo_mbti(inicio):
+            raise ValueError(f"Tipo inicio inválido: {inicio}")
+        if not SistemaRazonamiento.validar_tipo_mbti(objetivo):
+            raise ValueError(f"Tipo objetivo inválido: {objetivo}")
+        if mode not in ("unit", "weighted"):
+            raise ValueError("mode debe ser 'unit' o 'weighted'")
+
+        medir = instrumentacion.SUMIDERO is not None
+        if medir:
+            t0 = time.perf_counter()
+        costo, camino = _tabla_planes(mode)[_CODIGOS[inicio]][_CODIGOS[objetivo]]
+        if medir:
+            instrumentacion.observar("planificacion_tabla_segundos", time.perf_counter() - t0, mode=mode)
+            instrumentacion.contar("planificacion_tabla_consultas_total", mode=mode)
+        return {
+            "camino": list(camino),
+            "costo": costo,
+            "nodos_explorados": list(camino),
+            "eficiencia": 1.0
+        }
+
+    @staticmethod
+    def verificar_tabla_planes() -> int:
+        """
+        Compara la tabla de planes con A* para los 256 pares de cada modo.
+        Verifica que el costo coincida y que el camino de la tabla sea válido y cueste eso.
+        Devuelve la cantidad de pares verificados; lanza AssertionError ante una diferencia.
+        """
+        verificados = 0
+        for mode in ("unit", "weighted"):
+            for inicio in TIPOS_MBTI:
+                for objetivo in TIPOS_MBTI:
+                    plan = SistemaRazonamiento.planificar(inicio, objetivo, mode=mode)
+                    referencia = SistemaRazonamiento.busqueda_a_estrella(inicio, objetivo, mode=mode)
+                    camino = plan["camino"]
+                    costo_camino = 0
+                    for actual, siguiente in zip(camino, camino[1:]):
+                        costos = dict(SistemaRazonamiento.generar_vecinos_con_costos(actual, mode=mode))
+                        assert siguiente in costos, f"{mode}: {actual}->{siguiente} no es una transición válida"
+                        costo_camino += costos[siguiente]
+                    assert camino[0] == inicio and camino[-1] == objetivo, f"{mode}: camino {camino} no une {inicio}->{objetivo}"
+                    assert plan["costo"] == referencia["costo"] == costo_camino, (
+                        f"{mode}: {inicio}->{objetivo} tabla={plan['costo']} A*={referencia['costo']} camino={costo_camino}"
+                    )
+                    verificados += 1
+        return verificados
+
+    # Planificación por lotes
+    @staticmethod
+    def planificar_lote(inicios, objetivos, mode: str = "weighted", incluir_caminos: bool = True) -> Dict:
+        """
+        Planifica muchos pares (inicio, objetivo) con operaciones de arreglos, sin ejecutar A* por par.
+        inicios, objetivos: arreglos de tipos MBTI ('INTP') o de códigos de 4 bits; se combinan con el
+        broadcasting de NumPy (p. ej. inicios de forma (N, 1) y objetivos (K,) planifican N x K pares).
+        costo = peso de la máscara XOR (popcount ponderado); los caminos salen de la tabla 16x16 del modo.
+        Devuelve {"costos": ndarray de enteros, "caminos": ndarray de tuplas (si incluir_caminos)}.
+        """
+        if mode not in ("unit", "weighted"):
+            raise ValueError("mode debe ser 'unit' o 'weighted'")
+        codigos_inicio, codigos_objetivo = np.broadcast_arrays(
+            _codificar_arreglo(inicios), _codificar_arreglo(objetivos)
+        )
+        resultado = {"costos": _PESO_MASCARA_NP[mode][codigos_inicio ^ codigos_objetivo]}
+        if incluir_caminos:
+            resultado["caminos"] = _caminos_np(mode)[codigos_inicio, codigos_objetivo]
+        instrumentacion.contar("planificacion_tabla_consultas_total", int(resultado["costos"].size), mode=mode)
+        return resultado
+
+    # Razonamiento sobre la distribución completa de probabilidades
+    @staticmethod
+    def distribucion_por_codigo(probabilidades, clases) -> np.ndarray:
+        """
+        Reordena vectores de probabilidades (..., 16) cuyas columnas siguen 'clases' (p. ej. el softmax
+        del modelo, en el orden de SistemaPercepcion.clases) al orden de los códigos de 4 bits.
+        """
+        probabilidades = np.asarray(probabilidades, dtype=np.float64)
+        por_codigo = np.empty_like(probabilidades)
+        por_codigo[..., _codigos_clases(clases)] = probabilidades
+        return por_codigo
+
+    @staticmethod
+    def marginales_dimensiones(probabilidades, clases) -> np.ndarray:
+        """
+        Probabilidad de la primera letra de cada dimensión (E, N, T, J) sumando sobre los 16 tipos.
+        probabilidades: (..., 16) en el orden de 'clases'. Devuelve (..., 4); la segunda letra es 1 - p.
+        """
+        por_codigo = SistemaRazonamiento.distribucion_por_codigo(probabilidades, clases)
+        return SistemaRazonamiento.marginales_por_codigo(por_codigo)
+
+    @staticmethod
+    def marginales_por_codigo(por_codigo) -> np.ndarray:
+        """Como marginales_dimensiones, para distribuciones (..., 16) ya en el orden de los códigos."""
+        return 1.0 - np.asarray(por_codigo, dtype=np.float64) @ _BITS_NP
+
+    @staticmethod
+    def costo_esperado(probabilidades, clases, objetivos, mode: str = "weighted") -> np.ndarray:
+        """
+        Costo de plan esperado hasta cada objetivo, promediando sobre los 16 tipos de inicio con sus
+        probabilidades: sum_k p(k) * costo(k, objetivo) con la matriz 16x16 de costos del modo.
+        probabilidades (..., 16); objetivos: un tipo/código o un arreglo de K. Devuelve (...) o (..., K).
+        """
+        por_codigo = SistemaRazonamiento.distribucion_por_codigo(probabilidades, clases)
+        return SistemaRazonamiento.costo_esperado_por_codigo(por_codigo, objetivos, mode)
+
+    @staticmethod
+    def costo_esperado_por_codigo(por_codigo, objetivos, mode: str = "weighted") -> np.ndarray:
+        """Como costo_esperado, para distribuciones (..., 16) ya en el orden de los códigos."""
+        if mode not in ("unit", "weighted"):
+            raise ValueError("mode debe ser 'unit' o 'weighted'")
+        return np.asarray(por_codigo, dtype=np.float64) @ _MATRIZ_COSTOS[mode][:, _codificar_arreglo(objetivos)]
+
+    @staticmethod
+    def top_k(probabilidades, clases, k: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+        """Los k tipos más probables de cada fila: (tipos (..., k), probabilidades (..., k)), de mayor a menor."""
+        probabilidades = np.asarray(probabilidades)
+        indices = np.argsort(-probabilidades, axis=-1, kind="stable")[..., :k]
+        return np.asarray(clases)[indices], np.take_along_axis(probabilidades, indices, axis=-1)
+
+    # Planificación con modelos de costo personalizados
+    @staticmethod
+    def planificar_con_costos(inicio: str, objetivo: str, costos: Sequence[float] = PESOS,
+                              costos_inversos: Optional[Sequence[float]] = None,
+                              bidireccional: bool = False) -> Optional[Dict]:
+        """
+        Planifica entre dos tipos con costos por dimensión arbitrarios y opcionalmente asimétricos
+        (ver EspacioMBTI), usando el A* general de planificacion.py o su variante bidireccional.
+        Devuelve el formato de busqueda_a_estrella más 'inserciones_frontera'.
+        """
+        espacio = EspacioMBTI(costos, costos_inversos)
+        buscar = busqueda_bidireccional if bidireccional else a_estrella
+        resultado = buscar(espacio, SistemaRazonamiento.codificar_tipo(inicio), SistemaRazonamiento.codificar_tipo(objetivo))
+        if resultado is None:
+            return None
+        resultado["camino"] = [_TIPOS_POR_CODIGO[c] for c in resultado["camino"]]
+        resultado["nodos_explorados"] = [_TIPOS_POR_CODIGO[c] for c in resultado["nodos_explorados"]]
+        return resultado
+
 
 # Ejemplos / Pruebas (solo si se ejecuta como script)
 
@@ -176,5 +571,26 @@ if __name__ == "__main__":
     r2 = SistemaRazonamiento.busqueda_a_estrella("ISFP", "ENFP", mode="weighted")
     print(r2)
 
+    print("\nPlan por tabla (modo ponderado):")
+    print(SistemaRazonamiento.planificar("ISFP", "ENFP", mode="weighted"))
+
+    print("\nPlan con costos asimétricos (E→I cuesta 5, I→E cuesta 1):")
+    print(SistemaRazonamiento.planificar_con_costos("ESFP", "INTJ", costos=[5, 3, 3, 1], costos_inversos=[1, 3, 3, 1]))
+
+    print("\nPlanificación por lotes (3 inicios x 2 objetivos, modo ponderado):")
+    lote = SistemaRazonamiento.planificar_lote([["INTP"], ["ESFJ"], ["ISTJ"]], ["ENFP", "INTJ"])
+    print(lote["costos"])
+
+    print(f"\nTabla de planes verificada contra A*: {SistemaRazonamiento.verificar_tabla_planes()} pares")
+
+    print("\nDistribución dudosa entre INTP (60%) e INTJ (40%):")
+    clases = sorted(TIPOS_MBTI)
+    probabilidades = np.zeros(16)
+    probabilidades[clases.index("INTP")], probabilidades[clases.index("INTJ")] = 0.6, 0.4
+    print("  P(E, N, T, J):", SistemaRazonamiento.marginales_dimensiones(probabilidades, clases))
+    print("  costo esperado hasta ENFP:", SistemaRazonamiento.costo_esperado(probabilidades, clases, "ENFP"))
+
+    print(f"Reglas verificadas contra la inferencia sin índice: {SistemaRazonamiento.verificar_reglas()} tipos")
+
     print("\nRazonamiento sobre tipo 'INTP':")
     print(SistemaRazonamiento.razonar_sobre_tipo("INTP"))
@@ -0,0 +1,261 @@
+"""
+MÓDULO SERVIDOR DE PREDICCIONES
+Servidor HTTP local (asyncio) que mantiene un único AgentePersonalidad cargado y agrupa
+las peticiones concurrentes en micro-lotes para hacer una sola pasada por el modelo.
+
+    python servidor.py --puerto 8080 --max-lote 256 --max-espera-ms 5 --motor numpy
+
+Rutas:
+    POST /analizar       {"respuestas": [60 enteros], "tipo_objetivo": "ENFP" (opcional)}
+    GET  /salud
+    GET  /estadisticas
+
+Con --metricas-puerto se activa la instrumentación y se exponen las métricas en formato Prometheus.
+Con --recarga-segundos el servidor revisa periódicamente si el modelo cambió en disco (p. ej. un
+paquete nuevo publicado con promover_version) y lo recarga sin cortar las peticiones en curso.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import instrumentacion
+from agente import AgentePersonalidad
+
+MAX_CUERPO = 64 * 1024
+
+
+class MicroLoteador:
+    """
+    Junta peticiones de análisis en micro-lotes acotados por max_lote y max_espera_ms.
+    La pasada del modelo (probabilidades) corre en un hilo dedicado para no bloquear el bucle de eventos;
+    el razonamiento y la planificación se agregan por petición después de la predicción, a partir del
+    softmax completo de cada fila.
+    """
+
+    def __init__(self, agente, max_lote=256, max_espera_ms=5.0, recarga_segundos=None):
+        if max_lote < 1:
+            raise ValueError("max_lote debe ser al menos 1")
+        self.agente = agente
+        self.max_lote = max_lote
+        self.max_espera = max_espera_ms / 1000
+        self.recarga_segundos = recarga_segundos
+        self._cola = None
+        self._tarea = None
+        self._tarea_recarga = None
+        self.recargas = 0
+        self._ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prediccion")
+        self.lotes = 0
+        self.peticiones = 0
+        self.tiempo_modelo = 0.0
+
+    def iniciar(self):
+        self._cola = asyncio.Queue()
+        self._tarea = asyncio.create_task(self._bucle())
+        if self.recarga_segundos:
+            self._tarea_recarga = asyncio.create_task(self._vigilar_modelo())
+
+    async def detener(self):
+        for tarea in (self._tarea, self._tarea_recarga):
+            if tarea is not None:
+                tarea.cancel()
+                try:
+                    await tarea
+                except asyncio.CancelledError:
+                    pass
+        self._ejecutor.shutdown(wait=True)
+
+    async def _vigilar_modelo(self):
+        # La carga corre en otro hilo: el lote en curso termina con el modelo anterior y el siguiente usa el nuevo
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="recarga") as ejecutor:
+            while True:
+                await asyncio.sleep(self.recarga_segundos)
+                if await loop.run_in_executor(ejecutor, self.agente.percepcion.recargar_si_cambio):
+                    self.recargas += 1
+                    print(f"🔄 Modelo recargado (versión {self.agente.percepcion.version_cargada})")
+
+    async def analizar(self, respuestas, tipo_objetivo=None):
+        if not isinstance(respuestas, list) or len(respuestas) != 60:
+            raise ValueError("Debe ingresar exactamente 60 respuestas")
+        if not all(isinstance(r, (int, float)) and not isinstance(r, bool) for r in respuestas):
+            raise ValueError("Las respuestas deben ser numéricas")
+        futuro = asyncio.get_running_loop().create_future()
+        await self._cola.put((respuestas, tipo_objetivo, futuro))
+        return await futuro
+
+    async def _juntar_lote(self):
+        lote = [await self._cola.get()]
+        limite = time.perf_counter() + self.max_espera
+        while len(lote) < self.max_lote:
+            restante = limite - time.perf_counter()
+            if restante <= 0:
+                break
+            try:
+                lote.append(await asyncio.wait_for(self._cola.get(), restante))
+            except asyncio.TimeoutError:
+                break
+        # Lo que ya esté encolado entra sin esperar más
+        while len(lote) < self.max_lote and not self._cola.empty():
+            lote.append(self._cola.get_nowait())
+        return lote
+
+    async def _bucle(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            lote = await self._juntar_lote()
+            matriz = [respuestas for respuestas, _, _ in lote]
+            t0 = time.perf_counter()
+            try:
+                clases, probabilidades = await loop.run_in_executor(
+                    self._ejecutor, self.agente.percepcion.probabilidades, matriz, self.max_lote
+                )
+            except Exception as error:
+                for _, _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(error)
+                continue
+            self.tiempo_modelo += time.perf_counter() - t0
+            self.lotes += 1
+            self.peticiones += len(lote)
+
+            objetivos = [tipo_objetivo for _, tipo_objetivo, _ in lote]
+            try:
+                resultados = self.agente.analizar_probabilidades(probabilidades, objetivos, clases)
+            except Exception as error:
+                for _, _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(error)
+                continue
+            for (_, _, futuro), resultado in zip(lote, resultados):
+                if not futuro.done():
+                    futuro.set_result(resultado)
+
+    def estadisticas(self):
+        return {
+            "max_lote": self.max_lote,
+            "max_espera_ms": self.max_espera * 1000,
+            "lotes": self.lotes,
+            "peticiones": self.peticiones,
+            "tamano_medio_lote": self.peticiones / self.lotes if self.lotes else 0.0,
+            "ms_modelo_por_lote": self.tiempo_modelo * 1000 / self.lotes if self.lotes else 0.0,
+            "version_modelo": self.agente.percepcion.version_cargada,
+            "recargas": self.recargas,
+        }
+
+
+class ServidorPredicciones:
+    """Servidor HTTP/1.1 mínimo (con keep-alive) sobre asyncio.start_server."""
+
+    def __init__(self, loteador, host="127.0.0.1", puerto=8080):
+        self.loteador = loteador
+        self.host = host
+        self.puerto = puerto
+
+    async def _responder(self, escritor, estado, cuerpo, mantener):
+        datos = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+        razones = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large", 500: "Internal Server Error"}
+        cabecera = (
+            f"HTTP/1.1 {estado} {razones[estado]}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(datos)}\r\n"
+            f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n"
+        )
+        escritor.write(cabecera.encode("latin1") + datos)
+        await escritor.drain()
+
+    async def _atender(self, metodo, ruta, cuerpo):
+        if metodo == "GET" and ruta == "/salud":
+            return 200, {"estado": "ok"}
+        if metodo == "GET" and ruta == "/estadisticas":
+            return 200, self.loteador.estadisticas()
+        if metodo == "POST" and ruta == "/analizar":
+            try:
+                datos = json.loads(cuerpo or b"{}")
+                resultado = await self.loteador.analizar(datos.get("respuestas"), datos.get("tipo_objetivo"))
+            except (ValueError, AttributeError) as error:
+                return 400, {"error": str(error)}
+            return 200, resultado
+        return 404, {"error": f"Ruta no encontrada: {metodo} {ruta}"}
+
+    async def _conexion(self, lector, escritor):
+        try:
+            while True:
+                linea = await lector.readline()
+                if not linea:
+                    break
+                try:
+                    metodo, ruta, version = linea.decode("latin1").split()
+                except ValueError:
+                    await self._responder(escritor, 400, {"error": "Línea de petición inválida"}, False)
+                    break
+
+                cabeceras = {}
+                while True:
+                    linea = await lector.readline()
+                    if linea in (b"\r\n", b"\n", b""):
+                        break
+                    nombre, _, valor = linea.decode("latin1").partition(":")
+                    cabeceras[nombre.strip().lower()] = valor.strip()
+
+                longitud = int(cabeceras.get("content-length", 0) or 0)
+                conexion = cabeceras.get("connection", "").lower()
+                mantener = conexion != "close" and (version == "HTTP/1.1" or conexion == "keep-alive")
+                if longitud > MAX_CUERPO:
+                    await self._responder(escritor, 413, {"error": "Cuerpo demasiado grande"}, False)
+                    break
+                cuerpo = await lector.readexactly(longitud) if longitud else b""
+
+                try:
+                    estado, respuesta = await self._atender(metodo, ruta, cuerpo)
+                except Exception as error:
+                    estado, respuesta = 500, {"error": str(error)}
+                await self._responder(escritor, estado, respuesta, mantener)
+                if not mantener:
+                    break
+        except (ConnectionResetError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            escritor.close()
+
+    async def servir(self):
+        self.loteador.iniciar()
+        servidor = await asyncio.start_server(self._conexion, self.host, self.puerto)
+        print(f"🌐 Servidor de predicciones en http://{self.host}:{self.puerto} "
+              f"(max_lote={self.loteador.max_lote}, max_espera_ms={self.loteador.max_espera * 1000:g})")
+        try:
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            await self.loteador.detener()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor HTTP de predicciones MBTI con micro-lotes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--max-lote", type=int, default=256, help="Máximo de peticiones por pasada del modelo")
+    parser.add_argument("--max-espera-ms", type=float, default=5.0, help="Espera máxima para completar un lote")
+    parser.add_argument("--motor", choices=["keras", "numpy", "int8"], default="keras")
+    parser.add_argument("--modelo", default=None, help="Ruta del modelo .h5 (el .npz se busca al lado)")
+    parser.add_argument("--metricas-puerto", type=int, default=None,
+                        help="Activar la instrumentación y servir GET /metrics en este puerto")
+    parser.add_argument("--recarga-segundos", type=float, default=None,
+                        help="Revisar cada N segundos si el modelo cambió en disco y recargarlo en caliente")
+    args = parser.parse_args()
+
+    if args.metricas_puerto is not None:
+        instrumentacion.activar(instrumentacion.SumideroPrometheus()).servir(args.host, args.metricas_puerto)
+    agente = AgentePersonalidad(args.modelo, motor=args.motor)
+    loteador = MicroLoteador(agente, max_lote=args.max_lote, max_espera_ms=args.max_espera_ms,
+                            recarga_segundos=args.recarga_segundos)
+    try:
+        asyncio.run(ServidorPredicciones(loteador, args.host, args.puerto).servir())
+    except KeyboardInterrupt:
+        print("👋 Servidor detenido")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los módulos viven en src/ y se importan por nombre (como hacen entre ellos)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
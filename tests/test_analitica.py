@@ -0,0 +1,81 @@
+"""AcumuladorCohorte: combinar parciales da lo mismo que acumular toda la cohorte de una vez."""
+
+import numpy as np
+import pytest
+
+from agente import AgentePersonalidad
+from analitica import _CONTADORES, AcumuladorCohorte
+from razonamiento import TIPOS_MBTI
+
+
+def _cohorte(semilla, n=3000):
+    """Softmax aleatorios con las columnas en un orden de clases barajado (como un label_mapping cualquiera)."""
+    rng = np.random.default_rng(semilla)
+    clases = np.array(TIPOS_MBTI)[rng.permutation(16)]
+    return rng.dirichlet(np.full(16, 0.3), n), clases
+
+
+def _assert_iguales(a, b):
+    assert a.filas == b.filas
+    assert a.filas_distribucion == b.filas_distribucion
+    for nombre in _CONTADORES:
+        np.testing.assert_allclose(getattr(a, nombre), getattr(b, nombre), rtol=1e-12, err_msg=nombre)
+
+
+def test_combinar_igual_a_acumular_todo():
+    probabilidades, clases = _cohorte(0)
+    completo = AcumuladorCohorte().actualizar(probabilidades, clases)
+
+    cortes = [0, 1, 700, 701, 2500, len(probabilidades)]
+    parciales = [AcumuladorCohorte().actualizar(probabilidades[a:b], clases) for a, b in zip(cortes, cortes[1:])]
+    combinado = AcumuladorCohorte()
+    for parcial in parciales:
+        combinado.combinar(parcial)
+
+    _assert_iguales(combinado, completo)
+    _assert_iguales(AcumuladorCohorte.combinar_todos(parciales), completo)
+    assert combinado.resumen(["ENFP", "INTJ"]) == completo.resumen(["ENFP", "INTJ"])
+
+
+def test_combinar_resultados_compuestos_igual_a_acumular_todo():
+    """Lo mismo por el camino de los JSONL de main.py (resultados ya compuestos, con un parcial vacío)."""
+    probabilidades, clases = _cohorte(1, 600)
+    resultados = AgentePersonalidad._componer_lote(clases, probabilidades, [None] * len(probabilidades))
+    completo = AcumuladorCohorte().actualizar_resultados(resultados)
+
+    combinado = AcumuladorCohorte.combinar_todos([
+        AcumuladorCohorte().actualizar_resultados(resultados[:250]),
+        AcumuladorCohorte().actualizar_resultados([]),
+        AcumuladorCohorte().actualizar_resultados(resultados[250:]),
+    ])
+    _assert_iguales(combinado, completo)
+    assert combinado.resumen() == completo.resumen()
+
+
+def test_filas_sin_puntuar_no_cuentan():
+    probabilidades, clases = _cohorte(2, 50)
+    resultados = AgentePersonalidad._componer_lote(clases, probabilidades, [None] * len(probabilidades))
+    con_faltantes = resultados[:20] + [{"error": "respuestas faltantes", "preguntas_faltantes": [3]}] + resultados[20:]
+    _assert_iguales(AcumuladorCohorte().actualizar_resultados(con_faltantes),
+                    AcumuladorCohorte().actualizar_resultados(resultados))
+
+
+def test_guardar_y_cargar_conserva_los_contadores(tmp_path):
+    probabilidades, clases = _cohorte(3, 500)
+    acumulador = AcumuladorCohorte().actualizar(probabilidades, clases)
+    ruta = str(tmp_path / "parcial.npz")
+    acumulador.guardar(ruta)
+    cargado = AcumuladorCohorte.cargar(ruta)
+    _assert_iguales(cargado, acumulador)
+
+    # Combinar un parcial cargado de disco con otro en memoria sigue siendo la suma
+    otro = AcumuladorCohorte().actualizar(*_cohorte(4, 200))
+    esperado = AcumuladorCohorte.combinar_todos([acumulador, otro])
+    _assert_iguales(cargado.combinar(otro), esperado)
+
+
+def test_actualizar_valida_la_forma():
+    with pytest.raises(ValueError, match="matriz"):
+        AcumuladorCohorte().actualizar(np.ones((3, 15)), TIPOS_MBTI[:15])
+    with pytest.raises(ValueError, match="vacía"):
+        AcumuladorCohorte().resumen()
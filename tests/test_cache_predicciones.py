@@ -0,0 +1,90 @@
+"""Caché LRU de predicciones de SistemaPercepcion y su clave empaquetada."""
+
+import os
+
+import numpy as np
+import pytest
+
+from paquete import escribir_paquete
+from percepcion import SistemaPercepcion, clave_respuestas
+from razonamiento import TIPOS_MBTI
+
+
+def _publicar_modelo(sistema, semilla, momento):
+    """Escribe un paquete con pesos aleatorios junto al modelo y le pone una fecha de modificación propia."""
+    rng = np.random.default_rng(semilla)
+    capas = [(rng.normal(0, 0.5, (60, 8)), rng.normal(0, 0.1, 8), "relu"),
+             (rng.normal(0, 0.5, (8, 16)), rng.normal(0, 0.1, 16), "softmax")]
+    escribir_paquete(sistema.ruta_paquete, capas, np.zeros(60), np.ones(60), TIPOS_MBTI)
+    os.utime(sistema.ruta_paquete, ns=(momento, momento))
+
+
+@pytest.fixture
+def sistema(tmp_path):
+    sistema = SistemaPercepcion(str(tmp_path / "modelo.h5"), motor="numpy", tamano_cache=2)
+    _publicar_modelo(sistema, 0, 1_000_000_000)
+    sistema.cargar_modelo()
+    return sistema
+
+
+def test_clave_respuestas():
+    rng = np.random.default_rng(0)
+    respuestas = rng.integers(-3, 4, (2000, 60))
+    claves = {clave_respuestas(fila) for fila in respuestas}
+    assert len(claves) == len({tuple(fila) for fila in respuestas.tolist()})
+    assert all(len(clave) == 23 for clave in claves)  # 60 respuestas x 3 bits
+
+    fila = respuestas[0]
+    assert clave_respuestas(fila.tolist()) == clave_respuestas(fila.astype(np.float32)) == clave_respuestas(fila)
+    assert clave_respuestas([0.5] + [0] * 59) is None
+    assert clave_respuestas([4] + [0] * 59) is None
+    assert clave_respuestas(["a"] * 60) is None
+
+
+def test_lru_aciertos_fallos_y_desalojo(sistema):
+    a, b, c = ([v] * 60 for v in (-2, 0, 2))
+    sin_cache = SistemaPercepcion(sistema.ruta_modelo, motor="numpy")
+    esperado = {tuple(x): sin_cache.predecir_distribucion(x) for x in (a, b, c)}
+
+    for x, acierto in ((a, False), (b, False), (a, True), (c, False), (b, False), (a, False)):
+        antes = sistema.cache_aciertos
+        tipo, confianza, probabilidades, _ = sistema.predecir_distribucion(x)
+        assert (sistema.cache_aciertos > antes) == acierto
+        assert tipo == esperado[tuple(x)][0]
+        np.testing.assert_allclose(probabilidades, esperado[tuple(x)][2])
+
+    # Después de a, b, a, c se desaloja b (la menos usada); luego b desaloja a y a desaloja c
+    estadisticas = sistema.estadisticas_cache()
+    assert estadisticas == {"capacidad": 2, "entradas": 2, "aciertos": 1, "fallos": 5, "tasa_aciertos": 1 / 6}
+
+
+def test_respuestas_no_enteras_no_se_cachean(sistema):
+    x = [0.5] * 60
+    sistema.predecir(x)
+    sistema.predecir(x)
+    assert sistema.estadisticas_cache()["entradas"] == 0
+    assert sistema.cache_aciertos == 0
+
+
+def test_sin_capacidad_no_guarda_nada(tmp_path):
+    sistema = SistemaPercepcion(str(tmp_path / "modelo.h5"), motor="numpy")
+    _publicar_modelo(sistema, 0, 1_000_000_000)
+    for _ in range(3):
+        sistema.predecir([1] * 60)
+    assert sistema.estadisticas_cache()["entradas"] == 0
+    assert sistema.cache_aciertos == sistema.cache_fallos == 0
+
+
+def test_recarga_vacia_la_cache(sistema):
+    x = [1] * 60
+    anterior = sistema.predecir_distribucion(x)[2]
+    assert sistema.estadisticas_cache()["entradas"] == 1
+
+    _publicar_modelo(sistema, 1, 2_000_000_000)
+    assert sistema.recargar_si_cambio()
+    assert sistema.estadisticas_cache()["entradas"] == 0
+
+    nueva = sistema.predecir_distribucion(x)[2]
+    referencia = SistemaPercepcion(sistema.ruta_modelo, motor="numpy").predecir_distribucion(x)[2]
+    np.testing.assert_allclose(nueva, referencia)
+    assert not np.allclose(nueva, anterior)
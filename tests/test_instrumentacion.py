@@ -0,0 +1,201 @@
+"""Sumideros de métricas: agregación en memoria, líneas JSON y formato de texto de Prometheus."""
+
+import io
+import json
+import re
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+import instrumentacion
+from instrumentacion import (LIMITES_POR_METRICA, LIMITES_SEGUNDOS, SumideroCompuesto, SumideroJSON, SumideroMemoria,
+                             SumideroPrometheus)
+from razonamiento import SistemaRazonamiento
+
+# Una muestra del formato de texto: nombre{etiqueta="valor",...} número
+MUESTRA = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[a-zA-Z_][a-zA-Z0-9_]*="[^"]*"(,[a-zA-Z_][a-zA-Z0-9_]*="[^"]*")*\})? \S+$')
+
+
+@pytest.fixture
+def activar():
+    """Activa un sumidero durante la prueba y deja la instrumentación desactivada al terminar."""
+    yield instrumentacion.activar
+    instrumentacion.desactivar()
+
+
+def test_desactivada_no_registra(activar):
+    memoria = SumideroMemoria()
+    instrumentacion.desactivar()
+    instrumentacion.contar("eventos_total")
+    instrumentacion.observar("etapa_segundos", 0.1)
+    assert instrumentacion.SUMIDERO is None
+
+    activar(memoria)
+    instrumentacion.desactivar()
+    instrumentacion.contar("eventos_total")
+    assert memoria.contadores == {} and memoria.histogramas == {}
+
+
+def test_memoria_cuenta_por_nombre_y_etiquetas(activar):
+    memoria = activar(SumideroMemoria())
+    instrumentacion.contar("eventos_total")
+    instrumentacion.contar("eventos_total", 4)
+    instrumentacion.contar("eventos_total", modo="a", etapa=1)
+    instrumentacion.contar("eventos_total", etapa="1", modo="a")  # mismas etiquetas en otro orden y como texto
+
+    assert memoria.contadores == {
+        ("eventos_total", ()): 5,
+        ("eventos_total", (("etapa", "1"), ("modo", "a"))): 2,
+    }
+    assert memoria.resumen()["contadores"] == {"eventos_total": 5, "eventos_total{etapa=1,modo=a}": 2}
+
+
+def test_memoria_histograma_buckets_y_limites(activar):
+    memoria = activar(SumideroMemoria())
+    for valor in (0.00001, 0.0002, 0.0002, 7.0):
+        instrumentacion.observar("etapa_segundos", valor, etapa="percepcion")
+    for valor in (1, 3, 300):
+        instrumentacion.observar("a_estrella_nodos_expandidos", valor)
+
+    histograma = memoria.histogramas[("etapa_segundos", (("etapa", "percepcion"),))]
+    assert histograma["limites"] == LIMITES_SEGUNDOS
+    assert histograma["conteo"] == 4
+    assert histograma["suma"] == pytest.approx(7.00041)
+    assert (histograma["minimo"], histograma["maximo"]) == (0.00001, 7.0)
+    # Cada valor cae en el primer bucket cuyo límite es >= valor; los mayores al último, en +Inf
+    esperado = [0] * (len(LIMITES_SEGUNDOS) + 1)
+    esperado[0], esperado[LIMITES_SEGUNDOS.index(0.0005)], esperado[-1] = 1, 2, 1
+    assert histograma["buckets"] == esperado
+
+    nodos = memoria.histogramas[("a_estrella_nodos_expandidos", ())]
+    assert nodos["limites"] == LIMITES_POR_METRICA["a_estrella_nodos_expandidos"]
+    assert nodos["buckets"][0] == 1 and nodos["buckets"][2] == 1 and nodos["buckets"][-1] == 1
+
+    resumen = memoria.resumen()["histogramas"]["etapa_segundos{etapa=percepcion}"]
+    assert resumen["promedio"] == pytest.approx(7.00041 / 4)
+    assert resumen["buckets"]["+Inf"] == 1 and sum(resumen["buckets"].values()) == 4
+
+
+def test_memoria_tasa_aciertos_cache(activar):
+    memoria = activar(SumideroMemoria())
+    assert "tasa_aciertos_cache" not in memoria.resumen()
+    for resultado in ("acierto", "acierto", "acierto", "fallo"):
+        instrumentacion.contar("cache_predicciones_total", resultado=resultado)
+    assert memoria.resumen()["tasa_aciertos_cache"] == 0.75
+
+    memoria.reiniciar()
+    assert memoria.resumen() == {"contadores": {}, "histogramas": {}}
+
+
+def test_memoria_segura_entre_hilos(activar):
+    memoria = activar(SumideroMemoria())
+
+    def registrar():
+        for _ in range(2000):
+            instrumentacion.contar("eventos_total", hilo="todos")
+            instrumentacion.observar("etapa_segundos", 0.001)
+
+    hilos = [threading.Thread(target=registrar) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert memoria.contadores[("eventos_total", (("hilo", "todos"),))] == 16000
+    assert memoria.histogramas[("etapa_segundos", ())]["conteo"] == 16000
+
+
+def test_a_estrella_instrumentada(activar):
+    memoria = activar(SumideroMemoria())
+    resultado = SistemaRazonamiento.busqueda_a_estrella("ISTJ", "ENFP", mode="unit")
+    contadores = memoria.resumen()["contadores"]
+    assert contadores["a_estrella_nodos_expandidos_total{mode=unit}"] == len(resultado["nodos_explorados"])
+    assert contadores["a_estrella_inserciones_frontera_total{mode=unit}"] == resultado["inserciones_frontera"]
+
+
+def test_prometheus_formato_de_texto(activar):
+    prometheus = activar(SumideroPrometheus())
+    instrumentacion.contar("analisis_total", 3)
+    instrumentacion.contar("cache_predicciones_total", resultado="acierto")
+    instrumentacion.contar("cache_predicciones_total", 2, resultado="fallo")
+    for valor in (1, 5, 5, 1000):
+        instrumentacion.observar("a_estrella_nodos_expandidos", valor, mode="unit")
+
+    texto = prometheus.exposicion()
+    assert texto.endswith("\n")
+    lineas = texto.splitlines()
+    for linea in lineas:
+        assert linea.startswith("# TYPE ") or MUESTRA.match(linea), linea
+    # Un solo TYPE por métrica, antes de sus muestras
+    assert lineas.count("# TYPE mbti_cache_predicciones_total counter") == 1
+    assert lineas.index("# TYPE mbti_cache_predicciones_total counter") < lineas.index(
+        'mbti_cache_predicciones_total{resultado="acierto"} 1')
+    assert "mbti_analisis_total 3" in lineas
+    assert 'mbti_cache_predicciones_total{resultado="fallo"} 2' in lineas
+    assert "# TYPE mbti_a_estrella_nodos_expandidos histogram" in lineas
+
+    # Buckets acumulados (le = "menor o igual"), el de +Inf igual al conteo, más _sum y _count
+    buckets = {}
+    for linea in lineas:
+        coincidencia = re.match(r'mbti_a_estrella_nodos_expandidos_bucket\{mode="unit",le="([^"]+)"\} (\d+)$', linea)
+        if coincidencia:
+            buckets[coincidencia.group(1)] = int(coincidencia.group(2))
+    limites = LIMITES_POR_METRICA["a_estrella_nodos_expandidos"]
+    assert list(buckets) == [str(l) for l in limites] + ["+Inf"]
+    assert buckets["1"] == 1 and buckets["4"] == 1 and buckets["8"] == 3 and buckets["256"] == 3
+    assert buckets["+Inf"] == 4
+    assert list(buckets.values()) == sorted(buckets.values())
+    assert 'mbti_a_estrella_nodos_expandidos_sum{mode="unit"} 1011.0' in lineas
+    assert 'mbti_a_estrella_nodos_expandidos_count{mode="unit"} 4' in lineas
+
+
+def test_prometheus_servir_por_http(activar):
+    prometheus = activar(SumideroPrometheus())
+    instrumentacion.contar("analisis_total")
+    servidor = prometheus.servir(puerto=0)
+    try:
+        url = f"http://127.0.0.1:{servidor.server_port}"
+        with urllib.request.urlopen(f"{url}/metrics", timeout=5) as respuesta:
+            assert respuesta.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert respuesta.read().decode("utf-8") == prometheus.exposicion()
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{url}/otra", timeout=5)
+        assert error.value.code == 404
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+def test_json_una_linea_por_evento(activar):
+    destino = io.StringIO()
+    sumidero = activar(SumideroJSON(destino))
+    instrumentacion.contar("analisis_total")
+    instrumentacion.observar("etapa_segundos", 0.25, etapa="razonamiento")
+    sumidero.cerrar()
+
+    eventos = [json.loads(linea) for linea in destino.getvalue().splitlines()]
+    assert [(e["tipo"], e["nombre"], e["valor"], e["etiquetas"]) for e in eventos] == [
+        ("contador", "analisis_total", 1, {}),
+        ("histograma", "etapa_segundos", 0.25, {"etapa": "razonamiento"}),
+    ]
+    assert all(isinstance(e["ts"], float) for e in eventos)
+    assert not destino.closed  # un archivo ajeno no se cierra
+
+
+def test_json_a_ruta(activar, tmp_path):
+    ruta = tmp_path / "metricas.jsonl"
+    sumidero = activar(SumideroJSON(str(ruta)))
+    instrumentacion.contar("analisis_total", 2)
+    sumidero.cerrar()
+    assert json.loads(ruta.read_text(encoding="utf-8"))["valor"] == 2
+
+
+def test_compuesto_reenvia_a_todos(activar):
+    memoria, prometheus = SumideroMemoria(), SumideroPrometheus()
+    activar(SumideroCompuesto(memoria, prometheus))
+    instrumentacion.contar("analisis_total")
+    instrumentacion.observar("etapa_segundos", 0.5)
+    for sumidero in (memoria, prometheus):
+        assert sumidero.contadores == {("analisis_total", ()): 1}
+        assert sumidero.histogramas[("etapa_segundos", ())]["conteo"] == 1
@@ -0,0 +1,95 @@
+"""MatrizConfusion contra scikit-learn y combinación de matrices parciales."""
+
+import hashlib
+
+import numpy as np
+import pytest
+
+from metricas import MatrizConfusion
+from percepcion import sha256_archivo
+from razonamiento import TIPOS_MBTI
+
+sklearn_metrics = pytest.importorskip("sklearn.metrics")
+
+PRECISION = 5e-5  # las métricas se redondean a 4 decimales
+
+
+def _datos(semilla, n=5000):
+    """Etiquetas y softmax aleatorios; la última clase nunca se predice (precisión 0 sin división por cero)."""
+    rng = np.random.default_rng(semilla)
+    probabilidades = rng.dirichlet(np.ones(16), n)
+    probabilidades[:, 15] = 0.0
+    probabilidades /= probabilidades.sum(axis=1, keepdims=True)
+    reales = rng.integers(0, 16, n)
+    return reales, probabilidades.argmax(axis=1), probabilidades
+
+
+def _matriz(reales, predichas, probabilidades):
+    return MatrizConfusion(TIPOS_MBTI).actualizar(reales, predichas, probabilidades[np.arange(len(reales)), reales])
+
+
+@pytest.mark.parametrize("semilla", [0, 1, 2])
+def test_metricas_iguales_a_sklearn(semilla):
+    reales, predichas, probabilidades = _datos(semilla)
+    # La clase que nunca se predice tiene probabilidad 0: se recorta igual que hace log_loss de sklearn
+    probabilidades = np.clip(probabilidades, 1e-15, 1.0)
+    probabilidades /= probabilidades.sum(axis=1, keepdims=True)
+    matriz = _matriz(reales, predichas, probabilidades)
+    resultado = matriz.metricas()
+
+    etiquetas = list(range(16))
+    np.testing.assert_array_equal(matriz.valores, sklearn_metrics.confusion_matrix(reales, predichas, labels=etiquetas))
+    assert resultado["exactitud"] == pytest.approx(sklearn_metrics.accuracy_score(reales, predichas), abs=PRECISION)
+    assert resultado["log_loss"] == pytest.approx(sklearn_metrics.log_loss(reales, probabilidades, labels=etiquetas),
+                                                  abs=PRECISION)
+
+    precision, recall, f1, soporte = sklearn_metrics.precision_recall_fscore_support(
+        reales, predichas, labels=etiquetas, zero_division=0
+    )
+    for i, clase in enumerate(TIPOS_MBTI):
+        por_clase = resultado["por_clase"][clase]
+        assert por_clase["precision"] == pytest.approx(precision[i], abs=PRECISION)
+        assert por_clase["recall"] == pytest.approx(recall[i], abs=PRECISION)
+        assert por_clase["f1"] == pytest.approx(f1[i], abs=PRECISION)
+        assert por_clase["soporte"] == soporte[i]
+    assert resultado["por_clase"][TIPOS_MBTI[15]]["precision"] == 0.0
+
+    for nombre, promedio in (("macro", "macro"), ("ponderado", "weighted")):
+        p, r, f, _ = sklearn_metrics.precision_recall_fscore_support(
+            reales, predichas, labels=etiquetas, average=promedio, zero_division=0
+        )
+        assert resultado[nombre]["precision"] == pytest.approx(p, abs=PRECISION)
+        assert resultado[nombre]["recall"] == pytest.approx(r, abs=PRECISION)
+        assert resultado[nombre]["f1"] == pytest.approx(f, abs=PRECISION)
+
+
+def test_combinar_igual_a_acumular_todo():
+    reales, predichas, probabilidades = _datos(3)
+    completa = _matriz(reales, predichas, probabilidades)
+
+    cortes = [0, 7, 1200, 3333, len(reales)]
+    partes = [_matriz(reales[a:b], predichas[a:b], probabilidades[a:b]) for a, b in zip(cortes, cortes[1:])]
+    combinada = MatrizConfusion(TIPOS_MBTI)
+    for parte in partes:
+        combinada.combinar(parte)
+
+    np.testing.assert_array_equal(combinada.valores, completa.valores)
+    assert combinada.suma_log_loss == pytest.approx(completa.suma_log_loss)
+    assert combinada.metricas() == completa.metricas()
+
+
+def test_combinar_rechaza_otras_clases():
+    with pytest.raises(ValueError, match="mismas clases"):
+        MatrizConfusion(TIPOS_MBTI).combinar(MatrizConfusion(TIPOS_MBTI[::-1]))
+
+
+def test_matriz_vacia_sin_metricas():
+    with pytest.raises(ValueError, match="vacía"):
+        MatrizConfusion(TIPOS_MBTI).metricas()
+
+
+def test_sha256_archivo_por_bloques(tmp_path):
+    datos = np.random.default_rng(0).bytes(3 * 1024 + 17)
+    ruta = tmp_path / "datos.bin"
+    ruta.write_bytes(datos)
+    assert sha256_archivo(str(ruta), tamano_bloque=1024) == hashlib.sha256(datos).hexdigest()
@@ -0,0 +1,70 @@
+"""Paridad de los motores NumPy (float e int8) con la salida de Keras."""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("tensorflow")
+
+from motor_numpy import MotorInt8, MotorNumPy, exportar_int8, exportar_npz
+
+TOLERANCIA_FLOAT = 1e-4  # la misma de verificar_paridad
+# Escala simétrica por capa: con 3 capas la probabilidad se desvía hasta ~0.035 aquí y ~0.03 con el modelo real
+TOLERANCIA_INT8 = 5e-2
+
+
+@pytest.fixture(scope="module")
+def modelo_y_datos():
+    """Red como la de construir_modelo (Dense -> BatchNormalization -> Dropout) entrenada, con BatchNormalization no trivial."""
+    import tensorflow as tf
+    from tensorflow.keras.layers import BatchNormalization, Dense, Dropout, Input
+    from tensorflow.keras.models import Sequential
+
+    tf.keras.utils.set_random_seed(0)
+    modelo = Sequential([Input(shape=(60,))])
+    for ancho in (32, 16):
+        modelo.add(Dense(ancho, activation="relu"))
+        modelo.add(BatchNormalization())
+        modelo.add(Dropout(0.3))
+    modelo.add(Dense(16, activation="softmax"))
+
+    rng = np.random.default_rng(0)
+    for capa in modelo.layers:
+        if isinstance(capa, BatchNormalization):
+            gamma, beta, _, _ = capa.get_weights()
+            capa.set_weights([
+                rng.uniform(0.5, 1.5, gamma.shape).astype(np.float32),
+                rng.normal(0, 0.2, beta.shape).astype(np.float32),
+                *capa.get_weights()[2:],
+            ])
+
+    # Unas épocas sobre 16 grupos separados (como los tipos en las respuestas del cuestionario) dan
+    # salidas decididas, como las del modelo real, y dejan medias y varianzas móviles de
+    # BatchNormalization distintas de 0 y 1
+    centros = rng.normal(0, 1.5, (16, 60))
+    y = rng.integers(0, 16, 4096)
+    X = (centros[y] + rng.standard_normal((4096, 60))).astype(np.float32)
+    modelo.compile(optimizer="adam", loss="sparse_categorical_crossentropy")
+    modelo.fit(X, y, epochs=15, batch_size=128, verbose=0)
+    return modelo, X, modelo.predict(X, batch_size=len(X), verbose=0)
+
+
+def test_paridad_motor_numpy(modelo_y_datos, tmp_path):
+    modelo, X, esperado = modelo_y_datos
+    ruta = str(tmp_path / "modelo.npz")
+    exportar_npz(modelo, ruta)
+    obtenido = MotorNumPy(ruta).predict(X)
+
+    assert np.max(np.abs(obtenido - esperado)) <= TOLERANCIA_FLOAT
+    np.testing.assert_array_equal(np.argmax(obtenido, axis=1), np.argmax(esperado, axis=1))
+
+
+def test_paridad_motor_int8(modelo_y_datos, tmp_path):
+    modelo, X, esperado = modelo_y_datos
+    ruta_npz = str(tmp_path / "modelo.npz")
+    exportar_npz(modelo, ruta_npz)
+    ruta_int8 = str(tmp_path / "modelo.int8.npz")
+    exportar_int8(MotorNumPy(ruta_npz).capas, X[:512], ruta_int8)
+    obtenido = MotorInt8(ruta_int8).predict(X)
+
+    assert np.max(np.abs(obtenido - esperado)) <= TOLERANCIA_INT8
+    np.testing.assert_array_equal(np.argmax(obtenido, axis=1), np.argmax(esperado, axis=1))
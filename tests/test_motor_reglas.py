@@ -0,0 +1,124 @@
+"""Motor de reglas: encadenamiento hacia adelante indexado contra la referencia sin índice."""
+
+import json
+import random
+
+import pytest
+
+from motor_reglas import MotorReglas, Regla, agrupar_hechos, cargar_reglas, leer_reglas
+from razonamiento import DIRECTORIO_REGLAS, TIPOS_MBTI, SistemaRazonamiento, _hechos_iniciales
+
+
+def _escribir(ruta, reglas):
+    ruta.write_text(json.dumps({"reglas": reglas}), encoding="utf-8")
+    return str(ruta)
+
+
+@pytest.fixture
+def motor():
+    return MotorReglas([
+        Regla("ab_c", ("A", "B"), ("C",), "A y B dan C"),
+        Regla("c_d", ("C",), ("D", "categoria:d")),
+        Regla("de_f", ("D", "E"), ("F",)),  # E nunca se deriva: no se dispara
+        Regla("d_c", ("D",), ("C",)),       # ciclo: C ya es un hecho, no se vuelve a agregar
+    ])
+
+
+def test_inferir_encadena_hasta_el_punto_fijo(motor):
+    inferencia = motor.inferir(["A", "B"])
+    assert inferencia.hechos == ("A", "B", "C", "D", "categoria:d")
+    assert inferencia.disparadas == ("ab_c", "c_d", "d_c")
+    assert inferencia.explicaciones == ("A y B dan C",)
+    # A y B tocan ab_c, C toca c_d, D toca de_f y d_c
+    assert inferencia.evaluaciones == 5
+
+
+def test_inferir_sin_antecedentes_completos_no_dispara(motor):
+    inferencia = motor.inferir(["A", "E"])
+    assert inferencia.hechos == ("A", "E")
+    assert inferencia.disparadas == ()
+
+
+def test_inferir_igual_a_sin_indice_en_reglas_aleatorias():
+    rng = random.Random(0)
+    hechos = [f"h{i}" for i in range(30)]
+    reglas = [
+        Regla(f"r{i}", tuple(rng.sample(hechos, rng.randint(1, 3))), tuple(rng.sample(hechos, rng.randint(1, 2))))
+        for i in range(80)
+    ]
+    motor = MotorReglas(reglas)
+    for _ in range(200):
+        iniciales = rng.sample(hechos, rng.randint(0, 6))
+        indexada, referencia = motor.inferir(iniciales), motor.inferir_sin_indice(iniciales)
+        assert set(indexada.hechos) == set(referencia.hechos)
+        assert set(indexada.disparadas) == set(referencia.disparadas)
+
+
+@pytest.mark.parametrize("tipo", TIPOS_MBTI)
+def test_base_de_reglas_igual_a_sin_indice(tipo):
+    motor = MotorReglas(cargar_reglas(DIRECTORIO_REGLAS))
+    iniciales = _hechos_iniciales(SistemaRazonamiento.codificar_tipo(tipo))
+    indexada, referencia = motor.inferir(iniciales), motor.inferir_sin_indice(iniciales)
+    assert set(indexada.hechos) == set(referencia.hechos)
+    assert set(indexada.disparadas) == set(referencia.disparadas)
+    assert set(indexada.explicaciones) == set(referencia.explicaciones)
+    assert indexada.disparadas, f"Ninguna regla se dispara para {tipo}"
+
+
+def test_verificar_reglas_cubre_los_16_tipos():
+    assert SistemaRazonamiento.verificar_reglas() == 16
+
+
+def test_razonar_sobre_tipo_devuelve_copias():
+    primero = SistemaRazonamiento.razonar_sobre_tipo("INTJ")
+    primero["razonamiento"].append("modificado")
+    for valores in primero["hechos"].values():
+        valores.append("modificado")
+    segundo = SistemaRazonamiento.razonar_sobre_tipo("INTJ")
+    assert "modificado" not in segundo["razonamiento"]
+    assert all("modificado" not in valores for valores in segundo["hechos"].values())
+
+
+def test_recargar_reglas(tmp_path):
+    _escribir(tmp_path / "b.json", [{"id": "carrera_n", "si": ["N"], "entonces": ["carrera:investigacion"]}])
+    _escribir(tmp_path / "a.json", [{"id": "rasgo_i", "si": ["I"], "entonces": ["rasgo:reservado"],
+                                     "explicacion": "Introvertido"}])
+    try:
+        assert SistemaRazonamiento.recargar_reglas(str(tmp_path)) == 2
+        resultado = SistemaRazonamiento.razonar_sobre_tipo("INTJ")
+        assert resultado["reglas_aplicadas"] == ["rasgo_i", "carrera_n"]
+        assert resultado["hechos"] == {"rasgo": ["reservado"], "carrera": ["investigacion"]}  # solo los derivados
+        assert resultado["razonamiento"] == ["Introvertido"]
+    finally:
+        SistemaRazonamiento.recargar_reglas()
+
+
+def test_cargar_reglas_de_un_directorio_en_orden(tmp_path):
+    _escribir(tmp_path / "2.json", [{"id": "segunda", "si": ["X"], "entonces": ["Y"]}])
+    _escribir(tmp_path / "1.json", [{"si": ["X", "X"], "entonces": ["Z"]}])
+    (tmp_path / "notas.txt").write_text("no es una regla")
+    reglas = cargar_reglas(str(tmp_path))
+    assert [r.id for r in reglas] == ["1.json#0", "segunda"]
+    assert reglas[0].antecedentes == ("X",)  # los hechos repetidos se quitan
+
+
+@pytest.mark.parametrize("entrada, mensaje", [
+    ({"id": "r", "entonces": ["Y"]}, "antecedentes"),
+    ({"id": "r", "si": ["X"]}, "consecuentes"),
+    ({"id": "r", "si": ["X", ""], "entonces": ["Y"]}, "cadenas no vacías"),
+])
+def test_leer_reglas_valida_cada_entrada(tmp_path, entrada, mensaje):
+    ruta = _escribir(tmp_path / "reglas.json", [entrada])
+    with pytest.raises(ValueError, match=mensaje):
+        leer_reglas(ruta)
+
+
+def test_reglas_duplicadas():
+    with pytest.raises(ValueError, match="duplicada"):
+        MotorReglas([Regla("r", ("A",), ("B",)), Regla("r", ("B",), ("C",))])
+
+
+def test_agrupar_hechos():
+    assert agrupar_hechos(["I", "tipo:INTJ", "carrera:ciencia", "carrera:ingenieria", "a:b:c"]) == {
+        "tipo": ["INTJ"], "carrera": ["ciencia", "ingenieria"], "a": ["b:c"],
+    }
@@ -0,0 +1,172 @@
+"""Formato .paquete: ida y vuelta, checksum, alineación y recarga en caliente."""
+
+import json
+import os
+import struct
+import threading
+
+import numpy as np
+import pytest
+
+from paquete import ALINEACION, MAGIA, _alinear, escribir_paquete, leer_paquete
+from percepcion import SistemaPercepcion
+from razonamiento import TIPOS_MBTI
+
+
+def _capas(rng, sesgo_salida=None):
+    """Red pequeña 60 -> 8 (relu) -> 16 (softmax); sesgo_salida fija el sesgo de la última capa."""
+    b1 = rng.normal(0, 0.1, 16) if sesgo_salida is None else np.asarray(sesgo_salida)
+    return [
+        (rng.normal(0, 0.1, (60, 8)), rng.normal(0, 0.1, 8), "relu"),
+        (rng.normal(0, 0.1, (8, 16)), b1, "softmax"),
+    ]
+
+
+@pytest.fixture
+def ruta_paquete(tmp_path):
+    rng = np.random.default_rng(0)
+    ruta = str(tmp_path / "modelo.paquete")
+    escribir_paquete(ruta, _capas(rng), rng.normal(0, 1, 60), rng.uniform(0.5, 2, 60), TIPOS_MBTI,
+                     metadatos={"origen": "prueba"}, version="v1")
+    return ruta
+
+
+@pytest.mark.parametrize("mmap_", [True, False])
+def test_ida_y_vuelta(tmp_path, mmap_):
+    rng = np.random.default_rng(1)
+    capas = _capas(rng)
+    media, escala = rng.normal(0, 1, 60), rng.uniform(0.5, 2, 60)
+    ruta = str(tmp_path / "modelo.paquete")
+    cabecera = escribir_paquete(ruta, capas, media, escala, TIPOS_MBTI, metadatos={"epocas": 3}, version="v7")
+
+    paquete = leer_paquete(ruta, mmap_=mmap_)
+    assert paquete.version == "v7"
+    assert paquete.metadatos == {"epocas": 3}
+    assert paquete.sha256 == cabecera["sha256"]
+    assert paquete.clases.tolist() == TIPOS_MBTI
+    np.testing.assert_array_equal(paquete.media, media)
+    np.testing.assert_array_equal(paquete.escala, escala)
+    assert len(paquete.capas) == len(capas)
+    for (W, b, activacion), (W_esperado, b_esperado, activacion_esperada) in zip(paquete.capas, capas):
+        np.testing.assert_array_equal(W, W_esperado.astype(np.float32))
+        np.testing.assert_array_equal(b, b_esperado.astype(np.float32))
+        assert activacion == activacion_esperada
+    assert not os.path.exists(f"{ruta}.{os.getpid()}.tmp")
+
+
+def test_arreglos_alineados_a_64_bytes(ruta_paquete):
+    with open(ruta_paquete, "rb") as f:
+        assert f.read(len(MAGIA)) == MAGIA
+        (largo,) = struct.unpack("<Q", f.read(8))
+        cabecera = json.loads(f.read(largo).decode("utf-8"))
+    inicio_datos = _alinear(len(MAGIA) + 8 + largo)
+    assert inicio_datos % ALINEACION == 0
+    for descriptor in cabecera["arreglos"].values():
+        assert (inicio_datos + descriptor["desplazamiento"]) % ALINEACION == 0
+
+    # Con mmap los arreglos son vistas del archivo: su dirección conserva la alineación de la página
+    paquete = leer_paquete(ruta_paquete)
+    for W, b, _ in paquete.capas:
+        assert W.ctypes.data % ALINEACION == 0 and b.ctypes.data % ALINEACION == 0
+        assert not W.flags.writeable
+
+
+def test_rechaza_paquete_corrupto(ruta_paquete):
+    with open(ruta_paquete, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        ultimo = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([ultimo[0] ^ 0xFF]))
+    with pytest.raises(ValueError, match="Checksum"):
+        leer_paquete(ruta_paquete)
+    # Sin verificar se puede leer igual (para inspeccionarlo)
+    leer_paquete(ruta_paquete, verificar=False)
+
+
+def test_rechaza_paquete_truncado(ruta_paquete):
+    with open(ruta_paquete, "r+b") as f:
+        f.truncate(os.path.getsize(ruta_paquete) - ALINEACION)
+    with pytest.raises(ValueError, match="truncado"):
+        leer_paquete(ruta_paquete)
+
+
+def test_rechaza_archivo_que_no_es_paquete(tmp_path):
+    ruta = tmp_path / "otro.paquete"
+    ruta.write_bytes(b"no es un paquete")
+    with pytest.raises(ValueError, match="no es un paquete"):
+        leer_paquete(str(ruta))
+
+
+def test_recargar_si_cambio_publica_el_estado_de_una_vez(tmp_path):
+    """
+    Dos paquetes con las clases en orden inverso y el sesgo de salida invertido predicen el mismo tipo.
+    Un estado mezclado (pesos de uno con clases del otro) predeciría el tipo opuesto.
+    """
+    rng = np.random.default_rng(2)
+    sesgo = np.zeros(16)
+    sesgo[0] = 50.0
+    paquete_a = (_capas(rng, sesgo), TIPOS_MBTI)
+    paquete_b = (_capas(rng, sesgo[::-1]), TIPOS_MBTI[::-1])
+    media, escala = np.zeros(60), np.ones(60)
+
+    sistema = SistemaPercepcion(str(tmp_path / "modelo.h5"), motor="numpy")
+    momento = [1_000_000_000]
+
+    def publicar(capas_y_clases):
+        capas, clases = capas_y_clases
+        escribir_paquete(sistema.ruta_paquete, capas, media, escala, clases)
+        # Misma longitud de archivo en ambos paquetes: la fecha de modificación es la que cambia
+        momento[0] += 1_000_000_000
+        os.utime(sistema.ruta_paquete, ns=(momento[0], momento[0]))
+
+    publicar(paquete_a)
+    sistema.cargar_modelo()
+    estado_anterior = sistema._inferencia
+    assert sistema.predecir([0] * 60)[0] == TIPOS_MBTI[0]
+    assert not sistema.recargar_si_cambio()
+
+    publicar(paquete_b)
+    assert sistema.recargar_si_cambio()
+    assert sistema._inferencia is not estado_anterior
+    assert estado_anterior[1].tolist() == TIPOS_MBTI  # el estado anterior queda intacto para quien lo use
+    assert sistema._inferencia[1].tolist() == TIPOS_MBTI[::-1]
+    assert sistema.predecir([0] * 60)[0] == TIPOS_MBTI[0]
+
+    # Predicciones concurrentes con recargas alternadas: nunca ven pesos de un paquete con clases del otro
+    errores, detener = [], threading.Event()
+
+    def predecir_en_bucle():
+        while not detener.is_set():
+            tipo, _, probabilidades, clases = sistema.predecir_distribucion([0] * 60)
+            if tipo != TIPOS_MBTI[0] or clases[int(np.argmax(probabilidades))] != TIPOS_MBTI[0]:
+                errores.append(tipo)
+
+    hilos = [threading.Thread(target=predecir_en_bucle) for _ in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for i in range(20):
+        publicar(paquete_a if i % 2 == 0 else paquete_b)
+        assert sistema.recargar_si_cambio()
+    detener.set()
+    for hilo in hilos:
+        hilo.join()
+    assert errores == []
+
+
+def test_recargar_si_cambio_conserva_el_modelo_si_el_nuevo_esta_corrupto(ruta_paquete, tmp_path):
+    sistema = SistemaPercepcion(str(tmp_path / "modelo.h5"), motor="numpy")
+    assert sistema.ruta_paquete == ruta_paquete
+    sistema.cargar_modelo()
+    estado = sistema._inferencia
+    esperado = sistema.predecir([1] * 60)
+
+    # Se publica como los paquetes buenos (archivo nuevo + os.replace): el cargado sigue mapeando el anterior
+    with open(ruta_paquete, "rb") as f:
+        datos = bytearray(f.read())
+    datos[-1] ^= 0xFF
+    with open(ruta_paquete + ".tmp", "wb") as f:
+        f.write(datos)
+    os.replace(ruta_paquete + ".tmp", ruta_paquete)
+    assert not sistema.recargar_si_cambio()
+    assert sistema._inferencia is estado
+    assert sistema.predecir([1] * 60) == esperado
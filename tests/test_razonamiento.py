@@ -0,0 +1,71 @@
+"""La tabla de planes precalculada y la búsqueda bidireccional contra A* para los 256 pares de cada modo."""
+
+import pytest
+
+from razonamiento import PESOS, TIPOS_MBTI, EspacioMBTI, SistemaRazonamiento
+
+
+def _costo_camino(camino, mode):
+    costo = 0
+    for actual, siguiente in zip(camino, camino[1:]):
+        costos = dict(SistemaRazonamiento.generar_vecinos_con_costos(actual, mode=mode))
+        assert siguiente in costos, f"{actual}->{siguiente} no es una transición válida"
+        costo += costos[siguiente]
+    return costo
+
+
+@pytest.mark.parametrize("mode", ["unit", "weighted"])
+@pytest.mark.parametrize("inicio", TIPOS_MBTI)
+def test_tabla_planes_igual_a_a_estrella(mode, inicio):
+    for objetivo in TIPOS_MBTI:
+        plan = SistemaRazonamiento.planificar(inicio, objetivo, mode=mode)
+        referencia = SistemaRazonamiento.planificar(inicio, objetivo, mode=mode, metodo="a_estrella")
+
+        assert plan["costo"] == referencia["costo"], f"{inicio}->{objetivo}"
+        assert plan["camino"][0] == inicio and plan["camino"][-1] == objetivo
+        # Entre caminos de igual costo la tabla y A* pueden desempatar distinto: basta con que sea válido
+        assert _costo_camino(plan["camino"], mode) == plan["costo"]
+        assert _costo_camino(referencia["camino"], mode) == referencia["costo"]
+
+
+def test_planificar_lote_igual_a_tabla():
+    for mode in ("unit", "weighted"):
+        lote = SistemaRazonamiento.planificar_lote([[t] for t in TIPOS_MBTI], TIPOS_MBTI, mode=mode)
+        for i, inicio in enumerate(TIPOS_MBTI):
+            for j, objetivo in enumerate(TIPOS_MBTI):
+                plan = SistemaRazonamiento.planificar(inicio, objetivo, mode=mode)
+                assert lote["costos"][i, j] == plan["costo"]
+                assert list(lote["caminos"][i, j]) == plan["camino"]
+
+
+def test_verificar_tabla_planes_cubre_ambos_modos():
+    assert SistemaRazonamiento.verificar_tabla_planes() == 2 * 16 * 16
+
+
+@pytest.mark.parametrize("mode, costos", [("unit", [1, 1, 1, 1]), ("weighted", PESOS)])
+def test_bidireccional_igual_a_a_estrella(mode, costos):
+    for inicio in TIPOS_MBTI:
+        for objetivo in TIPOS_MBTI:
+            referencia = SistemaRazonamiento.busqueda_a_estrella(inicio, objetivo, mode=mode)
+            general = SistemaRazonamiento.planificar_con_costos(inicio, objetivo, costos)
+            bidireccional = SistemaRazonamiento.planificar_con_costos(inicio, objetivo, costos, bidireccional=True)
+
+            assert bidireccional["costo"] == pytest.approx(referencia["costo"]), f"{inicio}->{objetivo}"
+            assert general["costo"] == pytest.approx(referencia["costo"]), f"{inicio}->{objetivo}"
+            for resultado in (referencia, general, bidireccional):
+                assert resultado["camino"][0] == inicio and resultado["camino"][-1] == objetivo
+                assert _costo_camino(resultado["camino"], mode) == pytest.approx(resultado["costo"])
+
+
+def test_bidireccional_igual_a_a_estrella_con_costos_asimetricos():
+    costos, inversos = [1.0, 2.5, 0.5, 3.0], [4.0, 0.5, 2.0, 1.0]
+    espacio = EspacioMBTI(costos, inversos)
+    for inicio in TIPOS_MBTI:
+        for objetivo in TIPOS_MBTI:
+            general = SistemaRazonamiento.planificar_con_costos(inicio, objetivo, costos, inversos)
+            bidireccional = SistemaRazonamiento.planificar_con_costos(inicio, objetivo, costos, inversos, bidireccional=True)
+            assert bidireccional["costo"] == pytest.approx(general["costo"]), f"{inicio}->{objetivo}"
+
+            camino = [SistemaRazonamiento.codificar_tipo(t) for t in bidireccional["camino"]]
+            costo = sum(dict(espacio.vecinos(a))[b] for a, b in zip(camino, camino[1:]))
+            assert costo == pytest.approx(bidireccional["costo"])